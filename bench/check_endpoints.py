@@ -0,0 +1,90 @@
+import os
+import sys
+from types import SimpleNamespace
+from typing import List
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from bench.mock_server import MockOpenAIServer
+from utils.endpoint_pool import create_endpoint_pool
+
+DEFAULT_MODEL = "gpt-4o-mini"
+ENDPOINT_MODEL = "gemini/gemini-2.0-flash"
+FAST_MODEL = "gemini/gemini-2.0-flash-lite"
+
+class RequestError(Exception):
+    """Ответ 400: ошибка самого запроса."""
+    status_code = 400
+
+def _make_openai(base_url: str, api_key: str, max_retries: int):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=max_retries)
+
+def check_model_routing(base_url: str) -> List[str]:
+    """
+    Проверяет, что модель адреса заменяет только модель по умолчанию.
+
+    Args:
+        base_url: Адрес локального сервера
+
+    Returns:
+        List[str]: Описания нарушений
+    """
+    api_config = {
+        "model_name": DEFAULT_MODEL,
+        "endpoints": [{"name": "mock", "base_url": base_url, "api_key": "k", "model": ENDPOINT_MODEL}],
+    }
+    pool = create_endpoint_pool(api_config, _make_openai)
+    messages = [{"role": "user", "content": "Привет"}]
+
+    failures = []
+    for requested, expected in ((DEFAULT_MODEL, ENDPOINT_MODEL), (FAST_MODEL, FAST_MODEL)):
+        model = pool.chat.completions.create(model=requested, messages=messages).model
+        if model != expected:
+            failures.append(f"модель {requested} дошла до адреса как {model}, ожидалась {expected}")
+    return failures
+
+def check_request_errors() -> List[str]:
+    """
+    Проверяет, что ошибка самого запроса (4xx) не повторяется и не учитывается в задержке адреса.
+
+    Returns:
+        List[str]: Описания нарушений
+    """
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        raise RequestError("bad request")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    api_config = {"endpoints": [{"name": "a", "api_key": "k"}, {"name": "b", "api_key": "k"}]}
+    pool = create_endpoint_pool(api_config, lambda base_url, api_key, max_retries: client)
+
+    try:
+        pool.chat.completions.create(model=DEFAULT_MODEL, messages=[])
+    except RequestError:
+        pass
+
+    failures = []
+    if len(calls) != 1:
+        failures.append(f"ошибка 400 отправлена {len(calls)} раз, ожидался 1")
+    if any(status["latency"] is not None for status in pool.status()):
+        failures.append("ошибка 400 учтена в задержке адреса")
+    return failures
+
+def main():
+    """Точка входа проверки: код возврата 1, если пул адресов меняет явно выбранную модель или учитывает 4xx."""
+    server = MockOpenAIServer().start()
+    try:
+        failures = check_model_routing(server.base_url) + check_request_errors()
+    finally:
+        server.stop()
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Any
+
+# Корень проекта: проверяются main.py, main_target.py и validate.py
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться при импорте скриптов и на пути "нет изменений"
+HEAVY_MODULES = ("openai", "httpx", "yaml", "pydantic")
+
+# Скрипт измерения в отдельном процессе: время импорта модуля и (для main_target) запуска без изменений
+_PROBE = r"""
+import sys, time, json
+sys.path.insert(0, {project_dir!r})
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter() - started
+run = None
+if {run!r}:
+    sys.argv = ["main_target.py", "--language", "en", "--log_level", "WARNING"]
+    started = time.perf_counter()
+    {module}.main()
+    run = time.perf_counter() - started
+print(json.dumps({{"import": imported, "run": run,
+                  "heavy": sorted(name for name in {heavy!r} if name in sys.modules)}}))
+"""
+
+def probe(module: str, run: bool = False, env: Dict[str, str] = None) -> Dict[str, Any]:
+    """
+    Измеряет импорт модуля (и запуск main_target без изменений) в новом процессе.
+
+    Args:
+        module: Имя модуля (main, main_target, validate)
+        run: Выполнить main() после импорта
+        env: Переменные окружения процесса
+
+    Returns:
+        Dict[str, Any]: Время импорта и запуска в секундах, загруженные тяжелые модули
+    """
+    code = _PROBE.format(project_dir=PROJECT_DIR, module=module, run=run, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, env=env, capture_output=True,
+                            text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def make_clean_book(directory: str) -> str:
+    """
+    Создает Git-репозиторий книги без изменений в русской директории.
+
+    Args:
+        directory: Директория для репозитория
+
+    Returns:
+        str: Путь к репозиторию
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    from main_target import LANG_DIRS
+
+    ru_dir = os.path.join(directory, LANG_DIRS["ru"])
+    os.makedirs(ru_dir, exist_ok=True)
+    with open(os.path.join(ru_dir, "index.md"), 'w', encoding='utf-8') as f:
+        f.write("# Заголовок\n\nТекст страницы.\n")
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run(git + ["init", "-q"], cwd=directory, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=directory, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "init"], cwd=directory, check=True)
+    return directory
+
+def check_startup(repeat: int, max_import_ms: float, max_run_ms: float) -> List[str]:
+    """
+    Проверяет время запуска скриптов и отсутствие тяжелых импортов.
+
+    Args:
+        repeat: Количество замеров (берется лучший)
+        max_import_ms: Допустимое время импорта main_target, мс
+        max_run_ms: Допустимое время main_target.main() без изменений, мс
+
+    Returns:
+        List[str]: Нарушения (пустой список - проверка пройдена)
+    """
+    failures = []
+    for module in ("main", "validate"):
+        measurement = probe(module)
+        print(f"import {module}: {measurement['import'] * 1000:.1f} мс")
+        if measurement["heavy"]:
+            failures.append(f"import {module} загружает {', '.join(measurement['heavy'])}")
+
+    with tempfile.TemporaryDirectory() as book:
+        env = dict(os.environ, BOOK_PATH=make_clean_book(book))
+        # Первый запуск заполняет кэш разобранной конфигурации
+        probe("main_target", run=True, env=env)
+        measurements = [probe("main_target", run=True, env=env) for _ in range(repeat)]
+
+    import_ms = min(m["import"] for m in measurements) * 1000
+    run_ms = min(m["run"] for m in measurements) * 1000
+    print(f"import main_target: {import_ms:.1f} мс, запуск без изменений: {run_ms:.1f} мс")
+    heavy = sorted({name for m in measurements for name in m["heavy"]})
+    if heavy:
+        failures.append(f"main_target без изменений загружает {', '.join(heavy)}")
+    if import_ms > max_import_ms:
+        failures.append(f"import main_target {import_ms:.1f} мс > {max_import_ms:g} мс")
+    if run_ms > max_run_ms:
+        failures.append(f"main_target.main() без изменений {run_ms:.1f} мс > {max_run_ms:g} мс")
+    return failures
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Объект с аргументами
+    """
+    parser = argparse.ArgumentParser(description='Проверка времени запуска main_target.py (путь git-хука без изменений)')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество замеров (берется лучший)')
+    parser.add_argument('--max_import_ms', type=float, default=150, help='Допустимое время импорта main_target, мс')
+    parser.add_argument('--max_run_ms', type=float, default=50, help='Допустимое время запуска без изменений, мс')
+    return parser.parse_args()
+
+def main():
+    """Точка входа проверки: код возврата 1, если время запуска вышло за пределы."""
+    args = parse_arguments()
+    failures = check_startup(args.repeat, args.max_import_ms, args.max_run_ms)
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import random
+import argparse
+from typing import Dict, List, Any
+
+# Словарь для синтетического текста (включая термины глоссария)
+WORDS = (
+    "модель промпт агент контекст токен бэкенд фронтенд продакшн разработчик код функция "
+    "запрос ответ данные файл проект система документация пример задача результат ошибка "
+    "перевод текст страница раздел модуль урок курс инструмент библиотека сервер клиент "
+    "быстро просто важно можно нужно также поэтому однако например сначала затем далее "
+    "используем создаем проверяем запускаем настраиваем получаем отправляем сохраняем "
+    "новый простой сложный большой основной локальный удаленный технический искусственный"
+).split()
+
+CODE_LANGUAGES = ["python", "bash", "javascript", "yaml", "json"]
+
+# Параметры корпуса по умолчанию
+DEFAULT_SHAPE = {
+    "files": 50,              # Количество файлов
+    "dirs": 5,                # Количество поддиректорий
+    "min_paragraphs": 5,      # Минимальное количество абзацев в файле
+    "max_paragraphs": 40,     # Максимальное количество абзацев в файле
+    "large_file_ratio": 0.05, # Доля больших файлов (разбиваются на несколько частей)
+    "large_multiplier": 20,   # Во сколько раз больше абзацев в большом файле
+    "code_ratio": 0.2,        # Вероятность блока кода после абзаца
+    "details_ratio": 0.1,     # Вероятность блока <details> после абзаца
+    "list_ratio": 0.15,       # Вероятность списка после абзаца
+    "mdx_ratio": 0.3,         # Доля .mdx файлов (с import в начале)
+    "local_text_ratio": 0.1,  # Доля файлов с блоком LOCAL TEXT
+    "binary_files": 2,        # Количество бинарных файлов (картинок)
+}
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 16))]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + "."
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+
+def _code_block(rng: random.Random) -> str:
+    language = rng.choice(CODE_LANGUAGES)
+    lines = [f"value_{i} = compute({rng.randint(0, 999)})  # комментарий {rng.choice(WORDS)}"
+             for i in range(rng.randint(3, 15))]
+    return f"```{language}\n" + "\n".join(lines) + "\n```"
+
+def _details_block(rng: random.Random) -> str:
+    return f"<details>\n<summary>{_sentence(rng)}</summary>\n\n{_paragraph(rng)}\n\n</details>"
+
+def _list_block(rng: random.Random) -> str:
+    return "\n".join(f"- {_sentence(rng)}" for _ in range(rng.randint(3, 8)))
+
+def generate_document(rng: random.Random, paragraphs: int, shape: Dict[str, Any], mdx: bool,
+                      local_text: bool) -> str:
+    """
+    Генерирует синтетический markdown/MDX документ на русском.
+
+    Args:
+        rng: Генератор случайных чисел
+        paragraphs: Количество абзацев
+        shape: Параметры корпуса
+        mdx: Добавить строки import (MDX)
+        local_text: Добавить блок LOCAL TEXT
+
+    Returns:
+        str: Текст документа
+    """
+    blocks = [f"---\ntitle: {_sentence(rng)[:-1]}\ndescription: {_sentence(rng)}\nsidebar_position: {rng.randint(1, 20)}\n---"]
+    if mdx:
+        blocks.append("import Tabs from '@theme/Tabs';\nimport TabItem from '@theme/TabItem';")
+    blocks.append(f"# {_sentence(rng)[:-1]}")
+
+    for i in range(paragraphs):
+        if i and i % 5 == 0:
+            blocks.append(f"## {_sentence(rng)[:-1]}")
+        blocks.append(_paragraph(rng))
+        if rng.random() < shape["code_ratio"]:
+            blocks.append(_code_block(rng))
+        if rng.random() < shape["details_ratio"]:
+            blocks.append(_details_block(rng))
+        if rng.random() < shape["list_ratio"]:
+            blocks.append(_list_block(rng))
+        if local_text and i == paragraphs // 2:
+            blocks.append(f"{{/* LOCAL TEXT START */}}\n{_paragraph(rng)}\n{{/* LOCAL TEXT END */}}")
+
+    return "\n\n".join(blocks) + "\n"
+
+def generate_corpus(output_dir: str, seed: int = 42, **shape_overrides: Any) -> List[str]:
+    """
+    Генерирует корпус синтетических документов.
+
+    Args:
+        output_dir: Директория для корпуса
+        seed: Начальное значение генератора (одинаковый seed - одинаковый корпус)
+        **shape_overrides: Параметры корпуса (см. DEFAULT_SHAPE)
+
+    Returns:
+        List[str]: Относительные пути созданных файлов
+    """
+    shape = dict(DEFAULT_SHAPE, **shape_overrides)
+    rng = random.Random(seed)
+    created = []
+
+    for index in range(shape["files"]):
+        directory = f"section{index % max(shape['dirs'], 1)}"
+        mdx = rng.random() < shape["mdx_ratio"]
+        rel_path = os.path.join(directory, f"page{index}.{'mdx' if mdx else 'md'}")
+        paragraphs = rng.randint(shape["min_paragraphs"], shape["max_paragraphs"])
+        if rng.random() < shape["large_file_ratio"]:
+            paragraphs *= shape["large_multiplier"]
+        content = generate_document(rng, paragraphs, shape, mdx, rng.random() < shape["local_text_ratio"])
+
+        file_path = os.path.join(output_dir, rel_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        created.append(rel_path)
+
+    for index in range(shape["binary_files"]):
+        rel_path = os.path.join("img", f"image{index}.png")
+        file_path = os.path.join(output_dir, rel_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + bytes(rng.randrange(256) for _ in range(2048)))
+        created.append(rel_path)
+
+    return created
+
+def main():
+    """Генерация корпуса из командной строки."""
+    parser = argparse.ArgumentParser(description='Генерация синтетического корпуса для бенчмарков')
+    parser.add_argument('output_dir', type=str, help='Директория для корпуса')
+    parser.add_argument('--seed', type=int, default=42, help='Начальное значение генератора')
+    for key, value in DEFAULT_SHAPE.items():
+        parser.add_argument(f'--{key}', type=type(value), default=value)
+    args = vars(parser.parse_args())
+    output_dir = args.pop('output_dir')
+    created = generate_corpus(output_dir, **args)
+    print(f"Создано файлов: {len(created)} в {output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import gzip
+import json
+import math
+import re
+import time
+import random
+import socket
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Any, Optional
+
+# Транслитерация кириллицы: "перевод" сохраняет структуру текста и не содержит кириллицы
+_CYRILLIC = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+_LATIN = ["a", "b", "v", "g", "d", "e", "e", "zh", "z", "i", "y", "k", "l", "m", "n", "o", "p", "r", "s", "t",
+          "u", "f", "kh", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "ya"]
+_TRANSLIT = {ord(c): l for c, l in zip(_CYRILLIC, _LATIN)}
+_TRANSLIT.update({ord(c.upper()): l.capitalize() for c, l in zip(_CYRILLIC, _LATIN)})
+
+# Строка промпта перевода на несколько языков с кодами языков ответа (utils.translator.MULTI_TARGET_PROMPT)
+_MULTI_TARGET_KEYS = re.compile(r"^Required language keys: (.+)$", re.MULTILINE)
+
+# Кэш префиксов провайдера считается блоками по 128 токенов (как у OpenAI)
+CACHE_BLOCK_TOKENS = 128
+
+def parse_latency(spec: str):
+    """
+    Разбирает описание распределения задержки.
+
+    Поддерживаются "fixed:СЕК", "uniform:МИН,МАКС" и "lognormal:МЕДИАНА,СИГМА".
+
+    Args:
+        spec: Описание распределения
+
+    Returns:
+        Callable[[random.Random], float]: Функция, возвращающая задержку в секундах
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+def estimate_tokens(text: str) -> int:
+    """Оценка количества токенов (4 символа на токен)."""
+    return max(1, len(text) // 4)
+
+class MockOpenAIServer:
+    """
+    Локальный OpenAI-совместимый сервер (POST /v1/chat/completions) для бенчмарков.
+
+    "Переводит" транслитерацией последнего сообщения пользователя, на запросы
+    с response_format=json_object отвечает {"issues": []} или переводами на языки
+    промпта перевода на несколько языков. Поддерживает задержки
+    по распределению, скорость генерации, долю ответов 429/500, лимит токенов ответа
+    (finish_reason="length") и учет кэша префиксов (usage.prompt_tokens_details.cached_tokens).
+    """
+
+    def __init__(self, latency: str = "fixed:0", tokens_per_second: Optional[float] = None,
+                 rate_429: float = 0.0, rate_500: float = 0.0, max_output_tokens: Optional[int] = None,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 42):
+        """
+        Инициализирует сервер.
+
+        Args:
+            latency: Распределение задержки до ответа (см. parse_latency)
+            tokens_per_second: Скорость генерации ответа (None - без задержки на генерацию)
+            rate_429: Доля ответов 429 Too Many Requests
+            rate_500: Доля ответов 500 Internal Server Error
+            max_output_tokens: Лимит токенов ответа (None - без лимита)
+            host: Адрес
+            port: Порт (0 - любой свободный)
+            seed: Начальное значение генератора случайных чисел
+        """
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.max_output_tokens = max_output_tokens
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self.stats: Dict[str, Any] = {"requests": 0, "responses": {}, "latencies": []}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Заголовки и тело уходят разными пакетами: без TCP_NODELAY алгоритм Нейгла
+                # вместе с отложенным ACK добавляет ~40 мс к каждому ответу
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                data = self.rfile.read(length)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    data = gzip.decompress(data)
+                try:
+                    body = json.loads(data or b"{}")
+                except json.JSONDecodeError:
+                    body = {}
+                status, payload, headers = server.handle(self.path, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Базовый URL для клиента OpenAI."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self) -> None:
+        """Сбрасывает статистику запросов."""
+        with self._lock:
+            self.stats = {"requests": 0, "responses": {}, "latencies": []}
+
+    def _count(self, status: int, latency: float) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["responses"][status] = self.stats["responses"].get(status, 0) + 1
+            self.stats["latencies"].append(latency)
+
+    def _cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Считает токены самого длинного уже виденного сервером префикса системных сообщений.
+
+        Префиксы считаются по границам сообщений: постоянное первое системное сообщение
+        попадает в кэш, даже если следующее (данные фрагмента) меняется от запроса к запросу.
+        """
+        prefix = ""
+        cached = 0
+        for message in messages:
+            if message.get("role") != "system":
+                break
+            prefix += message.get("content") or ""
+            key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+            with self._lock:
+                seen = key in self._prefixes
+                self._prefixes.add(key)
+            tokens = estimate_tokens(prefix)
+            if seen and tokens >= 1024:
+                cached = (tokens // CACHE_BLOCK_TOKENS) * CACHE_BLOCK_TOKENS
+        return cached
+
+    def handle(self, path: str, body: Dict[str, Any]):
+        """
+        Формирует ответ на запрос.
+
+        Args:
+            path: Путь запроса
+            body: Тело запроса
+
+        Returns:
+            Tuple[int, Dict[str, Any], Dict[str, str]]: (статус, JSON ответа, заголовки)
+        """
+        started = time.perf_counter()
+        if not path.rstrip("/").endswith("/chat/completions"):
+            self._count(404, 0.0)
+            return 404, {"error": {"message": "not found"}}, {}
+
+        with self._lock:
+            roll = self._rng.random()
+            delay = self.latency(self._rng)
+        if roll < self.rate_429:
+            self._count(429, 0.0)
+            return 429, {"error": {"message": "rate limited", "type": "rate_limit_error"}}, {"retry-after-ms": "50"}
+        if roll < self.rate_429 + self.rate_500:
+            time.sleep(delay)
+            self._count(500, delay)
+            return 500, {"error": {"message": "internal error", "type": "server_error"}}, {}
+
+        messages = body.get("messages", [])
+        user_text = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            # Перевод на несколько языков (Translator.translate_text_multi) или проверка перевода
+            keys = _MULTI_TARGET_KEYS.search(messages[0].get("content") or "") if messages else None
+            if keys:
+                content = json.dumps({"translations": {key.strip(): user_text.translate(_TRANSLIT)
+                                                       for key in keys.group(1).split(",")}}, ensure_ascii=False)
+            else:
+                content = json.dumps({"issues": []})
+        else:
+            content = user_text.translate(_TRANSLIT)
+
+        finish_reason = "stop"
+        completion_tokens = estimate_tokens(content)
+        limit = body.get("max_tokens") or body.get("max_completion_tokens") or self.max_output_tokens
+        if self.max_output_tokens:
+            limit = min(limit, self.max_output_tokens)
+        if limit and completion_tokens > limit:
+            content = content[:limit * 4]
+            completion_tokens = limit
+            finish_reason = "length"
+
+        if self.tokens_per_second:
+            delay += completion_tokens / self.tokens_per_second
+        time.sleep(delay)
+
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        payload = {
+            "id": f"chatcmpl-{hashlib.md5(f'{started}'.encode()).hexdigest()[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": self._cached_tokens(messages)}
+            }
+        }
+        self._count(200, time.perf_counter() - started)
+        return 200, payload, {}
+
+def main():
+    """Запуск сервера из командной строки."""
+    parser = argparse.ArgumentParser(description='Локальный OpenAI-совместимый сервер для бенчмарков')
+    parser.add_argument('--port', type=int, default=8089, help='Порт')
+    parser.add_argument('--latency', type=str, default='lognormal:0.5,0.4',
+                        help='Задержка: fixed:СЕК, uniform:МИН,МАКС, lognormal:МЕДИАНА,СИГМА')
+    parser.add_argument('--tokens_per_second', type=float, help='Скорость генерации ответа')
+    parser.add_argument('--rate_429', type=float, default=0.0, help='Доля ответов 429')
+    parser.add_argument('--rate_500', type=float, default=0.0, help='Доля ответов 500')
+    parser.add_argument('--max_output_tokens', type=int, help='Лимит токенов ответа')
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.latency, args.tokens_per_second, args.rate_429, args.rate_500,
+                              args.max_output_tokens, port=args.port)
+    print(f"Mock OpenAI API: {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+from typing import Dict, List, Any, Optional
+
+# Корень проекта: сценарии импортируют main.py, main_target.py и validate.py
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from bench.corpus import generate_corpus
+from bench.mock_server import MockOpenAIServer
+
+SCENARIOS = ("translate", "target", "validate")
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Возвращает перцентиль значений (ближайший ранг).
+
+    Args:
+        values: Значения
+        fraction: Доля (0.5 - медиана, 0.99 - p99)
+
+    Returns:
+        float: Значение перцентиля (0 для пустого списка)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def _make_client(base_url: str, workers: int):
+    """Создает клиента OpenAI, подключенного к mock-серверу, с замером задержек запросов."""
+    from utils import load_config
+    from utils.client import create_client
+
+    # Транспорт из config.yaml (api.transport), как у основных скриптов
+    client = create_client(load_config(), workers, backend="live", api_key="bench", base_url=base_url)
+    latencies: List[float] = []
+    lock = threading.Lock()
+    create = client.chat.completions.create
+
+    def timed_create(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return create(*args, **kwargs)
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    client.chat.completions.create = timed_create
+    return client, latencies
+
+def _run_translate(corpus_dir: str, work_dir: str, workers: int, client) -> int:
+    import main
+    from utils import Translator, load_glossary, load_config
+
+    main.CONFIG = load_config()
+    translator = Translator(client, "mock", load_glossary(), main.CONFIG.get("prompt_improvements", {}))
+    main.process_directory(corpus_dir, os.path.join(work_dir, "output"), "en", translator,
+                           main.CONFIG.get("general", {}).get("max_tokens", 8000), workers)
+    return sum(len(files) for _, _, files in os.walk(corpus_dir))
+
+def _run_target(corpus_dir: str, work_dir: str, workers: int, client) -> int:
+    import main_target
+    from utils import Translator, load_config, load_glossary, get_system_prompt
+
+    # Книга с русской директорией, как в main_target.main (без поиска изменений в git)
+    main_target.CONFIG = load_config()
+    book_dir = os.path.join(work_dir, "book")
+    ru_dir = os.path.join(book_dir, main_target.LANG_DIRS["ru"])
+    shutil.copytree(corpus_dir, ru_dir)
+    rel_paths = [
+        os.path.relpath(os.path.join(root, file), ru_dir).replace(os.sep, "/")
+        for root, _, files in os.walk(ru_dir) for file in files
+    ]
+
+    translator = Translator(client, "mock", load_glossary(), main_target.CONFIG.get("prompt_improvements", {}))
+    system_prompt = get_system_prompt(main_target.CONFIG, "en")
+    max_tokens = main_target.CONFIG.get("general", {}).get("max_tokens", 8000)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(main_target.process_changed_file, os.path.join(ru_dir, rel_path), rel_path, "en",
+                            book_dir, translator, max_tokens, system_prompt)
+            for rel_path in rel_paths
+        ]
+        for future in futures:
+            future.result()
+    return len(rel_paths)
+
+def _run_validate(corpus_dir: str, work_dir: str, workers: int, client) -> int:
+    import validate
+    from utils import load_config
+
+    # Переводы готовит прогон prepare в общей директории результатов;
+    # валидация последовательная, количество потоков на нее не влияет
+    translated_dir = os.path.join(os.path.dirname(work_dir), "output")
+    validate.validate_translations(corpus_dir, translated_dir, "en",
+                                   os.path.join(work_dir, "report.json"), use_cache=False,
+                                   client=client, config=load_config())
+    return sum(1 for _, _, files in os.walk(corpus_dir) for file in files if file.endswith(('.md', '.mdx')))
+
+def run_single(scenario: str, workers: int, corpus_dir: str, base_url: str, result_file: str) -> None:
+    """
+    Выполняет один сценарий в текущем процессе и записывает результат в JSON-файл.
+
+    Рабочая директория создается рядом с файлом результата; сценарий prepare
+    переводит корпус в общую директорию output для последующей валидации.
+
+    Args:
+        scenario: Сценарий (translate, target, validate, prepare)
+        workers: Количество рабочих потоков
+        corpus_dir: Директория корпуса
+        base_url: Адрес mock-сервера
+        result_file: Файл для результата
+    """
+    from utils.metrics import get_metrics, install_retry_counter
+
+    install_retry_counter()
+    results_dir = os.path.dirname(os.path.abspath(result_file))
+    prepare = scenario == "prepare"
+    if prepare:
+        scenario, work_dir = "translate", results_dir
+    else:
+        work_dir = tempfile.mkdtemp(prefix=f"{scenario}_", dir=results_dir)
+    try:
+        client, latencies = _make_client(base_url, workers)
+        retries_before = get_metrics().totals()["retries"]
+
+        started = time.perf_counter()
+        runner = {"translate": _run_translate, "target": _run_target, "validate": _run_validate}[scenario]
+        files = runner(corpus_dir, work_dir, workers, client)
+        elapsed = time.perf_counter() - started
+
+        result = {
+            "scenario": scenario,
+            "workers": workers,
+            "files": files,
+            "elapsed": elapsed,
+            "requests": len(latencies),
+            "retries": get_metrics().totals()["retries"] - retries_before,
+            "p50": percentile(latencies, 0.5),
+            "p99": percentile(latencies, 0.99),
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+        with open(result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+    finally:
+        if not prepare:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def _run_subprocess(scenario: str, workers: int, corpus_dir: str, base_url: str,
+                    result_file: str) -> Optional[Dict[str, Any]]:
+    """Выполняет сценарий в отдельном процессе и возвращает его результат (None при ошибке)."""
+    process = subprocess.run(
+        [sys.executable, "-m", "bench.run_bench", "--single", scenario, str(workers), corpus_dir,
+         base_url, result_file],
+        cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    if process.returncode != 0 or not os.path.exists(result_file):
+        print(f"Сценарий {scenario} ({workers} потоков) завершился с ошибкой:\n{process.stderr[-2000:]}")
+        return None
+    with open(result_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def run_bench(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Запускает mock-сервер, генерирует корпус и прогоняет сценарии при разном числе потоков.
+
+    Каждый прогон выполняется в отдельном процессе, чтобы пиковая память (RSS)
+    и состояние модулей не переносились между прогонами.
+
+    Args:
+        args: Аргументы командной строки
+
+    Returns:
+        List[Dict[str, Any]]: Результаты прогонов
+    """
+    server = MockOpenAIServer(args.latency, args.tokens_per_second, args.rate_429, args.rate_500,
+                              args.max_output_tokens, seed=args.seed).start()
+    corpus_dir = tempfile.mkdtemp(prefix="bench_corpus_")
+    results_dir = tempfile.mkdtemp(prefix="bench_results_")
+    results = []
+    try:
+        generate_corpus(corpus_dir, seed=args.seed, files=args.files)
+        scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+        if "validate" in scenarios:
+            # Переводы для валидации готовятся заранее и не входят в замеры
+            _run_subprocess("prepare", 16, corpus_dir, server.base_url, os.path.join(results_dir, "prepare.json"))
+
+        for scenario in scenarios:
+            for workers in [int(value) for value in args.workers.split(',')]:
+                server.reset_stats()
+                result = _run_subprocess(scenario, workers, corpus_dir, server.base_url,
+                                         os.path.join(results_dir, f"{scenario}_{workers}.json"))
+                if result is None:
+                    continue
+
+                responses = dict(server.stats["responses"])
+                result["server_requests"] = server.stats["requests"]
+                result["http_429"] = responses.get(429, 0)
+                result["http_500"] = responses.get(500, 0)
+                result["files_per_sec"] = result["files"] / result["elapsed"] if result["elapsed"] else 0.0
+                result["requests_per_sec"] = result["requests"] / result["elapsed"] if result["elapsed"] else 0.0
+                results.append(result)
+                print(format_result(result), flush=True)
+    finally:
+        server.stop()
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+        shutil.rmtree(results_dir, ignore_errors=True)
+    return results
+
+def format_result(result: Dict[str, Any]) -> str:
+    """Форматирует результат прогона одной строкой."""
+    return (f"{result['scenario']:<10} workers={result['workers']:<3} files={result['files']:<5} "
+            f"time={result['elapsed']:.2f}s files/s={result['files_per_sec']:.2f} "
+            f"req/s={result['requests_per_sec']:.2f} p50={result['p50'] * 1000:.0f}ms "
+            f"p99={result['p99'] * 1000:.0f}ms 429={result['http_429']} retries={result['retries']:.0f} "
+            f"rss={result['peak_rss_mb']:.0f}MB")
+
+def parse_arguments():
+    """
+    Разбирает аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Объект с аргументами
+    """
+    parser = argparse.ArgumentParser(description='Бенчмарк конвейера перевода на локальном mock-сервере API')
+    parser.add_argument('--files', type=int, default=50, help='Количество файлов в синтетическом корпусе')
+    parser.add_argument('--workers', type=str, default='1,4,8', help='Количество потоков через запятую')
+    parser.add_argument('--scenarios', type=str, default=','.join(SCENARIOS),
+                        help='Сценарии через запятую (translate, target, validate)')
+    parser.add_argument('--latency', type=str, default='lognormal:0.05,0.5',
+                        help='Задержка сервера: fixed:СЕК, uniform:МИН,МАКС, lognormal:МЕДИАНА,СИГМА')
+    parser.add_argument('--tokens_per_second', type=float, help='Скорость генерации ответа сервером')
+    parser.add_argument('--rate_429', type=float, default=0.0, help='Доля ответов 429')
+    parser.add_argument('--rate_500', type=float, default=0.0, help='Доля ответов 500')
+    parser.add_argument('--max_output_tokens', type=int, help='Лимит токенов ответа сервера')
+    parser.add_argument('--seed', type=int, default=42, help='Начальное значение генераторов')
+    parser.add_argument('--json', type=str, help='Файл для сохранения результатов в JSON')
+    parser.add_argument('--single', nargs=5, metavar=('SCENARIO', 'WORKERS', 'CORPUS', 'BASE_URL', 'RESULT'),
+                        help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+def main():
+    """Точка входа бенчмарка."""
+    args = parse_arguments()
+    if args.single:
+        scenario, workers, corpus_dir, base_url, result_file = args.single
+        run_single(scenario, int(workers), corpus_dir, base_url, result_file)
+        return
+
+    results = run_bench(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+from typing import Dict, List, Any, Optional
+
+# Импортируем наши утилиты
+from utils import log_info, log_error, log_warning, setup_logging, load_config
+from utils.prompt_utils import get_improvements_file
+from utils.improvement_store import get_improvement_store
+from utils.consolidation import consolidate_improvements, find_conflicts, DEFAULT_THRESHOLD, DEFAULT_BITS
+
+def consolidate(target_language: str, threshold: Optional[float] = None, bits: Optional[int] = None,
+                dry_run: bool = False) -> int:
+    """
+    Объединяет повторяющиеся улучшения промпта для языка в записи-представители с частотой.
+
+    Записи об одном оригинале с разными переводами не объединяются, а выводятся в лог как конфликты.
+
+    Args:
+        target_language: Код целевого языка
+        threshold: Минимальная схожесть основ оригиналов записей с одинаковым переводом (по умолчанию из config.yaml)
+        bits: Размер хэшированного битового множества триграмм (по умолчанию из config.yaml)
+        dry_run: Только вывести кластеры, не перезаписывая файл
+
+    Returns:
+        int: Количество записей после консолидации (или -1 в случае ошибки)
+    """
+    config = load_config().get("consolidation", {})
+    threshold = threshold if threshold is not None else config.get("threshold", DEFAULT_THRESHOLD)
+    bits = bits if bits is not None else config.get("bits", DEFAULT_BITS)
+
+    improvements_file = get_improvements_file(target_language)
+    store = get_improvement_store(improvements_file)
+
+    def transform(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for conflict in find_conflicts(entries):
+            # Переводы, различающиеся только регистром, выводятся один раз
+            translations: Dict[str, str] = {}
+            for i in conflict:
+                translated = entries[i].get('translated', '')
+                translations.setdefault(' '.join(translated.split()).casefold(), translated)
+            log_warning(f"Конфликт улучшений для {entries[conflict[0]].get('original', '')!r}: "
+                        + ", ".join(repr(t) for t in translations.values()) + " - не объединены")
+        representatives, clusters = consolidate_improvements(entries, threshold, bits)
+        for cluster in clusters:
+            if len(cluster) > 1:
+                log_info(f"Кластер из {len(cluster)} записей: {entries[cluster[0]].get('original', '')!r} <- "
+                         + ", ".join(repr(entries[i].get('original', '')) for i in cluster[1:]))
+        return representatives
+
+    try:
+        if dry_run:
+            return len(transform(store.all()))
+        count = store.rewrite(transform)
+        log_info(f"Файл улучшений {improvements_file} перезаписан: {count} записей")
+        return count
+    except ImportError as e:
+        log_error(f"Для консолидации требуется NumPy (pip install numpy): {e}")
+        return -1
+    except Exception as e:
+        log_error(f"Ошибка при консолидации улучшений промпта: {e}")
+        return -1
+
+def parse_arguments():
+    """
+    Разбирает аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Объект с аргументами
+    """
+    parser = argparse.ArgumentParser(description='Консолидация похожих улучшений промптов')
+    parser.add_argument('--language', type=str, default='en', help='Целевой язык перевода (en, es, zh)')
+    parser.add_argument('--threshold', type=float, help='Минимальная схожесть основ оригиналов записей с одинаковым переводом (0-1)')
+    parser.add_argument('--bits', type=int, help='Размер хэшированного битового множества триграмм')
+    parser.add_argument('--dry_run', action='store_true', help='Только показать кластеры, не изменяя файл')
+    parser.add_argument('--log_level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Уровень логирования')
+    parser.add_argument('--log_file', type=str, help='Файл для сохранения логов')
+    parser.add_argument('--log_format', type=str, default='text', choices=['text', 'json'],
+                        help='Формат логов: text или json (JSON Lines с полями file, lang, part)')
+    return parser.parse_args()
+
+def main():
+    """Основная функция для запуска консолидации улучшений."""
+    args = parse_arguments()
+    setup_logging(args.log_level, args.log_file, args.log_format)
+    consolidate(args.language, args.threshold, args.bits, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import argparse
+from pathlib import Path
+from typing import Dict, List, Any
+from dotenv import load_dotenv
+
+# Импортируем наши утилиты
+from utils import log_info, log_error, setup_logging, load_config
+from utils.translation_memory import init_translation_memory, get_translation_memory
+from utils.tm_import import import_translation_memory
+from main_target import LANG_DIRS
+
+def import_book(book_path: str, target_languages: List[str], dry_run: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Заполняет память переводов из уже переведенных файлов книги.
+
+    Args:
+        book_path: Путь к корню репозитория книги
+        target_languages: Языки, переводы которых импортируются
+        dry_run: Только выровнять блоки и вывести статистику, не записывая память
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Статистика импорта по языкам
+    """
+    # Импорт выполняется и при выключенной памяти переводов: она понадобится, когда ее включат
+    memory_config = dict(load_config().get("translation_memory") or {}, enabled=True)
+    init_translation_memory(memory_config)
+
+    source_dir = os.path.join(book_path, LANG_DIRS['ru'])
+    if not os.path.isdir(source_dir):
+        log_error(f"Директория оригиналов не найдена: {source_dir}")
+        return {}
+
+    results = {}
+    for target_language in target_languages:
+        target_dir = os.path.join(book_path, LANG_DIRS[target_language])
+        if not os.path.isdir(target_dir):
+            log_error(f"[{target_language}] Директория переводов не найдена: {target_dir}")
+            continue
+        memory = get_translation_memory(target_language)
+        results[target_language] = import_translation_memory(source_dir, target_dir, memory, dry_run)
+        if not dry_run:
+            log_info(f"[{target_language}] Блоков в памяти переводов: {len(memory)} ({memory.memory_file})")
+    return results
+
+def parse_arguments():
+    """
+    Разбирает аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Объект с аргументами
+    """
+    parser = argparse.ArgumentParser(description='Импорт существующих переводов книги в память переводов')
+    parser.add_argument('--language', type=str, default='all', choices=['en', 'es', 'zh', 'all'],
+                        help="Язык переводов (en, es, zh) или 'all' для всех")
+    parser.add_argument('--book_path', type=str, help='Путь к репозиторию книги (по умолчанию BOOK_PATH из .env)')
+    parser.add_argument('--dry_run', action='store_true', help='Только выровнять блоки и вывести статистику')
+    parser.add_argument('--log_level', type=str, default='INFO',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Уровень логирования')
+    parser.add_argument('--log_file', type=str, help='Файл для сохранения логов')
+    parser.add_argument('--log_format', type=str, default='text', choices=['text', 'json'],
+                        help='Формат логов: text или json (JSON Lines с полями file, lang, part)')
+    return parser.parse_args()
+
+def main():
+    """Основная функция импорта переводов в память переводов."""
+    load_dotenv()
+    args = parse_arguments()
+    setup_logging(args.log_level, args.log_file, args.log_format)
+
+    book_path = args.book_path or os.getenv("BOOK_PATH")
+    if not book_path:
+        log_error("Укажите --book_path или переменную окружения BOOK_PATH в .env файле.")
+        return
+    target_languages = ['en', 'es', 'zh'] if args.language == 'all' else [args.language]
+    import_book(str(Path(book_path).resolve()), target_languages, args.dry_run)
+
+if __name__ == "__main__":
+    main()
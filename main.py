@@ -1,19 +1,24 @@
 import os
-import re
 import argparse
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Any
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Импортируем наши утилиты
 from utils import (
     log_info, log_error, log_warning, setup_logging,
-    load_config, get_system_prompt, load_glossary,
-    is_binary_file, extract_frontmatter, restore_frontmatter, split_content,
-    translate_frontmatter, Translator
+    load_config, get_system_prompt, get_part_token_limit, load_glossary,
+    is_binary_file, remove_local_text, extract_frontmatter, restore_frontmatter, split_content,
+    translate_frontmatter, Translator, repair_translated_parts, repair_directory
 )
+from utils.metrics import init_metrics
+from utils.translation_memory import init_translation_memory, log_translation_memory_summary
+from utils.profiling import init_profiling, get_profiler, span, add_profiling_arguments
+from utils.replay import add_backend_arguments, resolve_backend
+from utils.client import create_client
+from utils.model_router import create_model_router
+from utils.planner import TranslationPlanner, log_plan
 
 # Добавляем глобальный счетчик токенов для всех языков
 global_total_tokens_processed = 0
@@ -41,55 +46,73 @@ def process_file(file_path: str, rel_path: str, output_dir: str, target_language
         os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
         
         # Если файл бинарный, просто копируем его
-        if is_binary_file(file_path):
-            log_info(f"Копирование бинарного файла: {rel_path}")
+        with span("is_binary_file", file=rel_path):
+            is_binary = is_binary_file(file_path)
+        if is_binary:
+            log_info("Копирование бинарного файла: %s", rel_path, file=rel_path, lang=target_language)
             import shutil
             shutil.copy2(file_path, output_file_path)
             return True
         
         # Обрабатываем только файлы .md и .mdx
         if not file_path.endswith(('.md', '.mdx')):
-            log_info(f"Копирование файла с расширением {os.path.splitext(file_path)[1]}: {rel_path}")
+            log_info("Копирование файла с расширением %s: %s", os.path.splitext(file_path)[1], rel_path,
+                     file=rel_path, lang=target_language)
             import shutil
             shutil.copy2(file_path, output_file_path)
             return True
         
         # Читаем содержимое файла
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        with span("read", file=rel_path):
+            with open(file_path, 'r', encoding='utf-8') as file:
+                content = file.read()
         
         # Удаляем блоки локального текста перед дальнейшей обработкой
-        # Используем флаг re.DOTALL, чтобы '.' соответствовал и переносам строк
-        content = re.sub(r"\{\s*/\*\s*LOCAL TEXT START\s*\*/\s*\}(.*?)\{\s*/\*\s*LOCAL TEXT END\s*\*/\s*\}", 
-                         "", content, flags=re.DOTALL | re.IGNORECASE)
+        with span("remove_local_text", file=rel_path):
+            content = remove_local_text(content)
         
         # Извлекаем фронтматтер
-        has_frontmatter, frontmatter, main_content = extract_frontmatter(content)
+        with span("extract_frontmatter", file=rel_path):
+            has_frontmatter, frontmatter, main_content = extract_frontmatter(content)
         
         # Получаем системный промпт для выбранного языка
         system_prompt = get_system_prompt(CONFIG, target_language)
         
         # Если есть фронтматтер, переводим его
         if has_frontmatter and frontmatter:
-            log_info(f"Обработка фронтматтера файла {rel_path}")
-            frontmatter = translate_frontmatter(frontmatter, translator.translate_text, target_language, system_prompt)
+            log_info("Обработка фронтматтера файла %s", rel_path, file=rel_path, lang=target_language)
+            with span("translate_frontmatter", file=rel_path):
+                frontmatter = translate_frontmatter(frontmatter, translator.translate_text, target_language, system_prompt, rel_path)
         
         # Разбиваем содержимое на части с учетом MAX_TOKENS
-        parts = split_content(main_content, max_tokens)
+        with span("split_content", file=rel_path):
+            parts = split_content(main_content, get_part_token_limit(CONFIG, [target_language], max_tokens))
         
         # Переводим каждую часть с использованием контекста между частями
         translated_parts = []
         context = {
             "translated_terms": {},
             "part_number": 1,
-            "total_tokens": 0
+            "total_tokens": 0,
+            "file_path": rel_path
         }
         
         for i, part in enumerate(parts):
-            log_info(f"Перевод части {i+1}/{len(parts)} файла {rel_path}")
-            translated_part, context = translator.translate_text(part, target_language, system_prompt, context)
+            log_info("Перевод части %d/%d файла %s", i + 1, len(parts), rel_path,
+                     file=rel_path, lang=target_language, part=i + 1)
+            with span("translate_part", file=rel_path, part=i+1):
+                translated_part, context = translator.translate_text(part, target_language, system_prompt, context)
             translated_parts.append(translated_part)
         
+        # Повторно переводим части, в которых осталась кириллица (сбой перевода части)
+        cyrillic_config = CONFIG.get("cyrillic_check", {})
+        if cyrillic_config.get("enabled", True):
+            with span("cyrillic_check", file=rel_path):
+                translated_parts = repair_translated_parts(
+                    parts, translated_parts, translator.translate_text, target_language, system_prompt, context,
+                    rel_path, cyrillic_config.get("min_run_length", 10)
+                )
+        
         # Объединяем переведенные части
         translated_content = '\n\n'.join(translated_parts)
         
@@ -98,16 +121,34 @@ def process_file(file_path: str, rel_path: str, output_dir: str, target_language
             translated_content = restore_frontmatter(frontmatter, translated_content)
         
         # Сохраняем переведенный файл
-        with open(output_file_path, 'w', encoding='utf-8') as file:
-            file.write(translated_content)
+        with span("write", file=rel_path):
+            with open(output_file_path, 'w', encoding='utf-8') as file:
+                file.write(translated_content)
         
-        log_info(f"Файл переведен и сохранен: {output_file_path}")
+        log_info("Файл переведен и сохранен: %s", output_file_path, file=rel_path, lang=target_language)
         return True
     
     except Exception as e:
-        log_error(f"Ошибка при обработке файла {rel_path}: {str(e)}")
+        log_error("Ошибка при обработке файла %s: %s", rel_path, e, file=rel_path, lang=target_language)
         return False
 
+def collect_files(input_dir: str) -> List[Tuple[str, str]]:
+    """
+    Собирает все файлы директории и поддиректорий.
+    
+    Args:
+        input_dir: Входная директория
+        
+    Returns:
+        List[Tuple[str, str]]: Пары (путь к файлу, путь относительно input_dir) в стабильном порядке
+    """
+    all_files = []
+    for root, _, files in os.walk(input_dir):
+        for file in sorted(files):  # Сортируем для стабильного порядка обработки
+            file_path = os.path.join(root, file)
+            all_files.append((file_path, os.path.relpath(file_path, input_dir)))
+    return all_files
+
 def process_directory(input_dir: str, output_dir: str, target_language: str, 
                      translator: Translator, max_tokens: int, max_workers: int) -> int:
     """
@@ -122,12 +163,8 @@ def process_directory(input_dir: str, output_dir: str, target_language: str,
         max_workers: Максимальное количество потоков
     """
     # Получаем список всех файлов в директории и поддиректориях
-    all_files = []
-    for root, _, files in os.walk(input_dir):
-        for file in sorted(files):  # Сортируем для стабильного порядка обработки
-            file_path = os.path.join(root, file)
-            rel_path = os.path.relpath(file_path, input_dir)
-            all_files.append((file_path, rel_path))
+    with span("walk", directory=input_dir):
+        all_files = collect_files(input_dir)
     
     log_info(f"Найдено {len(all_files):,} файлов для обработки")
     
@@ -139,7 +176,8 @@ def process_directory(input_dir: str, output_dir: str, target_language: str,
     total_tokens_for_lang = 0
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         futures = [
-            executor.submit(process_file, args[0], args[1], output_dir, target_language, translator, max_tokens)
+            executor.submit(get_profiler().profile_thread(process_file),
+                            args[0], args[1], output_dir, target_language, translator, max_tokens)
             for args in all_files
         ]
         results = [f.result() for f in futures] # Используем f.result() для получения результатов или исключений
@@ -168,26 +206,42 @@ def parse_arguments():
     parser.add_argument('--log_level', type=str, default='INFO', 
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Уровень логирования')
     parser.add_argument('--log_file', type=str, help='Файл для сохранения логов')
+    parser.add_argument('--log_format', type=str, default='text', choices=['text', 'json'],
+                        help='Формат логов: text или json (JSON Lines с полями file, lang, part)')
     parser.add_argument('--max_workers', type=int, help='Количество параллельных потоков')
     parser.add_argument('--max_tokens', type=int, help='Максимальное количество токенов для разбиения')
+    parser.add_argument('--repair_cyrillic', action='store_true',
+                        help='Найти в уже переведенных файлах оставшуюся кириллицу и перевести повторно только эти фрагменты')
+    parser.add_argument('--plan', action='store_true',
+                        help='Оценить запуск без обращения к API: части, токены, стоимость и время')
+    add_profiling_arguments(parser)
+    add_backend_arguments(parser)
     return parser.parse_args()
 
-# Загрузка переменных окружения
-load_dotenv()
-
-# Глобальная конфигурация
-CONFIG = load_config()
+# Глобальная конфигурация (загружается в main(), импорт модуля не читает файлы)
+CONFIG: Dict[str, Any] = {}
 
 def main():
     """Основная функция для запуска процесса перевода."""
-    global global_total_tokens_processed # Используем глобальный счетчик
+    global global_total_tokens_processed, CONFIG # Используем глобальный счетчик и конфигурацию
     global_total_tokens_processed = 0    # Сбрасываем перед запуском
     
+    # Загрузка переменных окружения и конфигурации
+    load_dotenv()
+    CONFIG = load_config()
+    
     # Разбор аргументов командной строки
     args = parse_arguments()
     
     # Настройка логирования
-    setup_logging(args.log_level, args.log_file)
+    setup_logging(args.log_level, args.log_file, args.log_format)
+    
+    # Метрики запросов к API (metrics/requests_<месяц>.jsonl и metrics/translate.prom)
+    metrics = init_metrics("translate", CONFIG.get("metrics", {}))
+    init_translation_memory(CONFIG.get("translation_memory"), resolve_backend(CONFIG.get("api", {}), args.backend))
+    
+    # Профилирование этапов (--profile, --profile_cprofile, --profile_tracemalloc)
+    profiler = init_profiling("translate", args.profile, args.profile_cprofile, args.profile_tracemalloc, args.profile_dir)
     
     # Получаем параметры из конфигурации и аргументов
     input_dir = args.input_dir
@@ -218,19 +272,38 @@ def main():
     # Загрузка глоссария
     glossary = load_glossary()
     
-    # Инициализация клиента OpenAI (делаем один раз)
-    client = OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=CONFIG.get("api", {}).get("base_url", os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
-    )
+    # Режим --plan: оценка без обращения к API
+    if args.plan:
+        model_name = CONFIG.get("api", {}).get("model_name", os.getenv("MODEL_NAME", "gpt-4o-mini"))
+        planner = TranslationPlanner(CONFIG, glossary, model_name, max_tokens,
+                                     create_model_router(CONFIG, model_name, glossary))
+        log_plan(planner.plan(collect_files(input_dir), target_languages, max_workers))
+        return
+    
+    # Инициализация клиента OpenAI (делаем один раз): общий пул соединений на max_workers потоков;
+    # --backend record/replay - запись и воспроизведение ответов
+    client = create_client(CONFIG, max_workers, args.backend, args.cassette, args.replay_latency)
     model_name = CONFIG.get("api", {}).get("model_name", os.getenv("MODEL_NAME", "gpt-4o-mini"))
+    # Быстрая модель для простых фрагментов (секция routing), None - все фрагменты в model_name
+    router = create_model_router(CONFIG, model_name, glossary)
     
     # Цикл по целевым языкам
     for target_language in target_languages:
         log_info(f"Начинаем перевод файлов из '{input_dir}' на язык '{target_language}'")
         
         # Создаем экземпляр переводчика для каждого языка (чтобы счетчик токенов был свой)
-        translator = Translator(client, model_name, glossary)
+        translator = Translator(client, model_name, glossary, CONFIG.get("prompt_improvements", {}), router)
+        
+        # Режим исправления: переводим повторно только фрагменты с оставшейся кириллицей
+        if args.repair_cyrillic:
+            files_with_hits, repaired = repair_directory(
+                input_dir, os.path.join(output_dir, target_language), translator.translate_text, target_language,
+                get_system_prompt(CONFIG, target_language), get_part_token_limit(CONFIG, [target_language], max_tokens),
+                max_workers, CONFIG.get("cyrillic_check", {}).get("min_run_length", 10)
+            )
+            log_info(f"[{target_language}] Исправлено фрагментов: {repaired} в {files_with_hits} файлах")
+            global_total_tokens_processed += translator.get_total_tokens()
+            continue
         
         # Запускаем обработку директории для текущего языка
         tokens_for_lang = process_directory(input_dir, output_dir, target_language, translator, max_tokens, max_workers)
@@ -240,6 +313,11 @@ def main():
 
     log_info("Весь процесс перевода завершен.")
     log_info(f"Итого обработано токенов по всем языкам: ~{int(global_total_tokens_processed):,}")
+    if router:
+        router.log_summary()
+    log_translation_memory_summary()
+    metrics.finish()
+    profiler.finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
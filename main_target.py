@@ -1,21 +1,29 @@
 import os
 import re
+import time
 import argparse
 import subprocess
 import shutil
 import concurrent.futures
 from pathlib import Path
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Импортируем наши утилиты
 from utils import (
     log_info, log_error, log_warning, setup_logging,
-    load_config, get_system_prompt, load_glossary,
-    is_binary_file, extract_frontmatter, restore_frontmatter, split_content,
-    translate_frontmatter, Translator, get_changed_files_in_dir # Добавили get_changed_files_in_dir
+    load_config, get_system_prompt, get_part_token_limit, load_glossary,
+    is_binary_file, remove_local_text, extract_frontmatter, restore_frontmatter, split_content,
+    set_frontmatter_field, write_file_atomic,
+    translate_frontmatter, Translator, get_changes_in_dir, get_changes_between, GitBlobReader, find_moved_files,
+    repair_translated_parts, repair_directory
 )
+from utils.metrics import init_metrics
+from utils.translation_memory import init_translation_memory, log_translation_memory_summary
+from utils.profiling import init_profiling, get_profiler, span, add_profiling_arguments
+from utils.replay import add_backend_arguments, resolve_backend
+from utils.model_router import create_model_router
+from utils.watcher import DirectoryWatcher
 
 # Константы для директорий языков относительно корня репозитория книги
 # Используем POSIX-разделители, т.к. они часто используются в конфигурациях и Git
@@ -26,21 +34,31 @@ LANG_DIRS = {
     'zh': 'i18n/zh/docusaurus-plugin-content-docs/current'
 }
 
+# Поле фронтматтера с уровнем перевода в режиме --draft (draft - черновик быстрой модели, final - итоговый)
+TIER_FIELD = "translation_tier"
+
 # Глобальная конфигурация (загружается позже в main)
 CONFIG = {}
 
-def process_changed_file(
+# Источник содержимого RU файлов в режиме --since (объекты Git); None - файлы рабочей копии
+SOURCE_READER: Optional[GitBlobReader] = None
+
+def translate_changed_file(
     ru_file_path: str, # Полный путь к исходному RU файлу
     rel_path: str, # Путь относительно базовой директории RU (с POSIX разделителями)
     target_language: str,
     book_repo_path: str, # Абсолютный путь к корню репозитория книги
     translator: Translator,
     max_tokens: int,
-    system_prompt: str  # Передаем готовый системный промпт
-) -> bool:
+    system_prompt: str,  # Передаем готовый системный промпт
+    tier: Optional[str] = None,
+    drafts: Optional[List[str]] = None,
+    translations: Optional[List[Optional[str]]] = None
+) -> Optional[List[str]]:
     """
     Обрабатывает один измененный файл: переводит (.md/.mdx) или копирует остальные.
     Сохраняет результат непосредственно в целевую языковую директорию внутри репозитория книги.
+    Файл заменяется атомарно, поэтому сайт никогда не видит частично записанный перевод.
 
     Args:
         ru_file_path: Полный абсолютный путь к исходному файлу на русском.
@@ -50,15 +68,18 @@ def process_changed_file(
         translator: Экземпляр класса Translator.
         max_tokens: Максимальное количество токенов для разбиения контента.
         system_prompt: Системный промпт для данной языковой пары.
+        tier: Уровень перевода для поля translation_tier во фронтматтере (draft, final; None - без поля).
+        drafts: Черновые переводы частей, которые уточняет этот перевод (режим --draft).
+        translations: Готовые переводы частей (режим --multi_target); части с None переводятся здесь.
     
     Возвращает:
-        bool: True, если обработка прошла успешно, иначе False.
+        Optional[List[str]]: Переведенные части (пустой список для скопированных файлов) или None при ошибке.
     """
     try:
         target_lang_dir_rel = LANG_DIRS.get(target_language)
         if not target_lang_dir_rel:
             log_error(f"Не найден путь для целевого языка: {target_language}")
-            return False
+            return None
 
         # Формируем абсолютный путь к целевой директории и файлу
         target_base_dir = os.path.join(book_repo_path, target_lang_dir_rel)
@@ -68,88 +89,532 @@ def process_changed_file(
         # Создаем родительские директории для выходного файла, если они не существуют
         os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
 
+        # В режиме --since содержимое берется из объекта Git, а не из рабочей копии
+        source_data = None
+        if SOURCE_READER is not None:
+            with span("read", file=rel_path):
+                source_data = SOURCE_READER.read(rel_path)
+            if source_data is None:
+                log_error("[%s] Не удалось прочитать %s из ревизии %s", target_language, rel_path,
+                          SOURCE_READER.commit[:12], file=rel_path, lang=target_language)
+                return None
+
         # Определяем, нужно ли переводить файл
-        should_translate = ru_file_path.lower().endswith(('.md', '.mdx')) and not is_binary_file(ru_file_path)
+        with span("is_binary_file", file=rel_path):
+            should_translate = ru_file_path.lower().endswith(('.md', '.mdx'))
+            if should_translate and source_data is not None:
+                try:
+                    source_text = source_data.decode('utf-8')
+                except UnicodeDecodeError:
+                    should_translate = False
+            elif should_translate:
+                should_translate = not is_binary_file(ru_file_path)
 
         if not should_translate:
-            log_info(f"[{target_language}] Копирование файла: {rel_path}")
-            shutil.copy2(ru_file_path, output_file_path) # Копируем с сохранением метаданных
-            return True
+            log_info("[%s] Копирование файла: %s", target_language, rel_path, file=rel_path, lang=target_language)
+            if source_data is not None:
+                write_file_atomic(output_file_path, source_data)
+            else:
+                shutil.copy2(ru_file_path, output_file_path) # Копируем с сохранением метаданных
+            return []
 
         # --- Обработка .md / .mdx файла (перевод) ---
-        log_info(f"[{target_language}] Перевод файла: {rel_path}")
+        log_info("[%s] Перевод файла: %s", target_language, rel_path, file=rel_path, lang=target_language)
         
         try:
-            with open(ru_file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            if source_data is not None:
+                content = source_text
+            else:
+                with span("read", file=rel_path):
+                    with open(ru_file_path, 'r', encoding='utf-8') as file:
+                        content = file.read()
         except Exception as e:
-             log_error(f"[{target_language}] Ошибка чтения файла {ru_file_path}: {e}")
-             return False
+             log_error("[%s] Ошибка чтения файла %s: %s", target_language, ru_file_path, e, file=rel_path, lang=target_language)
+             return None
 
-        # Регулярное выражение для поиска блоков LOCAL TEXT
-        # Используем r-string и экранируем метасимволы: {, }, *, /
-        local_text_pattern = r"\{\s*\/\*\s*LOCAL TEXT START\s*\*\/\s*\}(.*?)\{\s*\/\*\s*LOCAL TEXT END\s*\*\/\s*\}"
-        
         # Удаляем блоки LOCAL TEXT перед дальнейшей обработкой
-        # Используем флаг re.DOTALL, чтобы '.' соответствовал и переносам строк
-        content = re.sub(local_text_pattern, "", content, flags=re.DOTALL | re.IGNORECASE)
+        with span("remove_local_text", file=rel_path):
+            content = remove_local_text(content)
 
         # Извлекаем фронтматтер
-        has_frontmatter, frontmatter, main_content = extract_frontmatter(content)
+        with span("extract_frontmatter", file=rel_path):
+            has_frontmatter, frontmatter, main_content = extract_frontmatter(content)
 
         # Переводим фронтматтер, если он есть
         if has_frontmatter and frontmatter:
-            log_info(f"[{target_language}] Перевод frontmatter для {rel_path}")
+            log_info("[%s] Перевод frontmatter для %s", target_language, rel_path, file=rel_path, lang=target_language)
             try:
-                frontmatter = translate_frontmatter(frontmatter, translator.translate_text, target_language, system_prompt)
+                with span("translate_frontmatter", file=rel_path):
+                    frontmatter = translate_frontmatter(frontmatter, translator.translate_text, target_language, system_prompt, rel_path)
             except Exception as e:
-                log_error(f"[{target_language}] Ошибка перевода frontmatter для {rel_path}: {e}")
+                log_error("[%s] Ошибка перевода frontmatter для %s: %s", target_language, rel_path, e, file=rel_path, lang=target_language)
                 # Решаем продолжать без переведенного frontmatter или вернуть ошибку
                 # Пока что продолжаем, но можно изменить логику
                 pass # Оставляем исходный frontmatter
 
-        # Разбиваем основной контент на части
-        parts = split_content(main_content, max_tokens)
+        # Разбиваем основной контент на части (перевод части должен поместиться в лимит ответа модели)
+        with span("split_content", file=rel_path):
+            parts = split_content(main_content, get_part_token_limit(CONFIG, [target_language], max_tokens))
         translated_parts = []
         # Контекст сбрасывается для каждого файла, но сохраняется между частями одного файла
-        context = {"translated_terms": {}, "part_number": 1, "total_tokens": 0} 
+        context = {"translated_terms": {}, "part_number": 1, "total_tokens": 0, "file_path": rel_path}
+
+        # Черновики используются, только если исходный файл не изменился после чернового перевода
+        if drafts is not None and len(drafts) != len(parts):
+            log_warning(f"[{target_language}] Исходный файл {rel_path} изменился после чернового перевода, перевод без черновика")
+            drafts = None
+        if translations is not None and len(translations) != len(parts):
+            translations = None
 
         for i, part in enumerate(parts):
-            log_info(f"[{target_language}] Перевод части {i+1}/{len(parts)} файла {rel_path}")
+            if translations is not None and translations[i] is not None:
+                # Часть уже переведена общим запросом на все языки
+                translated_parts.append(translations[i])
+                context["part_number"] += 1
+                continue
+            log_info("[%s] Перевод части %d/%d файла %s", target_language, i + 1, len(parts), rel_path,
+                     file=rel_path, lang=target_language, part=i + 1)
             try:
+                if drafts is not None:
+                    context["draft"] = drafts[i]
                 # Передаем контекст, он обновляется внутри метода
-                translated_part, context = translator.translate_text(part, target_language, system_prompt, context)
+                with span("translate_part", file=rel_path, part=i+1):
+                    translated_part, context = translator.translate_text(part, target_language, system_prompt, context)
                 translated_parts.append(translated_part)
             except Exception as e:
-                 log_error(f"[{target_language}] Ошибка перевода части {i+1} файла {rel_path}: {e}")
+                 log_error("[%s] Ошибка перевода части %d файла %s: %s", target_language, i + 1, rel_path, e,
+                           file=rel_path, lang=target_language, part=i + 1)
                  # Пропускаем эту часть или прерываем обработку файла?
                  # Пока пропустим часть, чтобы попытаться сохранить остальное
                  translated_parts.append(f"[ОШИБКА ПЕРЕВОДА ЧАСТИ {i+1}: {e}]") # Добавляем заглушку об ошибке
+        context.pop("draft", None)
+
+        # Повторно переводим части, в которых осталась кириллица или заглушка об ошибке
+        # (черновик не проверяется: его уточнит основная модель)
+        cyrillic_config = CONFIG.get("cyrillic_check", {})
+        if cyrillic_config.get("enabled", True) and tier != "draft":
+            with span("cyrillic_check", file=rel_path):
+                translated_parts = repair_translated_parts(
+                    parts, translated_parts, translator.translate_text, target_language, system_prompt, context,
+                    rel_path, cyrillic_config.get("min_run_length", 10)
+                )
 
         # Объединяем переведенные части
         translated_content = '\n\n'.join(translated_parts)
 
+        # Отмечаем во фронтматтере, какой уровень перевода записан в файл
+        if tier:
+            frontmatter = set_frontmatter_field(frontmatter if has_frontmatter else None, TIER_FIELD, tier)
+            has_frontmatter = True
+
         # Восстанавливаем фронтматтер, если он был (даже если не перевелся)
         if has_frontmatter:
             translated_content = restore_frontmatter(frontmatter, translated_content)
 
         # Сохраняем переведенный файл
         try:
-            with open(output_file_path, 'w', encoding='utf-8') as file:
-                file.write(translated_content)
-            log_info(f"[{target_language}] Файл переведен и сохранен: {output_file_path}")
-            return True
+            with span("write", file=rel_path):
+                write_file_atomic(output_file_path, translated_content)
+            log_info("[%s] Файл переведен и сохранен%s: %s", target_language, f' ({tier})' if tier else '',
+                     output_file_path, file=rel_path, lang=target_language)
+            return translated_parts
         except Exception as e:
-            log_error(f"[{target_language}] Ошибка сохранения файла {output_file_path}: {e}")
-            return False
+            log_error("[%s] Ошибка сохранения файла %s: %s", target_language, output_file_path, e, file=rel_path, lang=target_language)
+            return None
 
     except Exception as e:
         # Ловим общие ошибки на уровне файла
-        log_error(f"[{target_language}] Общая ошибка при обработке файла {rel_path}: {str(e)}")
+        log_error("[%s] Общая ошибка при обработке файла %s: %s", target_language, rel_path, e, file=rel_path, lang=target_language)
         # Здесь можно добавить traceback для детальной отладки, если нужно
         # import traceback
         # log_error(traceback.format_exc())
-        return False
+        return None
+
+def process_changed_file(
+    ru_file_path: str,
+    rel_path: str,
+    target_language: str,
+    book_repo_path: str,
+    translator: Translator,
+    max_tokens: int,
+    system_prompt: str
+) -> bool:
+    """
+    Обрабатывает один измененный файл (см. translate_changed_file).
+
+    Возвращает:
+        bool: True, если обработка прошла успешно, иначе False.
+    """
+    return translate_changed_file(ru_file_path, rel_path, target_language, book_repo_path,
+                                  translator, max_tokens, system_prompt) is not None
+
+def _source_parts(ru_file_path: str, rel_path: str, max_tokens: int) -> Optional[List[str]]:
+    """
+    Читает исходный файл и разбивает основной контент на части так же, как translate_changed_file.
+
+    Returns:
+        Optional[List[str]]: Части файла или None для файлов, которые копируются без перевода
+    """
+    if not ru_file_path.lower().endswith(('.md', '.mdx')):
+        return None
+    if SOURCE_READER is not None:
+        source_data = SOURCE_READER.read(rel_path)
+        try:
+            content = source_data.decode('utf-8') if source_data is not None else None
+        except UnicodeDecodeError:
+            content = None
+    elif is_binary_file(ru_file_path):
+        content = None
+    else:
+        with open(ru_file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+    if content is None:
+        return None
+    _, _, main_content = extract_frontmatter(remove_local_text(content))
+    return split_content(main_content, max_tokens)
+
+def translate_changed_file_multi(
+    ru_file_path: str,
+    rel_path: str,
+    target_languages: List[str],
+    book_repo_path: str,
+    translator: Translator,
+    max_tokens: int,
+    system_prompts: Dict[str, str]
+) -> Dict[str, bool]:
+    """
+    Переводит файл на все языки одним запросом на часть (режим --multi_target).
+
+    Каждая часть отправляется в API один раз (Translator.translate_text_multi), затем
+    для каждого языка файл собирается и записывается translate_changed_file с готовыми
+    переводами частей. Фронтматтер, части, отсутствующие в ответе, и исправление
+    кириллицы переводятся запросами отдельного языка.
+
+    Args:
+        ru_file_path: Полный путь к исходному RU файлу
+        rel_path: Путь относительно RU директории
+        target_languages: Целевые языки
+        book_repo_path: Корень книги для записи переводов
+        translator: Переводчик
+        max_tokens: Максимальное количество токенов для разбиения
+        system_prompts: Системные промпты по языкам
+
+    Returns:
+        Dict[str, bool]: Успешность обработки по языкам
+    """
+    translations: Dict[str, List[Optional[str]]] = {lang: [] for lang in target_languages}
+    # Ответ содержит переводы на все языки, поэтому части меньше, чем при переводе на один язык
+    max_tokens = get_part_token_limit(CONFIG, target_languages, max_tokens)
+    try:
+        with span("read", file=rel_path):
+            parts = _source_parts(ru_file_path, rel_path, max_tokens)
+        if parts and len(target_languages) > 1:
+            contexts = {lang: {"translated_terms": {}, "part_number": 1, "total_tokens": 0, "file_path": rel_path}
+                        for lang in target_languages}
+            for i, part in enumerate(parts):
+                log_info("[%s] Перевод части %d/%d файла %s", "+".join(target_languages), i + 1, len(parts), rel_path,
+                         file=rel_path, part=i + 1)
+                with span("translate_part", file=rel_path, part=i + 1):
+                    results = translator.translate_text_multi(part, target_languages, system_prompts, contexts)
+                for lang in target_languages:
+                    translations[lang].append(results.get(lang))
+    except Exception as e:
+        # Файл будет переведен для каждого языка отдельно
+        log_error("Ошибка перевода файла %s на несколько языков: %s", rel_path, e, file=rel_path)
+        translations = {lang: [] for lang in target_languages}
+
+    return {
+        lang: translate_changed_file(ru_file_path, rel_path, lang, book_repo_path, translator, max_tokens,
+                                     system_prompts[lang], translations=translations[lang] or None) is not None
+        for lang in target_languages
+    }
+
+def run_multi_target(
+    tasks: List[Tuple[str, str]],
+    target_languages: List[str],
+    book_repo_path: str,
+    translator: Translator,
+    max_tokens: int,
+    max_workers: int
+) -> Dict[str, List[str]]:
+    """
+    Переводит файлы на все языки одним запросом на часть (см. translate_changed_file_multi).
+
+    Args:
+        tasks: Пары (полный путь к RU файлу, путь относительно RU директории)
+        target_languages: Целевые языки
+        book_repo_path: Корень книги для записи переводов
+        translator: Переводчик
+        max_tokens: Максимальное количество токенов для разбиения
+        max_workers: Количество потоков
+
+    Returns:
+        Dict[str, List[str]]: Файлы, которые не удалось перевести, по языкам
+    """
+    system_prompts = {lang: get_system_prompt(CONFIG, lang) for lang in target_languages}
+    failed_files: Dict[str, List[str]] = {lang: [] for lang in target_languages}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="multi") as executor:
+        futures = {
+            executor.submit(get_profiler().profile_thread(translate_changed_file_multi), ru_path, rel_path,
+                            target_languages, book_repo_path, translator, max_tokens, system_prompts): rel_path
+            for ru_path, rel_path in tasks
+        }
+        for future in concurrent.futures.as_completed(futures):
+            rel_path = futures[future]
+            try:
+                results = future.result()
+            except Exception as exc:
+                log_error("Необработанное исключение при обработке файла %s: %s", rel_path, exc, file=rel_path)
+                results = {}
+            for lang in target_languages:
+                if not results.get(lang):
+                    failed_files[lang].append(rel_path)
+    return failed_files
+
+def _remove_empty_dirs(directory: Path, root: Path) -> None:
+    """Удаляет пустые директории от directory вверх до root (не включая root)."""
+    while directory != root and root in directory.parents:
+        try:
+            directory.rmdir()
+        except OSError:
+            return
+        directory = directory.parent
+
+def apply_renames_and_deletions(
+    changes: Dict[str, List],
+    target_languages: List[str],
+    book_repo_path: Path,
+    dry_run: bool = False
+) -> List[str]:
+    """
+    Переносит изменения структуры RU директории на переводы без обращения к API.
+
+    Для переименованных исходных файлов перевод перемещается под новый путь в
+    директории каждого языка, для удаленных - удаляется. Опустевшие директории
+    переводов удаляются.
+
+    Args:
+        changes: Изменения RU директории (результат get_changes_in_dir)
+        target_languages: Целевые языки
+        book_repo_path: Абсолютный путь к корню репозитория книги
+        dry_run: Только показать операции, не изменяя файлы (режим --plan)
+
+    Returns:
+        List[str]: Новые пути переименованных файлов, перевод которых отсутствует
+        хотя бы для одного языка (их нужно перевести)
+    """
+    missing = set()
+    for lang in target_languages:
+        target_root = book_repo_path / LANG_DIRS[lang]
+        moved = removed = 0
+        for old_rel, new_rel in changes["renamed"]:
+            old_path, new_path = target_root / old_rel, target_root / new_rel
+            if not old_path.is_file():
+                if new_path.is_file():
+                    # Перевод уже перемещен предыдущим запуском (переименование еще не закоммичено)
+                    continue
+                log_warning("[%s] Перевод %s не найден, файл %s будет переведен", lang, old_rel, new_rel,
+                            file=new_rel, lang=lang)
+                missing.add(new_rel)
+                continue
+            log_info("[%s] Перемещение перевода: %s -> %s", lang, old_rel, new_rel, file=new_rel, lang=lang)
+            if dry_run:
+                continue
+            try:
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(old_path, new_path)
+                _remove_empty_dirs(old_path.parent, target_root)
+                moved += 1
+            except OSError as e:
+                log_error("[%s] Не удалось переместить перевод %s: %s", lang, old_rel, e, file=old_rel, lang=lang)
+                missing.add(new_rel)
+        for rel_path in changes["deleted"]:
+            path = target_root / rel_path
+            if not path.is_file():
+                continue
+            log_info("[%s] Удаление перевода: %s", lang, rel_path, file=rel_path, lang=lang)
+            if dry_run:
+                continue
+            try:
+                path.unlink()
+                _remove_empty_dirs(path.parent, target_root)
+                removed += 1
+            except OSError as e:
+                log_error("[%s] Не удалось удалить перевод %s: %s", lang, rel_path, e, file=rel_path, lang=lang)
+        if moved or removed:
+            log_info("[%s] Перемещено переводов: %d, удалено: %d", lang, moved, removed, lang=lang)
+    return sorted(missing)
+
+def run_draft_and_refine(
+    tasks: List[Tuple[str, str]],
+    target_language: str,
+    book_repo_path: str,
+    draft_translator: Translator,
+    final_translator: Translator,
+    max_tokens: int,
+    system_prompt: str,
+    max_workers: int
+) -> Tuple[int, List[str]]:
+    """
+    Двухуровневый перевод: сначала быстрый черновик каждого файла, затем уточнение основной моделью.
+
+    Черновики записываются сразу по готовности; уточнение файла запускается в отдельном
+    пуле потоков, как только готов его черновик, и получает черновые части как основу.
+    Итоговый перевод атомарно заменяет черновик.
+
+    Args:
+        tasks: Пары (полный путь к RU файлу, путь относительно RU директории)
+        target_language: Код целевого языка
+        book_repo_path: Абсолютный путь к корню репозитория книги
+        draft_translator: Переводчик быстрой модели
+        final_translator: Переводчик основной модели
+        max_tokens: Максимальное количество токенов для разбиения
+        system_prompt: Системный промпт для языка
+        max_workers: Количество потоков в каждом из пулов
+
+    Returns:
+        Tuple[int, List[str]]: (количество успешно переведенных файлов, файлы с ошибками)
+    """
+    profiler = get_profiler()
+    started = time.perf_counter()
+    success_count = 0
+    failed_files = []
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="draft") as draft_executor, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refine") as refine_executor:
+        draft_futures = {
+            draft_executor.submit(profiler.profile_thread(translate_changed_file), ru_path, rel_path, target_language,
+                                  book_repo_path, draft_translator, max_tokens, system_prompt, "draft"): (ru_path, rel_path)
+            for ru_path, rel_path in tasks
+        }
+
+        refine_futures = {}
+        for future in concurrent.futures.as_completed(draft_futures):
+            ru_path, rel_path = draft_futures[future]
+            try:
+                draft_parts = future.result()
+            except Exception as exc:
+                log_error(f"[{target_language}] Необработанное исключение при черновом переводе {rel_path}: {exc}")
+                draft_parts = None
+
+            if draft_parts == []:
+                # Файл скопирован без перевода, уточнять нечего
+                success_count += 1
+                continue
+            # Если черновик не удался, основная модель переводит файл с нуля
+            refine_futures[refine_executor.submit(
+                profiler.profile_thread(translate_changed_file), ru_path, rel_path, target_language, book_repo_path,
+                final_translator, max_tokens, system_prompt, "final", draft_parts
+            )] = rel_path
+
+        log_info(f"[{target_language}] Черновые переводы готовы за {time.perf_counter() - started:.1f} с, "
+                 f"уточнение основной моделью: {len(refine_futures)} файлов")
+
+        for future in concurrent.futures.as_completed(refine_futures):
+            rel_path = refine_futures[future]
+            try:
+                if future.result() is not None:
+                    success_count += 1
+                else:
+                    failed_files.append(rel_path)
+            except Exception as exc:
+                log_error(f"[{target_language}] Необработанное исключение при уточнении перевода {rel_path}: {exc}")
+                failed_files.append(rel_path)
+
+    log_info(f"[{target_language}] Итоговые переводы готовы за {time.perf_counter() - started:.1f} с")
+    return success_count, failed_files
+
+def watch_and_translate(watcher: DirectoryWatcher, target_languages: List[str], book_repo_path: str,
+                        translators: Dict[str, Translator], max_tokens: int, max_workers: int,
+                        draft_translators: Optional[Dict[str, Tuple[Translator, Translator]]] = None,
+                        multi_translator: Optional[Translator] = None,
+                        output_root: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Переводит файлы RU директории по мере их сохранения (режим --watch).
+
+    Клиент API, переводчики (глоссарий в виде промпта, маршрутизатор) и кэши улучшений
+    промптов остаются в памяти между событиями, поэтому перевод начинается сразу после
+    паузы в сохранениях. Обрабатываются только файлы из пачки изменений, все языки
+    пачки переводятся одним пулом потоков. Удаленный исходный файл, содержимое которого
+    совпадает с новым файлом той же пачки, считается перемещением: переводы переносятся
+    без обращения к API; переводы остальных удаленных файлов удаляются. Работает до Ctrl+C.
+
+    Args:
+        watcher: Наблюдатель за RU директорией
+        target_languages: Целевые языки
+        book_repo_path: Абсолютный путь к корню репозитория книги (источник RU файлов)
+        translators: Переводчики по языкам
+        max_tokens: Максимальное количество токенов для разбиения
+        max_workers: Количество потоков
+        draft_translators: Пары (черновой, итоговый) переводчиков по языкам для режима --draft
+        multi_translator: Переводчик режима --multi_target (один запрос на часть для всех языков)
+        output_root: Корень книги для записи переводов (по умолчанию book_repo_path, см. --output_dir)
+
+    Returns:
+        Dict[str, List[str]]: Файлы, которые не удалось перевести, по языкам
+    """
+    ru_dir_abs = os.path.join(book_repo_path, LANG_DIRS['ru'])
+    output_root = output_root or book_repo_path
+    system_prompts = {lang: get_system_prompt(CONFIG, lang) for lang in target_languages}
+    failed_files: Dict[str, List[str]] = {lang: [] for lang in target_languages}
+    # Хэши содержимого RU файлов, сохраненных во время наблюдения (для поиска перемещений)
+    known_hashes: Dict[str, str] = {}
+    log_info("Ожидание изменений (Ctrl+C - выход)")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="watch") as executor:
+        for changed, deleted in watcher.batches():
+            moves = find_moved_files(book_repo_path, LANG_DIRS['ru'], deleted, changed, known_hashes)
+            if deleted:
+                changes = {"changed": [], "renamed": sorted((old, new) for new, old in moves.items()),
+                           "deleted": sorted(deleted - set(moves.values()))}
+                missing = apply_renames_and_deletions(changes, target_languages, Path(output_root))
+                # Перемещенный без изменений файл не переводится, если перевод перенесен для всех языков
+                changed = (set(changed) - set(moves)) | set(missing)
+            if not changed:
+                continue
+
+            rel_paths = sorted(changed)
+            started = time.perf_counter()
+            log_info("Изменено файлов: %d (%s)", len(rel_paths), ", ".join(rel_paths[:5]) + (" ..." if len(rel_paths) > 5 else ""))
+            batch_failed = 0
+            if draft_translators:
+                for lang in target_languages:
+                    draft_translator, final_translator = draft_translators[lang]
+                    _, lang_failed = run_draft_and_refine(
+                        [(os.path.join(ru_dir_abs, rel_path), rel_path) for rel_path in rel_paths], lang,
+                        output_root, draft_translator, final_translator, max_tokens, system_prompts[lang], max_workers
+                    )
+                    failed_files[lang].extend(lang_failed)
+                    batch_failed += len(lang_failed)
+            elif multi_translator is not None:
+                batch_results = run_multi_target(
+                    [(os.path.join(ru_dir_abs, rel_path), rel_path) for rel_path in rel_paths], target_languages,
+                    output_root, multi_translator, max_tokens, max_workers
+                )
+                for lang, lang_failed in batch_results.items():
+                    failed_files[lang].extend(lang_failed)
+                    batch_failed += len(lang_failed)
+            else:
+                futures = {
+                    executor.submit(get_profiler().profile_thread(process_changed_file),
+                                    os.path.join(ru_dir_abs, rel_path), rel_path, lang, output_root,
+                                    translators[lang], max_tokens, system_prompts[lang]): (lang, rel_path)
+                    for lang in target_languages for rel_path in rel_paths
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    lang, rel_path = futures[future]
+                    try:
+                        success = future.result()
+                    except Exception as exc:
+                        log_error("[%s] Необработанное исключение при обработке файла %s: %s", lang, rel_path, exc,
+                                  file=rel_path, lang=lang)
+                        success = False
+                    if not success:
+                        failed_files[lang].append(rel_path)
+                        batch_failed += 1
+            log_info("Переводы обновлены за %.1f с (файлов: %d, языков: %d, ошибок: %d)",
+                     time.perf_counter() - started, len(rel_paths), len(target_languages), batch_failed)
+    return failed_files
 
 def parse_arguments():
     """Разбирает аргументы командной строки."""
@@ -161,24 +626,46 @@ def parse_arguments():
     parser.add_argument('--log_level', type=str, default='INFO',
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Уровень логирования')
     parser.add_argument('--log_file', type=str, help='Файл для сохранения логов')
+    parser.add_argument('--log_format', type=str, default='text', choices=['text', 'json'],
+                        help='Формат логов: text или json (JSON Lines с полями file, lang, part)')
     parser.add_argument('--max_workers', type=int, help="Количество параллельных потоков (default из config.yml)")
     parser.add_argument('--max_tokens', type=int, help="Макс. токенов для разбиения контента (default из config.yml)")
+    parser.add_argument('--repair_cyrillic', action='store_true',
+                        help="Найти в переводах книги оставшуюся кириллицу и перевести повторно только эти фрагменты")
+    parser.add_argument('--draft', action='store_true',
+                        help="Сначала быстрый черновик (routing.fast_model), затем уточнение основной моделью в фоне")
+    parser.add_argument('--multi_target', action='store_true',
+                        help="Переводить каждую часть на все языки одним запросом (JSON-ответ с переводами по языкам)")
+    parser.add_argument('--watch', action='store_true',
+                        help="После перевода изменений следить за RU директорией и переводить файлы при сохранении")
+    parser.add_argument('--plan', action='store_true',
+                        help="Оценить запуск без обращения к API: части, токены, стоимость и время")
+    parser.add_argument('--since', type=str,
+                        help="Переводить изменения RU директории после ревизии (git diff), исходники читаются из объектов Git")
+    parser.add_argument('--until', type=str, default='HEAD', help="Конечная ревизия для --since (по умолчанию HEAD)")
+    parser.add_argument('--output_dir', type=str,
+                        help="Корень книги для записи переводов (по умолчанию BOOK_PATH; обязателен для bare репозитория)")
+    add_profiling_arguments(parser)
+    add_backend_arguments(parser)
     return parser.parse_args()
 
 def main():
     """Основная функция для запуска процесса перевода измененных файлов."""
-    global CONFIG  # Используем глобальную переменную для конфига
+    global CONFIG, SOURCE_READER  # Используем глобальные переменные для конфига и источника файлов
 
     # 1. Загрузка конфигурации и окружения
     load_dotenv()
-    CONFIG = load_config()  # Загружаем config.yml
-    CONFIG = load_config() # Загружаем config.yml
+    CONFIG = load_config()  # Загружаем config.yml (разобранный файл кэшируется)
 
     # 2. Разбор аргументов командной строки
     args = parse_arguments()
 
-    # 3. Настройка логирования
-    setup_logging(args.log_level, args.log_file)
+    # 3. Настройка логирования и метрик запросов к API
+    setup_logging(args.log_level, args.log_file, args.log_format)
+    metrics = init_metrics("translate_target", CONFIG.get("metrics", {}))
+    init_translation_memory(CONFIG.get("translation_memory"), resolve_backend(CONFIG.get("api", {}), args.backend))
+    profiler = init_profiling("translate_target", args.profile, args.profile_cprofile,
+                              args.profile_tracemalloc, args.profile_dir)
 
     # 4. Получение и проверка пути к репозиторию книги из .env
     book_repo_path_str = os.getenv("BOOK_PATH")
@@ -205,6 +692,9 @@ def main():
              log_error(f"Указанный BOOK_PATH '{book_repo_path}' не является Git репозиторием или его частью.")
              return
 
+    # Переводы записываются в BOOK_PATH или в --output_dir (например, рабочая копия при bare репозитории в CI)
+    output_root = Path(args.output_dir).resolve() if args.output_dir else book_repo_path
+
     # 5. Получение параметров обработки
     max_tokens = args.max_tokens or CONFIG.get("general", {}).get("max_tokens", 8000)
     max_workers = args.max_workers or CONFIG.get("general", {}).get("max_workers", 4)
@@ -221,9 +711,49 @@ def main():
     # Используем одинарные кавычки внутри f-string
     log_info(f"Поиск измененных файлов в директории: '{ru_dir_rel_posix}'")
     # Передаем абсолютный путь к репозиторию и относительный путь к поддиректории
-    changed_relative_paths = get_changed_files_in_dir(str(book_repo_path), ru_dir_rel_posix)
+    # В режиме исправления кириллицы изменения в Git не нужны: сканируются все переводы
+    with span("git_changed_files"):
+        if args.repair_cyrillic:
+            changes = {"changed": [], "renamed": [], "deleted": []}
+        elif args.since:
+            # Режим диапазона ревизий: рабочая копия не нужна (CI, bare и shallow клоны)
+            if args.watch:
+                log_error("Режим --since несовместим с --watch")
+                return
+            try:
+                is_bare = subprocess.run(['git', 'rev-parse', '--is-bare-repository'], cwd=str(book_repo_path),
+                                         capture_output=True, text=True, check=True).stdout.strip() == 'true'
+                # Ревизия фиксируется до git diff, поэтому список изменений и содержимое согласованы
+                SOURCE_READER = GitBlobReader(str(book_repo_path), args.until, ru_dir_rel_posix)
+            except subprocess.CalledProcessError as e:
+                log_error(f"Ревизия '{args.until}' не найдена в {book_repo_path}: {(e.stderr or '').strip()}")
+                return
+            if is_bare and not args.output_dir:
+                log_error("BOOK_PATH - bare репозиторий: укажите --output_dir для записи переводов")
+                return
+            changes = get_changes_between(str(book_repo_path), ru_dir_rel_posix, args.since, SOURCE_READER.commit)
+        else:
+            changes = get_changes_in_dir(str(book_repo_path), ru_dir_rel_posix)
+
+    # 7. Определение целевых языков
+    if args.language == 'all':
+        target_languages = ['en', 'es', 'zh']
+    else:
+        target_languages = [args.language]
+    if args.multi_target and args.draft:
+        log_error("Режим --multi_target несовместим с --draft")
+        return
+    # Один запрос на часть для всех языков имеет смысл только при нескольких языках
+    multi_target = args.multi_target and len(target_languages) > 1
+
+    # Переименования и удаления переносятся на переводы без обращения к API
+    changed_relative_paths = list(changes["changed"])
+    if changes["renamed"] or changes["deleted"]:
+        with span("apply_renames"):
+            missing = apply_renames_and_deletions(changes, target_languages, output_root, dry_run=args.plan)
+        changed_relative_paths = sorted(set(changed_relative_paths) | set(missing))
 
-    if not changed_relative_paths:
+    if not changed_relative_paths and not args.repair_cyrillic and not args.watch:
         # Используем одинарные кавычки внутри f-string
         log_info(f"В директории '{ru_dir_rel_posix}' нет измененных файлов для обработки.")
         return
@@ -231,12 +761,35 @@ def main():
     log_info(f"Найдено {len(changed_relative_paths)} измененных/новых файлов для обработки.")
     # log_debug(f"Список файлов: {changed_relative_paths}") # Логируем список в DEBUG
 
-    # 7. Инициализация OpenAI клиента и загрузка глоссария
+    # Модули перевода загружаются только при наличии изменений (быстрый выход из git-хука)
+    from utils.client import create_client
+    from utils.planner import TranslationPlanner, log_plan
+
+    # Режим --plan: оценка без обращения к API
+    if args.plan:
+        glossary = load_glossary()
+        model_name = CONFIG.get("api", {}).get("model_name", os.getenv("MODEL_NAME", "gpt-4o-mini"))
+        routing_config = CONFIG.get("routing") or {}
+        if args.draft:
+            planner = TranslationPlanner(CONFIG, glossary, routing_config.get("strong_model") or model_name,
+                                         max_tokens, draft_model=routing_config.get("fast_model"),
+                                         source_reader=SOURCE_READER)
+        else:
+            planner = TranslationPlanner(CONFIG, glossary, model_name, max_tokens,
+                                         create_model_router(CONFIG, model_name, glossary), source_reader=SOURCE_READER)
+        ru_dir_abs = book_repo_path / ru_dir_rel_posix
+        files = [(str(ru_dir_abs / rel_path), rel_path) for rel_path in changed_relative_paths
+                 if SOURCE_READER is not None or (ru_dir_abs / rel_path).exists()]
+        log_plan(planner.plan(files, target_languages, max_workers))
+        if SOURCE_READER is not None:
+            SOURCE_READER.close()
+        return
+
+    # 8. Инициализация OpenAI клиента и загрузка глоссария
     try:
-        client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=CONFIG.get("api", {}).get("base_url", os.getenv("OPENAI_BASE_URL"))
-        )
+        # В режиме --draft черновики и уточнения выполняются двумя пулами потоков одновременно
+        client = create_client(CONFIG, max_workers * 2 if args.draft else max_workers,
+                               args.backend, args.cassette, args.replay_latency)
         # Простой пинг для проверки доступности API (опционально)
         # client.models.list() 
         log_info("Клиент OpenAI успешно инициализирован.")
@@ -246,29 +799,78 @@ def main():
         
     glossary = load_glossary()
     model_name = CONFIG.get("api", {}).get("model_name", os.getenv("MODEL_NAME", "gpt-4o-mini"))
+    # Быстрая модель для простых фрагментов (секция routing), None - все фрагменты в model_name
+    router = create_model_router(CONFIG, model_name, glossary)
     log_info(f"Используемая модель: {model_name}")
 
-    # 8. Определение целевых языков
-    if args.language == 'all':
-        target_languages = ['en', 'es', 'zh']
-    else:
-        target_languages = [args.language]
+    # Модели режима --draft: черновик - routing.fast_model, итоговый перевод - routing.strong_model или model_name
+    routing_config = CONFIG.get("routing") or {}
+    draft_model = routing_config.get("fast_model")
+    final_model = routing_config.get("strong_model") or model_name
+    if args.draft:
+        if not draft_model:
+            log_error("Для режима --draft задайте быструю модель в routing.fast_model (config.yaml)")
+            return
+        log_info(f"Режим черновика: черновик - {draft_model}, итоговый перевод - {final_model}")
 
     # Используем стандартные кавычки для f-string
     log_info(f"Целевые языки для перевода: {', '.join(target_languages)}")
     log_info(f"Максимальное количество токенов для разбиения: {max_tokens}")
     log_info(f"Максимальное количество потоков: {max_workers}")
 
+    # Режим исправления: переводим повторно только фрагменты с оставшейся кириллицей
+    if args.repair_cyrillic:
+        total_repair_tokens = 0
+        for target_language in target_languages:
+            translator = Translator(client, model_name, glossary, CONFIG.get("prompt_improvements", {}), router)
+            files_with_hits, repaired = repair_directory(
+                str(book_repo_path / ru_dir_rel_posix), str(output_root / LANG_DIRS[target_language]),
+                translator.translate_text, target_language, get_system_prompt(CONFIG, target_language),
+                get_part_token_limit(CONFIG, [target_language], max_tokens), max_workers,
+                CONFIG.get("cyrillic_check", {}).get("min_run_length", 10)
+            )
+            log_info(f"[{target_language}] Исправлено фрагментов: {repaired} в {files_with_hits} файлах")
+            total_repair_tokens += translator.get_total_tokens()
+        log_info(f"Итого токенов использовано на исправление: ~{int(total_repair_tokens):,}")
+        if router:
+            router.log_summary()
+        log_translation_memory_summary()
+        metrics.finish()
+        profiler.finish()
+        return
+
     # 9. Обработка файлов для каждого целевого языка
     total_processed_tokens_all_langs = 0
     global_success_count = 0
     global_failed_files: Dict[str, List[str]] = {lang: [] for lang in target_languages} # Словарь для ошибок по языкам
 
-    for target_language in target_languages:
+    # Режим --multi_target: каждая часть отправляется в API один раз для всех языков
+    multi_translator = None
+    if multi_target:
+        multi_translator = Translator(client, model_name, glossary, CONFIG.get("prompt_improvements", {}), router)
+        log_info(f"Перевод на языки {', '.join(target_languages)} одним запросом на часть")
+    if multi_translator is not None and changed_relative_paths:
+        ru_dir_abs = book_repo_path / ru_dir_rel_posix
+        tasks = [(str(ru_dir_abs / rel_path), rel_path) for rel_path in changed_relative_paths
+                 if SOURCE_READER is not None or (ru_dir_abs / rel_path).exists()]
+        multi_failed = run_multi_target(tasks, target_languages, str(output_root), multi_translator,
+                                        max_tokens, max_workers)
+        for target_language in target_languages:
+            global_failed_files[target_language].extend(multi_failed[target_language])
+            lang_success_count = len(tasks) - len(multi_failed[target_language])
+            global_success_count += lang_success_count
+            log_info(f"Успешно обработано файлов для '{target_language}': {lang_success_count}/{len(tasks)}")
+            if multi_failed[target_language]:
+                log_warning(f"Не удалось обработать файлы для '{target_language}': {', '.join(multi_failed[target_language])}")
+        total_processed_tokens_all_langs += multi_translator.get_total_tokens()
+        log_info(f"Токенов использовано для всех языков: ~{int(multi_translator.get_total_tokens()):,}")
+
+    # В режиме --watch без изменений в Git сразу переходим к наблюдению
+    for target_language in (target_languages if changed_relative_paths and multi_translator is None else []):
         log_info(f"--- Начало обработки для языка: {target_language} ---")
         
         # Создаем экземпляр переводчика для каждого языка (чтобы счетчик токенов был свой)
-        translator = Translator(client, model_name, glossary)
+        translator = Translator(client, model_name, glossary, CONFIG.get("prompt_improvements", {}), router)
         
         # Получаем системный промпт один раз для языка
         system_prompt = get_system_prompt(CONFIG, target_language)
@@ -280,7 +882,7 @@ def main():
         for rel_path in changed_relative_paths:
             # Формируем полный абсолютный путь к исходному файлу
             ru_file_full_path = str(ru_dir_abs / rel_path) 
-            if not os.path.exists(ru_file_full_path):
+            if SOURCE_READER is None and not os.path.exists(ru_file_full_path):
                 log_warning(f"[{target_language}] Исходный файл не найден, пропуск: {ru_file_full_path}")
                 continue
             # Добавляем аргументы для функции process_changed_file
@@ -288,31 +890,42 @@ def main():
                 ru_file_full_path, 
                 rel_path, 
                 target_language, 
-                str(book_repo_path), 
+                str(output_root), 
                 translator, 
                 max_tokens,
                 system_prompt # Передаем промпт
             ))
 
-        # Обрабатываем файлы параллельно
-        lang_success_count = 0
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Создаем словарь future -> rel_path для отслеживания
-            future_to_rel_path = {executor.submit(process_changed_file, *task_args): task_args[1] for task_args in tasks}
-
-            for future in concurrent.futures.as_completed(future_to_rel_path):
-                rel_path = future_to_rel_path[future]
-                try:
-                    result = future.result() # Получаем результат (True/False)
-                    if result:
-                        lang_success_count += 1
-                    else:
-                        global_failed_files[target_language].append(rel_path)
-                except Exception as exc:
-                     log_error(f"[{target_language}] Необработанное исключение при обработке файла {rel_path}: {exc}")
-                     # import traceback
-                     # log_error(traceback.format_exc()) # Для детальной отладки
-                     global_failed_files[target_language].append(rel_path)
+        # Режим черновика: быстрый черновик, затем уточнение основной моделью в фоне
+        if args.draft:
+            draft_translator = Translator(client, draft_model, glossary, CONFIG.get("prompt_improvements", {}), tier="draft")
+            final_translator = Translator(client, final_model, glossary, CONFIG.get("prompt_improvements", {}), tier="final")
+            lang_success_count, failed_files = run_draft_and_refine(
+                [(task_args[0], task_args[1]) for task_args in tasks], target_language, str(output_root),
+                draft_translator, final_translator, max_tokens, system_prompt, max_workers
+            )
+            global_failed_files[target_language].extend(failed_files)
+            translator.total_tokens_processed += draft_translator.get_total_tokens() + final_translator.get_total_tokens()
+        else:
+            # Обрабатываем файлы параллельно
+            lang_success_count = 0
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Создаем словарь future -> rel_path для отслеживания
+                future_to_rel_path = {executor.submit(profiler.profile_thread(process_changed_file), *task_args): task_args[1] for task_args in tasks}
+
+                for future in concurrent.futures.as_completed(future_to_rel_path):
+                    rel_path = future_to_rel_path[future]
+                    try:
+                        result = future.result() # Получаем результат (True/False)
+                        if result:
+                            lang_success_count += 1
+                        else:
+                            global_failed_files[target_language].append(rel_path)
+                    except Exception as exc:
+                         log_error(f"[{target_language}] Необработанное исключение при обработке файла {rel_path}: {exc}")
+                         # import traceback
+                         # log_error(traceback.format_exc()) # Для детальной отладки
+                         global_failed_files[target_language].append(rel_path)
 
         # Подводим итоги для текущего языка
         lang_total_tokens = translator.get_total_tokens()
@@ -330,6 +943,37 @@ def main():
         log_info(f"Токенов использовано для '{target_language}': ~{int(lang_total_tokens):,}")
         print("-" * 30) # Добавляем разделитель в консоль
 
+    # Режим --watch: переводим файлы при сохранении, клиент и переводчики остаются в памяти
+    if args.watch:
+        watcher = DirectoryWatcher(str(book_repo_path / ru_dir_rel_posix), CONFIG.get("watch"))
+        prompt_config = CONFIG.get("prompt_improvements", {})
+        translators = {lang: Translator(client, model_name, glossary, prompt_config, router) for lang in target_languages}
+        draft_translators = None
+        if args.draft:
+            draft_translators = {lang: (Translator(client, draft_model, glossary, prompt_config, tier="draft"),
+                                        Translator(client, final_model, glossary, prompt_config, tier="final"))
+                                 for lang in target_languages}
+        watch_multi_translator = Translator(client, model_name, glossary, prompt_config, router) if multi_target else None
+        try:
+            watch_failed = watch_and_translate(watcher, target_languages, str(book_repo_path), translators,
+                                               max_tokens, max_workers, draft_translators, watch_multi_translator,
+                                               str(output_root))
+        except KeyboardInterrupt:
+            watch_failed = {}
+            log_info("Наблюдение остановлено")
+        finally:
+            watcher.close()
+        for lang in target_languages:
+            global_failed_files[lang].extend(watch_failed.get(lang, []))
+            total_processed_tokens_all_langs += translators[lang].get_total_tokens()
+            if draft_translators:
+                total_processed_tokens_all_langs += sum(t.get_total_tokens() for t in draft_translators[lang])
+        if watch_multi_translator is not None:
+            total_processed_tokens_all_langs += watch_multi_translator.get_total_tokens()
+
+    if SOURCE_READER is not None:
+        SOURCE_READER.close()
+
     # 10. Финальные итоги
     log_info("="*20 + " Весь процесс перевода завершен " + "="*20)
     total_failed_count = sum(len(files) for files in global_failed_files.values())
@@ -344,6 +988,11 @@ def main():
          #    if files: log_warning(f"Ошибки [{lang}]: {files}")
              # Используем стандартные кавычки для f-string
     log_info(f"Итого токенов использовано по всем языкам: ~{int(total_processed_tokens_all_langs):,}")
+    if router:
+        router.log_summary()
+    log_translation_memory_summary()
+    metrics.finish()
+    profiler.finish()
     log_info("Работа скрипта завершена.")
 
 
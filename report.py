@@ -0,0 +1,99 @@
+import json
+import argparse
+from typing import Dict, List, Any
+
+# Импортируем наши утилиты
+from utils import setup_logging, load_config
+from utils.metrics import load_history, aggregate_history
+
+# Колонки отчета после полей группировки
+REPORT_COLUMNS = [
+    ("requests", "Запросов"),
+    ("errors", "Ошибок"),
+    ("retries", "Повторов"),
+    ("prompt_tokens", "Токены промпта"),
+    ("cached_tokens", "Из кэша"),
+    ("cache_hit_rate", "Кэш, %"),
+    ("completion_tokens", "Токены ответа"),
+    ("total_tokens", "Всего токенов"),
+    ("avg_latency", "Ср. время, с"),
+]
+
+def format_table(rows: List[Dict[str, Any]], group_by: List[str]) -> str:
+    """
+    Форматирует строки отчета в текстовую таблицу.
+
+    Args:
+        rows: Строки отчета (результат aggregate_history)
+        group_by: Поля группировки
+
+    Returns:
+        str: Таблица с выравниванием по колонкам
+    """
+    headers = group_by + [title for _, title in REPORT_COLUMNS]
+    table = [headers]
+    for row in rows:
+        values = [str(row[field]) for field in group_by]
+        for field, _ in REPORT_COLUMNS:
+            value = row[field]
+            if field == "avg_latency":
+                values.append(f"{value:.2f}")
+            elif field == "cache_hit_rate":
+                values.append(f"{value * 100:.1f}")
+            else:
+                values.append(f"{int(value):,}")
+        table.append(values)
+
+    widths = [max(len(line[i]) for line in table) for i in range(len(headers))]
+    lines = []
+    for index, line in enumerate(table):
+        lines.append("  ".join(
+            value.ljust(width) if column < len(group_by) else value.rjust(width)
+            for column, (value, width) in enumerate(zip(line, widths))
+        ))
+        if index == 0:
+            lines.append("  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+def parse_arguments():
+    """
+    Разбирает аргументы командной строки.
+
+    Returns:
+        argparse.Namespace: Объект с аргументами
+    """
+    parser = argparse.ArgumentParser(description='Отчет об использовании API по истории метрик')
+    parser.add_argument('--group_by', type=str, default='month,language,model',
+                        help='Поля группировки через запятую (month, language, model, kind, command, outcome, endpoint)')
+    parser.add_argument('--month', type=str, help='Только указанный месяц (ГГГГ-ММ)')
+    parser.add_argument('--language', type=str, help='Только указанный язык')
+    parser.add_argument('--metrics_dir', type=str, help='Директория метрик (по умолчанию из config.yaml)')
+    parser.add_argument('--json', action='store_true', help='Вывести отчет в формате JSON')
+    parser.add_argument('--log_level', type=str, default='WARNING',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Уровень логирования')
+    return parser.parse_args()
+
+def main():
+    """Основная функция для построения отчета."""
+    args = parse_arguments()
+    setup_logging(args.log_level)
+
+    metrics_dir = args.metrics_dir or load_config().get("metrics", {}).get("dir")
+    records = load_history(metrics_dir)
+    if args.month:
+        records = [record for record in records if record.get("timestamp", "").startswith(args.month)]
+    if args.language:
+        records = [record for record in records if record.get("language") == args.language]
+
+    group_by = [field.strip() for field in args.group_by.split(',') if field.strip()]
+    rows = aggregate_history(records, group_by)
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    elif not rows:
+        print("История метрик пуста")
+    else:
+        print(format_table(rows, group_by))
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,67 @@
 - Файлами
 - Промптами
 - Переводом текста
+
+Модули загружаются при первом обращении к имени (from utils import Translator),
+поэтому скрипты, которым нужна только часть утилит (например, main_target.py без
+измененных файлов), не импортируют остальные.
 """
 
-from utils.logger import log_info, log_error, log_debug, log_warning, setup_logging
-from utils.config import load_config, get_language_config, get_system_prompt, get_validation_prompt, load_glossary
-from utils.file_utils import is_binary_file, extract_frontmatter, restore_frontmatter, split_content
-from utils.prompt_utils import load_prompt_improvements, save_prompt_improvement, translate_frontmatter
-from utils.translator import Translator
-from utils.git_utils import get_changed_files_in_dir
+import importlib
+from typing import Any
+
+# Имя -> модуль, в котором оно определено
+_EXPORTS = {
+    'log_info': 'utils.logger', 'log_error': 'utils.logger', 'log_debug': 'utils.logger',
+    'log_warning': 'utils.logger', 'setup_logging': 'utils.logger',
+    'load_config': 'utils.config', 'get_language_config': 'utils.config', 'get_system_prompt': 'utils.config',
+    'get_validation_prompt': 'utils.config', 'load_glossary': 'utils.config', 'get_part_token_limit': 'utils.config',
+    'is_binary_file': 'utils.file_utils', 'remove_local_text': 'utils.file_utils',
+    'extract_frontmatter': 'utils.file_utils', 'restore_frontmatter': 'utils.file_utils',
+    'split_content': 'utils.file_utils', 'set_frontmatter_field': 'utils.file_utils',
+    'write_file_atomic': 'utils.file_utils',
+    'load_prompt_improvements': 'utils.prompt_utils', 'save_prompt_improvement': 'utils.prompt_utils',
+    'translate_frontmatter': 'utils.prompt_utils',
+    'Translator': 'utils.translator',
+    'get_changed_files_in_dir': 'utils.git_utils', 'get_changes_in_dir': 'utils.git_utils',
+    'get_changes_between': 'utils.git_utils', 'GitBlobReader': 'utils.git_utils',
+    'find_moved_files': 'utils.git_utils',
+    'ValidationCache': 'utils.validation_cache',
+    'check_structure': 'utils.structure_checks',
+    'consolidate_improvements': 'utils.consolidation',
+    'init_metrics': 'utils.metrics', 'get_metrics': 'utils.metrics',
+    'find_cyrillic_runs': 'utils.cyrillic_check', 'repair_translated_parts': 'utils.cyrillic_check',
+    'repair_directory': 'utils.cyrillic_check',
+    'split_blocks': 'utils.markdown_blocks',
+    'TranslationMemory': 'utils.translation_memory', 'init_translation_memory': 'utils.translation_memory',
+    'get_translation_memory': 'utils.translation_memory',
+    'align_documents': 'utils.tm_import', 'import_translation_memory': 'utils.tm_import',
+}
 
 __all__ = [
     'log_info', 'log_error', 'log_warning', 'setup_logging',
-    'load_config',
+    'load_config', 'get_part_token_limit',
     'get_system_prompt', 'load_glossary',
-    'is_binary_file', 'extract_frontmatter', 'restore_frontmatter', 'split_content',
+    'is_binary_file', 'remove_local_text', 'extract_frontmatter', 'restore_frontmatter', 'split_content',
+    'set_frontmatter_field', 'write_file_atomic',
     'translate_frontmatter', 'Translator',
-    'get_changed_files_in_dir'
-] 
\ No newline at end of file
+    'get_changed_files_in_dir', 'get_changes_in_dir', 'get_changes_between', 'GitBlobReader', 'find_moved_files',
+    'ValidationCache',
+    'check_structure',
+    'find_cyrillic_runs', 'repair_translated_parts', 'repair_directory',
+    'split_blocks', 'TranslationMemory', 'init_translation_memory', 'get_translation_memory',
+    'align_documents', 'import_translation_memory',
+    'consolidate_improvements',
+    'init_metrics', 'get_metrics'
+]
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'utils' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
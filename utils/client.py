@@ -0,0 +1,150 @@
+import os
+import gzip
+import importlib.util
+from typing import Dict, Any, Optional
+from utils.logger import log_info, log_warning
+from utils.replay import open_backend
+from utils.endpoint_pool import create_endpoint_pool
+
+# Настройки HTTP-транспорта по умолчанию (секция api.transport в config.yaml)
+DEFAULT_TRANSPORT = {
+    "pool_size": None,            # Максимум соединений (по умолчанию max_workers + pool_headroom)
+    "pool_headroom": 2,           # Запас соединений сверх max_workers (валидация, повторные переводы)
+    "keepalive_expiry": 60.0,     # Сколько секунд держать простаивающее соединение открытым
+    "http2": False,               # HTTP/2 (нужен пакет h2: pip install "httpx[http2]")
+    "connect_timeout": 10.0,      # Таймаут установки соединения, с
+    "read_timeout": 600.0,        # Таймаут чтения ответа, с
+    "write_timeout": 60.0,        # Таймаут отправки запроса, с
+    "pool_timeout": 600.0,        # Таймаут ожидания свободного соединения в пуле, с
+    "max_retries": 2,             # Повторы запроса клиентом OpenAI (429, 5xx, обрывы соединения)
+    "compress_requests": False,   # Сжимать тела запросов gzip (сервер должен поддерживать Content-Encoding)
+    "compress_min_bytes": 4096,   # Минимальный размер тела запроса для сжатия
+}
+
+def get_transport_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Возвращает настройки HTTP-транспорта с подставленными значениями по умолчанию.
+
+    Args:
+        config: Общая конфигурация
+
+    Returns:
+        Dict[str, Any]: Настройки транспорта
+    """
+    transport = dict(DEFAULT_TRANSPORT)
+    transport.update({key: value for key, value in (config.get("api", {}).get("transport") or {}).items()
+                      if value is not None})
+    return transport
+
+def _gzip_transport(httpx, inner, min_bytes: int):
+    """Создает транспорт httpx, сжимающий тела запросов gzip."""
+
+    class GzipRequestTransport(httpx.BaseTransport):
+        def handle_request(self, request):
+            body = request.read()
+            if len(body) >= min_bytes and "content-encoding" not in request.headers:
+                compressed = gzip.compress(body, compresslevel=5)
+                headers = dict(request.headers)
+                headers["content-encoding"] = "gzip"
+                headers["content-length"] = str(len(compressed))
+                request = httpx.Request(request.method, request.url, headers=headers, content=compressed,
+                                        extensions=request.extensions)
+            return inner.handle_request(request)
+
+        def close(self):
+            inner.close()
+
+    return GzipRequestTransport()
+
+_httpx_warned = False
+
+def create_http_client(transport: Dict[str, Any], max_workers: int):
+    """
+    Создает общий HTTP-клиент httpx с пулом соединений под количество потоков.
+
+    Args:
+        transport: Настройки транспорта (см. get_transport_config)
+        max_workers: Количество параллельных потоков
+
+    Returns:
+        httpx.Client или None, если httpx недоступен (используется клиент по умолчанию)
+    """
+    global _httpx_warned
+    try:
+        import httpx
+    except ImportError:
+        if not _httpx_warned:
+            log_warning("Пакет httpx не найден: используются настройки соединений клиента OpenAI по умолчанию")
+            _httpx_warned = True
+        return None
+
+    pool_size = int(transport["pool_size"] or max_workers + transport["pool_headroom"])
+    http2 = bool(transport["http2"])
+    if http2 and importlib.util.find_spec("h2") is None:
+        log_warning("HTTP/2 отключен: пакет h2 не установлен (pip install \"httpx[http2]\")")
+        http2 = False
+
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                          keepalive_expiry=transport["keepalive_expiry"])
+    timeout = httpx.Timeout(connect=transport["connect_timeout"], read=transport["read_timeout"],
+                            write=transport["write_timeout"], pool=transport["pool_timeout"])
+
+    http_transport = httpx.HTTPTransport(limits=limits, http2=http2)
+    if transport["compress_requests"]:
+        http_transport = _gzip_transport(httpx, http_transport, int(transport["compress_min_bytes"]))
+
+    log_info(f"HTTP-транспорт: пул {pool_size} соединений, keep-alive {transport['keepalive_expiry']} с, "
+             f"HTTP/2 {'вкл' if http2 else 'выкл'}, сжатие запросов {'вкл' if transport['compress_requests'] else 'выкл'}")
+    return httpx.Client(transport=http_transport, timeout=timeout, follow_redirects=True)
+
+def create_client(config: Dict[str, Any], max_workers: Optional[int] = None, backend: Optional[str] = None,
+                  cassette: Optional[str] = None, replay_latency: Optional[bool] = None,
+                  api_key: Optional[str] = None, base_url: Optional[str] = None):
+    """
+    Создает клиента OpenAI API с общим HTTP-транспортом.
+
+    Один клиент разделяется всеми рабочими потоками: пул соединений рассчитан
+    на max_workers одновременных запросов, соединения переиспользуются (keep-alive),
+    поэтому TLS-соединение с api.base_url не устанавливается заново на каждый запрос.
+    Если задан список api.endpoints, возвращается пул адресов с балансировкой
+    (см. utils.endpoint_pool). Режимы record/replay оборачивают клиента (см. utils.replay).
+
+    Args:
+        config: Общая конфигурация (секция api)
+        max_workers: Количество параллельных потоков (по умолчанию general.max_workers)
+        backend: Режим работы с API: live, record, replay (по умолчанию из config.yaml)
+        cassette: Файл кассеты для режимов record и replay
+        replay_latency: В режиме replay выдерживать записанное время ответов
+        api_key: Ключ API (по умолчанию OPENAI_API_KEY; отключает пул адресов)
+        base_url: Адрес API (по умолчанию api.base_url, затем OPENAI_BASE_URL; отключает пул адресов)
+
+    Returns:
+        Клиент с интерфейсом chat.completions.create
+    """
+    api_config = config.get("api", {})
+    if max_workers is None:
+        max_workers = config.get("general", {}).get("max_workers", 4)
+
+    transport = get_transport_config(config)
+
+    def make_openai(endpoint_url: Optional[str], endpoint_key: Optional[str], max_retries: int):
+        from openai import OpenAI
+
+        kwargs = {
+            "api_key": endpoint_key,
+            "base_url": endpoint_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            "max_retries": max_retries,
+        }
+        http_client = create_http_client(transport, max_workers)
+        if http_client is not None:
+            kwargs["http_client"] = http_client
+        return OpenAI(**kwargs)
+
+    def make_client():
+        # Несколько адресов/ключей (api.endpoints): балансировка по задержке и доле ошибок
+        if api_config.get("endpoints") and not (api_key or base_url):
+            return create_endpoint_pool(api_config, make_openai, int(transport["max_retries"]))
+        return make_openai(base_url or api_config.get("base_url"), api_key or os.getenv("OPENAI_API_KEY"),
+                           int(transport["max_retries"]))
+
+    return open_backend(api_config, make_client, backend, cassette, replay_latency)
@@ -1,12 +1,53 @@
 import os
-import yaml
-from typing import Dict, Any, Optional
-from utils.logger import log_error
+import copy
+import json
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from utils.logger import log_error, log_debug
+
+# Разобранные конфигурации процесса: путь -> (mtime_ns, размер, конфигурация)
+_config_cache: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+_config_cache_lock = threading.Lock()
+
+# Доля лимита ответа модели, на которую рассчитывается размер части (оценка токенов 4 символа на токен неточна)
+OUTPUT_LIMIT_MARGIN = 0.85
+
+def _config_cache_path(config_path: str) -> str:
+    """Путь к файлу кэша разобранной конфигурации (__pycache__/<имя>.json рядом с файлом)."""
+    directory, name = os.path.split(os.path.abspath(config_path))
+    return os.path.join(directory, "__pycache__", f"{name}.json")
+
+def _read_config_cache(cache_path: str, mtime_ns: int, size: int) -> Optional[Dict[str, Any]]:
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("mtime_ns") != mtime_ns or cached.get("size") != size:
+        return None
+    return cached.get("config")
+
+def _write_config_cache(cache_path: str, mtime_ns: int, size: int, config: Dict[str, Any]) -> None:
+    try:
+        # Конфигурация с типами, не представимыми в JSON без потерь (даты, нестроковые ключи), не кэшируется
+        if json.loads(json.dumps(config)) != config:
+            return
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"mtime_ns": mtime_ns, "size": size, "config": config}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        log_debug(f"Кэш конфигурации {cache_path} не записан: {e}")
 
 def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
     """
     Загружает конфигурацию из YAML файла.
     
+    Разобранная конфигурация кэшируется в памяти процесса и в __pycache__/<имя>.json
+    (по времени изменения и размеру файла), поэтому повторные запуски не импортируют
+    yaml и не разбирают файл заново. Каждый вызов возвращает независимую копию.
+    
     Args:
         config_path: Путь к файлу конфигурации
         
@@ -14,9 +55,23 @@ def load_config(config_path: str = 'config.yaml') -> Dict[str, Any]:
         Dict[str, Any]: Словарь с конфигурацией
     """
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            return config
+        stat = os.stat(config_path)
+        key = os.path.abspath(config_path)
+        with _config_cache_lock:
+            cached = _config_cache.get(key)
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            cache_path = _config_cache_path(config_path)
+            config = _read_config_cache(cache_path, stat.st_mtime_ns, stat.st_size)
+            if config is None:
+                import yaml
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = yaml.safe_load(f)
+                _write_config_cache(cache_path, stat.st_mtime_ns, stat.st_size, config)
+            cached = (stat.st_mtime_ns, stat.st_size, config)
+            with _config_cache_lock:
+                _config_cache[key] = cached
+        # Вызывающий код может изменять свою копию конфигурации
+        return copy.deepcopy(cached[2])
     except Exception as e:
         log_error(f"Ошибка загрузки конфигурации из {config_path}: {e}")
         return {"general": {"max_tokens": 8000, "max_workers": 4}, "api": {}, "languages": {}}
@@ -34,6 +89,28 @@ def get_language_config(config: Dict[str, Any], target_language: str) -> Dict[st
     """
     return config.get("languages", {}).get(target_language, {})
 
+def get_part_token_limit(config: Dict[str, Any], target_languages: List[str], max_tokens: int) -> int:
+    """
+    Возвращает размер части, перевод которой помещается в лимит ответа модели.
+
+    Перевод части на язык занимает примерно output_expansion токенов на токен
+    оригинала (languages.<язык>.output_expansion); при переводе на несколько языков
+    одним запросом (--multi_target) ответ содержит переводы на все языки.
+
+    Args:
+        config: Словарь с общей конфигурацией
+        target_languages: Языки, переводы на которые возвращает один ответ
+        max_tokens: Размер части из настроек (general.max_tokens или --max_tokens)
+
+    Returns:
+        int: Максимальное количество токенов в части (не больше max_tokens)
+    """
+    max_output_tokens = config.get("api", {}).get("max_output_tokens")
+    if not max_output_tokens:
+        return max_tokens
+    expansion = sum(float(get_language_config(config, lang).get("output_expansion", 1.0)) for lang in target_languages)
+    return max(1, min(max_tokens, int(max_output_tokens * OUTPUT_LIMIT_MARGIN / max(expansion, 0.1))))
+
 def get_system_prompt(config: Dict[str, Any], target_language: str) -> str:
     """
     Получает системный промпт для указанного языка из конфигурации.
@@ -152,6 +229,7 @@ def load_glossary(glossary_path: str = 'glossary.yaml') -> Dict[str, Dict[str, s
         Dict[str, Dict[str, str]]: Словарь терминов с переводами
     """
     try:
+        import yaml
         with open(glossary_path, 'r', encoding='utf-8') as f:
             glossary = yaml.safe_load(f)
             return glossary.get('terms', {})
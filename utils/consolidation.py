@@ -0,0 +1,206 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+from utils.logger import log_info
+
+# Минимальная схожесть основ оригиналов записей с одинаковым переводом, при которой записи объединяются
+DEFAULT_THRESHOLD = 0.5
+
+# Длина основы слова: отбрасывает окончания ("токенов", "токенах" -> "token")
+STEM_LENGTH = 5
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Транслитерация кириллицы: основы русских и английских форм термина совпадают ("агент" и "agent")
+_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z', 'и': 'i',
+    'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't',
+    'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '',
+    'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+
+# Размер хэшированного битового множества триграмм для одного поля
+DEFAULT_BITS = 1024
+
+# Количество строк матрицы схожести, рассчитываемых за один раз (ограничивает память)
+BLOCK_SIZE = 512
+
+def _char_trigrams(text: str) -> List[str]:
+    """
+    Возвращает символьные триграммы текста с пробелами по краям.
+
+    Args:
+        text: Исходный текст
+
+    Returns:
+        List[str]: Триграммы в нижнем регистре
+    """
+    padded = f" {' '.join(text.lower().split())} "
+    return [padded[i:i+3] for i in range(len(padded) - 2)]
+
+def build_trigram_bitsets(texts: List[str], bits: int = DEFAULT_BITS):
+    """
+    Строит матрицу хэшированных битовых множеств символьных триграмм.
+
+    Args:
+        texts: Тексты
+        bits: Размер битового множества
+
+    Returns:
+        numpy.ndarray: Матрица (len(texts), bits) из 0 и 1 типа float32
+    """
+    import numpy as np
+
+    matrix = np.zeros((len(texts), bits), dtype=np.float32)
+    for row, text in enumerate(texts):
+        columns = [zlib.crc32(trigram.encode('utf-8')) % bits for trigram in _char_trigrams(text)]
+        matrix[row, columns] = 1.0
+    return matrix
+
+def _jaccard_rows(matrix, sizes, start: int, end: int):
+    """
+    Рассчитывает коэффициенты Жаккара строк [start, end) со всеми строками матрицы.
+
+    Пересечения считаются одним матричным умножением вместо операций над множествами.
+
+    Args:
+        matrix: Матрица битовых множеств
+        sizes: Количество единиц в каждой строке
+        start: Первая строка блока
+        end: Строка после последней строки блока
+
+    Returns:
+        numpy.ndarray: Матрица схожести (end - start, len(matrix))
+    """
+    import numpy as np
+
+    intersection = matrix[start:end] @ matrix.T
+    union = sizes[start:end, None] + sizes[None, :] - intersection
+    return intersection / np.maximum(union, 1.0)
+
+def _term_key(entry: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Ключ термина записи: оригинал и перевод без учета регистра (пробелы нормализуются).
+
+    Args:
+        entry: Запись улучшения
+
+    Returns:
+        Tuple[str, str]: (нормализованный оригинал, нормализованный перевод)
+    """
+    original = ' '.join(entry.get("original", "").split()).casefold()
+    translated = ' '.join(entry.get("translated", "").split()).casefold()
+    return original, translated
+
+def stem_key(text: str) -> str:
+    """
+    Возвращает основу текста для сравнения форм одного термина.
+
+    Слова транслитерируются и обрезаются до STEM_LENGTH символов, поэтому
+    "токенов", "токенах" и "токены", а также "AI-агентов" и "AI Agents" дают одну основу.
+
+    Args:
+        text: Текст (оригинал записи)
+
+    Returns:
+        str: Основы слов через пробел
+    """
+    words = WORD_PATTERN.findall(text.casefold().translate(_TRANSLIT))
+    return ' '.join(word[:STEM_LENGTH] for word in words)
+
+def find_conflicts(entries: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Находит записи об одном оригинале с разными переводами (например, "production" и "production-ready").
+
+    Такие записи не объединяются: выбрать верную формулировку должен человек.
+
+    Args:
+        entries: Записи улучшений
+
+    Returns:
+        List[List[int]]: Группы номеров записей с одинаковым оригиналом и разными переводами
+    """
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for index, entry in enumerate(entries):
+        groups[_term_key(entry)[0]].append(index)
+    return [members for members in groups.values()
+            if len({_term_key(entries[i])[1] for i in members}) > 1]
+
+def cluster_improvements(entries: List[Dict[str, Any]], threshold: Optional[float] = None,
+                         bits: int = DEFAULT_BITS) -> List[List[int]]:
+    """
+    Группирует похожие улучшения промпта.
+
+    Записи объединяются, если их переводы совпадают без учета регистра и пробелов,
+    а основы оригиналов (см. stem_key) похожи по символьным триграммам не меньше чем
+    на threshold: так объединяются замечания о разных формах одного термина ("токенов",
+    "токенах" -> "tokens"), а записи с разными переводами термина не объединяются никогда.
+    Схожесть всех пар считается матричным умножением битовых множеств триграмм.
+    Кластеры строятся жадно вокруг лидеров: самые частые (затем самые новые) записи
+    забирают похожие на себя записи, что исключает "цепочки" из непохожих друг на друга записей.
+
+    Args:
+        entries: Записи улучшений
+        threshold: Минимальная схожесть основ оригиналов (None - DEFAULT_THRESHOLD)
+        bits: Размер хэшированного битового множества
+
+    Returns:
+        List[List[int]]: Кластеры (номера записей, первым идет лидер)
+    """
+    import numpy as np
+
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+    count = len(entries)
+    if count == 0:
+        return []
+
+    # Номер перевода записи: совпадение номеров - одинаковые переводы
+    translation_codes: Dict[str, int] = {}
+    codes = np.array([translation_codes.setdefault(_term_key(entry)[1], len(translation_codes))
+                      for entry in entries])
+
+    matrix = build_trigram_bitsets([stem_key(entry.get("original", "")) for entry in entries], bits)
+    sizes = matrix.sum(axis=1)
+
+    # Соседи записи - записи с тем же переводом и похожим оригиналом; схожесть считается блоками строк
+    neighbours = []
+    for start in range(0, count, BLOCK_SIZE):
+        end = min(start + BLOCK_SIZE, count)
+        similar = (_jaccard_rows(matrix, sizes, start, end) >= threshold) & (codes[start:end, None] == codes[None, :])
+        neighbours.extend(np.nonzero(row)[0] for row in similar)
+
+    order = sorted(range(count), key=lambda i: (-int(entries[i].get("count", 1)), -i))
+    assigned = np.zeros(count, dtype=bool)
+    clusters = []
+    for leader in order:
+        if assigned[leader]:
+            continue
+        members = [int(i) for i in neighbours[leader] if not assigned[i] and i != leader]
+        assigned[leader] = True
+        assigned[members] = True
+        clusters.append([leader] + members)
+    return clusters
+
+def consolidate_improvements(entries: List[Dict[str, Any]], threshold: Optional[float] = None,
+                             bits: int = DEFAULT_BITS) -> Tuple[List[Dict[str, Any]], List[List[int]]]:
+    """
+    Заменяет каждый кластер повторяющихся улучшений одной записью-представителем с частотой.
+
+    Args:
+        entries: Записи улучшений
+        threshold: Минимальная схожесть основ оригиналов (None - DEFAULT_THRESHOLD)
+        bits: Размер хэшированного битового множества
+
+    Returns:
+        Tuple[List[Dict[str, Any]], List[List[int]]]: (новые записи в исходном порядке лидеров, кластеры)
+    """
+    clusters = cluster_improvements(entries, threshold, bits)
+    representatives = []
+    for cluster in sorted(clusters, key=lambda members: members[0]):
+        representative = dict(entries[cluster[0]])
+        representative["count"] = sum(int(entries[i].get("count", 1)) for i in cluster)
+        representatives.append(representative)
+
+    log_info(f"Консолидация улучшений: {len(entries)} записей -> {len(representatives)} кластеров")
+    return representatives, clusters
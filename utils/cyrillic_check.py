@@ -0,0 +1,278 @@
+import os
+import re
+from typing import Dict, List, Tuple, Any, Optional, Callable
+from utils.logger import log_info, log_error, log_warning
+from utils.file_utils import remove_local_text, extract_frontmatter, split_content
+
+# Быстрая проверка наличия кириллицы и поиск непрерывных кириллических фрагментов
+CYRILLIC_CHAR_PATTERN = re.compile(r'[Ѐ-ӿ]')
+CYRILLIC_RUN_PATTERN = re.compile(r'[Ѐ-ӿ]+(?:[\s\-–—,.:;!?«»"\'()]+[Ѐ-ӿ]+)*')
+
+# Блоки и фрагменты кода, в которых кириллица допустима
+FENCED_CODE_PATTERN = re.compile(r'^[ \t]*(```+|~~~+).*?^[ \t]*\1[ \t]*$', re.MULTILINE | re.DOTALL)
+INLINE_CODE_PATTERN = re.compile(r'`[^`\n]+`')
+
+# Заглушка, которую main_target.py записывает вместо непереведенной части
+ERROR_STUB_PATTERN = re.compile(r'\[ОШИБКА ПЕРЕВОДА ЧАСТИ (\d+):[^\]\n]*\]')
+
+# Минимальная длина кириллического фрагмента, который считается непереведенным текстом
+DEFAULT_MIN_RUN_LENGTH = 10
+
+def _mask_code(text: str) -> str:
+    """
+    Заменяет блоки и фрагменты кода нулевыми символами, сохраняя переносы строк и позиции,
+    чтобы кириллический фрагмент не "перескакивал" через код.
+
+    Args:
+        text: Текст документа
+
+    Returns:
+        str: Текст с замаскированным кодом
+    """
+    def blank(match: re.Match) -> str:
+        return re.sub(r'[^\n]', '\0', match.group(0))
+
+    text = FENCED_CODE_PATTERN.sub(blank, text)
+    return INLINE_CODE_PATTERN.sub(blank, text)
+
+def find_cyrillic_runs(text: str, min_run_length: int = DEFAULT_MIN_RUN_LENGTH) -> List[Tuple[int, str]]:
+    """
+    Находит кириллические фрагменты вне блоков и фрагментов кода.
+
+    Args:
+        text: Переведенный текст
+        min_run_length: Минимальная длина фрагмента в символах
+
+    Returns:
+        List[Tuple[int, str]]: Список (номер строки с 1, фрагмент)
+    """
+    # Быстрый путь: в большинстве переведенных файлов кириллицы нет совсем
+    if not CYRILLIC_CHAR_PATTERN.search(text):
+        return []
+
+    masked = _mask_code(text)
+    runs = []
+    for match in CYRILLIC_RUN_PATTERN.finditer(masked):
+        if len(match.group(0)) >= min_run_length:
+            line_number = masked.count('\n', 0, match.start()) + 1
+            runs.append((line_number, text[match.start():match.end()]))
+    return runs
+
+def has_leftover_cyrillic(text: str, min_run_length: int = DEFAULT_MIN_RUN_LENGTH) -> bool:
+    """
+    Проверяет, остались ли в переводе непереведенные русские фрагменты или заглушки ошибок.
+
+    Args:
+        text: Переведенный текст
+        min_run_length: Минимальная длина фрагмента в символах
+
+    Returns:
+        bool: True, если найден хотя бы один фрагмент
+    """
+    return bool(find_cyrillic_runs(text, min_run_length))
+
+def scan_directory(directory: str, min_run_length: int = DEFAULT_MIN_RUN_LENGTH) -> Dict[str, List[Tuple[int, str]]]:
+    """
+    Сканирует переведенные .md/.mdx файлы директории на оставшуюся кириллицу.
+
+    Args:
+        directory: Директория с переведенными файлами
+        min_run_length: Минимальная длина фрагмента в символах
+
+    Returns:
+        Dict[str, List[Tuple[int, str]]]: Найденные фрагменты по относительным путям файлов
+    """
+    results = {}
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            if not file.endswith(('.md', '.mdx')):
+                continue
+            file_path = os.path.join(root, file)
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    runs = find_cyrillic_runs(f.read(), min_run_length)
+            except (OSError, UnicodeDecodeError) as e:
+                log_error(f"Ошибка чтения файла {file_path}: {e}")
+                continue
+            if runs:
+                results[os.path.relpath(file_path, directory)] = runs
+    return results
+
+def repair_translated_parts(parts: List[str], translated_parts: List[str], translate_text_func: Callable,
+                            target_language: str, system_prompt: str, context: Dict[str, Any],
+                            rel_path: str, min_run_length: int = DEFAULT_MIN_RUN_LENGTH) -> List[str]:
+    """
+    Повторно переводит только те части файла, в которых осталась кириллица.
+
+    Args:
+        parts: Исходные части файла
+        translated_parts: Переведенные части (в том же порядке)
+        translate_text_func: Функция перевода (Translator.translate_text)
+        target_language: Целевой язык перевода
+        system_prompt: Системный промпт для перевода
+        context: Контекст перевода между частями
+        rel_path: Относительный путь файла для логирования
+        min_run_length: Минимальная длина фрагмента в символах
+
+    Returns:
+        List[str]: Переведенные части с исправленными фрагментами
+    """
+    repaired_parts = list(translated_parts)
+    for i, (part, translated_part) in enumerate(zip(parts, translated_parts)):
+        runs = find_cyrillic_runs(translated_part, min_run_length)
+        if not runs:
+            continue
+        log_warning(f"[{target_language}] В части {i+1} файла {rel_path} осталась кириллица "
+                    f"({len(runs)} фрагм.), повторный перевод части")
+        try:
+            retranslated, context = translate_text_func(part, target_language, system_prompt, context)
+        except Exception as e:
+            log_error(f"[{target_language}] Ошибка повторного перевода части {i+1} файла {rel_path}: {e}")
+            continue
+        remaining = find_cyrillic_runs(retranslated, min_run_length)
+        if len(remaining) < len(runs):
+            repaired_parts[i] = retranslated
+        if remaining:
+            log_warning(f"[{target_language}] После повторного перевода в части {i+1} файла {rel_path} "
+                        f"осталось {len(remaining)} кириллических фрагм.")
+    return repaired_parts
+
+def _split_paragraphs(text: str) -> List[Tuple[int, int]]:
+    """
+    Возвращает границы абзацев (блоков между пустыми строками).
+
+    Args:
+        text: Текст документа
+
+    Returns:
+        List[Tuple[int, int]]: Список (начало, конец) абзацев
+    """
+    spans = []
+    for match in re.finditer(r'(?:[^\n]*\S[^\n]*(?:\n|$))+', text):
+        spans.append((match.start(), match.end()))
+    return spans
+
+def repair_translated_file(source_path: str, target_path: str, translate_text_func: Callable,
+                           target_language: str, system_prompt: str, max_tokens: int,
+                           min_run_length: int = DEFAULT_MIN_RUN_LENGTH) -> Optional[int]:
+    """
+    Исправляет уже записанный перевод: сопоставляет кириллические фрагменты с частями
+    исходного файла и переводит повторно только их.
+
+    Заглушка "[ОШИБКА ПЕРЕВОДА ЧАСТИ N: ...]" заменяется переводом части N. Если в переводе
+    дословно осталась целая исходная часть, переводится она. В остальных случаях повторно
+    переводится только абзац с кириллицей.
+
+    Args:
+        source_path: Путь к исходному файлу на русском
+        target_path: Путь к переведенному файлу
+        translate_text_func: Функция перевода (Translator.translate_text)
+        target_language: Целевой язык перевода
+        system_prompt: Системный промпт для перевода
+        max_tokens: Максимальное количество токенов для разбиения (как при переводе)
+        min_run_length: Минимальная длина фрагмента в символах
+
+    Returns:
+        Optional[int]: Количество исправленных фрагментов или None в случае ошибки
+    """
+    try:
+        with open(target_path, 'r', encoding='utf-8') as f:
+            translated = f.read()
+        if not find_cyrillic_runs(translated, min_run_length):
+            return 0
+
+        with open(source_path, 'r', encoding='utf-8') as f:
+            source = remove_local_text(f.read())
+        _, _, main_content = extract_frontmatter(source)
+        parts = split_content(main_content, max_tokens)
+
+        context = {"translated_terms": {}, "part_number": 1, "total_tokens": 0, "file_path": target_path}
+        replacements: List[Tuple[str, str]] = []
+        handled_parts = set()
+
+        # Заглушки ошибок указывают номер части напрямую
+        for match in ERROR_STUB_PATTERN.finditer(translated):
+            part_index = int(match.group(1)) - 1
+            if 0 <= part_index < len(parts):
+                replacements.append((match.group(0), parts[part_index]))
+                handled_parts.add(part_index)
+
+        # Части, оставшиеся в переводе без изменений (translate_text вернул исходный текст)
+        for part_index, part in enumerate(parts):
+            if part_index not in handled_parts and part.strip() and part in translated \
+                    and find_cyrillic_runs(part, min_run_length):
+                replacements.append((part, part))
+                handled_parts.add(part_index)
+
+        # Оставшиеся абзацы с кириллицей переводим по одному
+        covered = translated
+        for old_text, _ in replacements:
+            covered = covered.replace(old_text, '')
+        for start, end in _split_paragraphs(covered):
+            paragraph = covered[start:end].rstrip('\n')
+            if paragraph in translated and find_cyrillic_runs(paragraph, min_run_length):
+                replacements.append((paragraph, paragraph))
+
+        repaired = 0
+        for old_text, source_text in replacements:
+            new_text, context = translate_text_func(source_text, target_language, system_prompt, context)
+            if new_text and len(find_cyrillic_runs(new_text, min_run_length)) < len(find_cyrillic_runs(old_text, min_run_length)):
+                translated = translated.replace(old_text, new_text, 1)
+                repaired += 1
+
+        if repaired:
+            tmp_path = target_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(translated)
+            os.replace(tmp_path, target_path)
+            log_info(f"[{target_language}] Исправлено фрагментов с кириллицей: {repaired} в {target_path}")
+        remaining = find_cyrillic_runs(translated, min_run_length)
+        if remaining:
+            log_warning(f"[{target_language}] В {target_path} осталось {len(remaining)} кириллических фрагм. "
+                        f"(первый в строке {remaining[0][0]})")
+        return repaired
+
+    except Exception as e:
+        log_error(f"[{target_language}] Ошибка исправления файла {target_path}: {e}")
+        return None
+
+def repair_directory(source_dir: str, target_dir: str, translate_text_func: Callable, target_language: str,
+                     system_prompt: str, max_tokens: int, max_workers: int = 4,
+                     min_run_length: int = DEFAULT_MIN_RUN_LENGTH) -> Tuple[int, int]:
+    """
+    Сканирует директорию с переводами и исправляет файлы с оставшейся кириллицей.
+
+    Args:
+        source_dir: Директория с исходными файлами на русском
+        target_dir: Директория с переведенными файлами
+        translate_text_func: Функция перевода (Translator.translate_text)
+        target_language: Целевой язык перевода
+        system_prompt: Системный промпт для перевода
+        max_tokens: Максимальное количество токенов для разбиения
+        max_workers: Максимальное количество потоков
+        min_run_length: Минимальная длина фрагмента в символах
+
+    Returns:
+        Tuple[int, int]: (количество файлов с кириллицей, количество исправленных фрагментов)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    hits = scan_directory(target_dir, min_run_length)
+    log_info(f"[{target_language}] Файлов с оставшейся кириллицей: {len(hits)}")
+
+    tasks = []
+    for rel_path in sorted(hits):
+        source_path = os.path.join(source_dir, rel_path)
+        if not os.path.exists(source_path):
+            log_warning(f"[{target_language}] Исходный файл не найден, пропуск: {source_path}")
+            continue
+        tasks.append((source_path, os.path.join(target_dir, rel_path)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda paths: repair_translated_file(paths[0], paths[1], translate_text_func, target_language,
+                                                 system_prompt, max_tokens, min_run_length),
+            tasks
+        ))
+
+    return len(hits), sum(result for result in results if result)
@@ -0,0 +1,246 @@
+import os
+import time
+import random
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional, Callable
+from utils.logger import log_info, log_warning
+from utils.metrics import note_retry, note_endpoint
+
+# Параметры балансировки по умолчанию (секция api.balancing в config.yaml)
+DEFAULT_BALANCING = {
+    "ewma_alpha": 0.3,        # Вес нового замера в скользящем среднем задержки и доли ошибок
+    "eject_after": 3,         # Ошибок подряд, после которых адрес исключается
+    "eject_error_rate": 0.6,  # Доля ошибок (скользящее среднее), после которой адрес исключается
+    "eject_seconds": 30,      # Начальное время исключения, с (удваивается при повторных исключениях)
+    "max_eject_seconds": 300, # Максимальное время исключения, с
+    "max_attempts": None,     # Попыток на запрос с переключением адресов (None - по числу адресов)
+    "client_retries": None,   # Повторы клиента OpenAI на одном адресе (None - api.transport.max_retries
+                              # для единственного адреса, 0 для нескольких: повторы заменяет переключение)
+}
+
+# Коды ответа, означающие ошибку самого запроса: переключение на другой адрес не поможет
+REQUEST_ERROR_STATUSES = {400, 404, 413, 422}
+
+class Endpoint:
+    """Адрес API (base_url, ключ, модель) с состоянием для балансировки."""
+
+    def __init__(self, name: str, base_url: Optional[str], api_key: Optional[str], model: Optional[str],
+                 weight: float, client: Any):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.weight = max(float(weight), 0.01)
+        self.client = client
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.inflight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.eject_seconds = 0.0
+        self.probing = False
+        self.attempts = 0
+        self.failures = 0
+
+    def score(self) -> float:
+        """Ожидаемая стоимость запроса: задержка с учетом очереди, доли ошибок и веса (меньше - лучше)."""
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + self.inflight) / (self.weight * max(1.0 - self.error_rate, 0.05))
+
+class EndpointPool:
+    """
+    Пул адресов API с балансировкой по задержке и доле ошибок.
+
+    Запрос направляется на лучший из двух случайно выбранных (с учетом весов) доступных
+    адресов. Адрес с несколькими ошибками подряд или высокой долей ошибок исключается
+    на время (с экспоненциальным ростом) и затем возвращается одним пробным запросом.
+    Неудачный запрос повторяется на другом адресе. Пул предоставляет интерфейс
+    chat.completions.create и используется вместо клиента OpenAI.
+    Модель адреса заменяет только модель по умолчанию (api.model_name): явно выбранная
+    модель (например, быстрая модель для простых фрагментов) передается адресу без изменений.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], balancing: Optional[Dict[str, Any]] = None, seed: Optional[int] = None,
+                 default_model: Optional[str] = None):
+        """
+        Args:
+            endpoints: Адреса API
+            balancing: Параметры балансировки (см. DEFAULT_BALANCING)
+            seed: Начальное значение генератора случайных чисел
+            default_model: Модель по умолчанию (api.model_name), которую заменяет модель адреса
+        """
+        if not endpoints:
+            raise ValueError("Пул адресов API пуст")
+        self.endpoints = endpoints
+        self.settings = dict(DEFAULT_BALANCING)
+        self.settings.update({key: value for key, value in (balancing or {}).items() if value is not None})
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.default_model = default_model
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _available(self, now: float, exclude: set) -> List[Endpoint]:
+        available = []
+        for endpoint in self.endpoints:
+            if endpoint.name in exclude:
+                continue
+            if endpoint.ejected_until <= now and not endpoint.probing:
+                available.append(endpoint)
+        return available
+
+    def _acquire(self, exclude: set) -> Optional[Endpoint]:
+        """Выбирает адрес для запроса и отмечает его занятым."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = self._available(now, exclude)
+            if not candidates:
+                # Все адреса исключены: пробуем тот, чье исключение истекает раньше
+                remaining = [endpoint for endpoint in self.endpoints if endpoint.name not in exclude]
+                if not remaining:
+                    return None
+                candidates = [min(remaining, key=lambda endpoint: endpoint.ejected_until)]
+
+            if len(candidates) > 2:
+                weights = [endpoint.weight for endpoint in candidates]
+                first, second = self._rng.choices(candidates, weights=weights, k=2)
+                endpoint = min((first, second), key=Endpoint.score)
+            else:
+                endpoint = min(candidates, key=Endpoint.score)
+
+            if endpoint.ejected_until:
+                # Исключение истекло: пропускаем один пробный запрос
+                endpoint.probing = True
+            endpoint.inflight += 1
+            return endpoint
+
+    def _release(self, endpoint: Endpoint, latency: Optional[float], failed: bool) -> None:
+        """
+        Обновляет состояние адреса по результату запроса.
+
+        Args:
+            endpoint: Адрес
+            latency: Время ответа, с (None - ответ не учитывается в задержке, например отказ 4xx)
+            failed: Ошибка адреса
+        """
+        alpha = self.settings["ewma_alpha"]
+        with self._lock:
+            endpoint.inflight -= 1
+            endpoint.attempts += 1
+            endpoint.failures += failed
+            endpoint.error_rate = (1 - alpha) * endpoint.error_rate + alpha * (1.0 if failed else 0.0)
+            was_probing = endpoint.probing
+            endpoint.probing = False
+
+            if not failed:
+                if latency is not None:
+                    endpoint.latency = latency if endpoint.latency is None else (1 - alpha) * endpoint.latency + alpha * latency
+                endpoint.consecutive_failures = 0
+                if endpoint.ejected_until:
+                    endpoint.ejected_until = 0.0
+                    endpoint.eject_seconds = 0.0
+                    log_info(f"Адрес API '{endpoint.name}' снова доступен")
+                return
+
+            endpoint.consecutive_failures += 1
+            if (was_probing or endpoint.consecutive_failures >= self.settings["eject_after"]
+                    or endpoint.error_rate >= self.settings["eject_error_rate"]):
+                endpoint.eject_seconds = min(
+                    endpoint.eject_seconds * 2 if endpoint.eject_seconds else self.settings["eject_seconds"],
+                    self.settings["max_eject_seconds"]
+                )
+                endpoint.ejected_until = time.monotonic() + endpoint.eject_seconds
+                log_warning(f"Адрес API '{endpoint.name}' исключен на {endpoint.eject_seconds:g} с "
+                            f"(ошибок подряд: {endpoint.consecutive_failures})")
+
+    def _create(self, **kwargs):
+        attempts = self.settings["max_attempts"] or len(self.endpoints)
+        tried = set()
+        last_error: Optional[Exception] = None
+
+        for attempt in range(attempts):
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint.name)
+            if attempt:
+                note_retry()
+            # Модель адреса заменяет только модель по умолчанию, явно выбранная модель не меняется
+            request = kwargs
+            if endpoint.model and kwargs.get("model") in (None, self.default_model):
+                request = dict(kwargs, model=endpoint.model)
+            note_endpoint(endpoint.name, request.get("model"))
+
+            started = time.perf_counter()
+            try:
+                response = endpoint.client.chat.completions.create(**request)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                if status in REQUEST_ERROR_STATUSES:
+                    # Ошибка в самом запросе, адрес исправен; быстрый отказ не учитывается в задержке
+                    self._release(endpoint, None, failed=False)
+                    raise
+                self._release(endpoint, time.perf_counter() - started, failed=True)
+                log_warning(f"Ошибка запроса к адресу API '{endpoint.name}': {e}")
+                last_error = e
+                continue
+            self._release(endpoint, time.perf_counter() - started, failed=False)
+            return response
+
+        raise last_error or RuntimeError("Нет доступных адресов API")
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает текущее состояние адресов.
+
+        Returns:
+            List[Dict[str, Any]]: Имя, задержка, доля ошибок, число попыток и ошибок, исключен ли адрес
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "name": endpoint.name,
+                "latency": endpoint.latency,
+                "error_rate": endpoint.error_rate,
+                "inflight": endpoint.inflight,
+                "attempts": endpoint.attempts,
+                "failures": endpoint.failures,
+                "ejected": endpoint.ejected_until > now,
+            } for endpoint in self.endpoints]
+
+def create_endpoint_pool(api_config: Dict[str, Any], make_client: Callable[..., Any],
+                         default_retries: int = 2) -> EndpointPool:
+    """
+    Создает пул адресов по секции api конфигурации.
+
+    Args:
+        api_config: Секция api (endpoints, balancing, model_name)
+        make_client: Функция make_client(base_url, api_key, max_retries), создающая клиента OpenAI
+        default_retries: Повторы клиента для единственного адреса, если balancing.client_retries не задан
+
+    Returns:
+        EndpointPool: Пул адресов
+    """
+    balancing = dict(DEFAULT_BALANCING)
+    balancing.update({key: value for key, value in (api_config.get("balancing") or {}).items() if value is not None})
+
+    entries = []
+    for index, entry in enumerate(api_config.get("endpoints") or []):
+        base_url = entry.get("base_url") or api_config.get("base_url")
+        api_key = os.getenv(entry["api_key_env"]) if entry.get("api_key_env") else entry.get("api_key")
+        if entry.get("api_key_env") and not api_key:
+            log_warning(f"Переменная окружения {entry['api_key_env']} не задана: адрес API пропущен")
+            continue
+        entries.append((entry.get("name") or f"{base_url}#{index}", base_url, api_key, entry))
+
+    # Единственному адресу некуда переключаться: повторы остаются на стороне клиента
+    retries = balancing["client_retries"]
+    if retries is None:
+        retries = default_retries if len(entries) == 1 else 0
+
+    endpoints = [Endpoint(name, base_url, api_key, entry.get("model"), entry.get("weight", 1.0),
+                          make_client(base_url, api_key, int(retries)))
+                 for name, base_url, api_key, entry in entries]
+
+    log_info(f"Пул адресов API: {', '.join(endpoint.name for endpoint in endpoints)}")
+    return EndpointPool(endpoints, balancing, default_model=api_config.get("model_name"))
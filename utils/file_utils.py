@@ -1,10 +1,16 @@
 import os
 import re
-import yaml
 import shutil
-from typing import List, Dict, Tuple, Optional, Any
+import threading
+from typing import List, Dict, Tuple, Optional, Any, Union
 from utils.logger import log_info, log_error
 
+# Блоки локального текста, которые не переводятся и удаляются перед обработкой
+LOCAL_TEXT_PATTERN = re.compile(
+    r"\{\s*/\*\s*LOCAL TEXT START\s*\*/\s*\}(.*?)\{\s*/\*\s*LOCAL TEXT END\s*\*/\s*\}",
+    re.DOTALL | re.IGNORECASE
+)
+
 def is_binary_file(file_path: str) -> bool:
     """
     Проверяет, является ли файл бинарным.
@@ -22,6 +28,18 @@ def is_binary_file(file_path: str) -> bool:
     except UnicodeDecodeError:
         return True
 
+def remove_local_text(content: str) -> str:
+    """
+    Удаляет блоки LOCAL TEXT из содержимого файла.
+    
+    Args:
+        content: Содержимое файла
+        
+    Returns:
+        str: Содержимое без блоков локального текста
+    """
+    return LOCAL_TEXT_PATTERN.sub("", content)
+
 def extract_frontmatter(content: str) -> Tuple[bool, Optional[str], str]:
     """
     Извлекает фронтматтер из markdown-содержимого, если он есть.
@@ -56,6 +74,59 @@ def restore_frontmatter(frontmatter: Optional[str], translated_content: str) ->
         return f"{frontmatter}\n\n{translated_content}"
     return translated_content
 
+def set_frontmatter_field(frontmatter: Optional[str], key: str, value: str) -> str:
+    """
+    Устанавливает простое поле во фронтматтере (заменяет существующее или добавляет в конец).
+    
+    Args:
+        frontmatter: Фронтматтер с маркерами '---' (None - создать новый)
+        key: Имя поля
+        value: Значение поля
+        
+    Returns:
+        str: Фронтматтер с установленным полем
+    """
+    line = f"{key}: {value}"
+    if not frontmatter:
+        return f"---\n{line}\n---"
+    
+    field_pattern = re.compile(rf"^{re.escape(key)}:.*$", re.MULTILINE)
+    if field_pattern.search(frontmatter):
+        return field_pattern.sub(line, frontmatter, count=1)
+    
+    # Вставляем перед закрывающим маркером '---'
+    end = frontmatter.rstrip().rfind('---')
+    if end <= 0:
+        return f"{frontmatter.rstrip()}\n{line}"
+    head = frontmatter[:end].rstrip('\n')
+    return f"{head}\n{line}\n{frontmatter[end:]}"
+
+def write_file_atomic(file_path: str, content: Union[str, bytes]) -> None:
+    """
+    Атомарно записывает файл: читатели видят либо старое, либо новое содержимое.
+    
+    Содержимое записывается во временный файл в той же директории, который затем
+    заменяет целевой файл через os.replace.
+    
+    Args:
+        file_path: Путь к файлу
+        content: Содержимое (str записывается в UTF-8, bytes - как есть)
+    """
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(file_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if isinstance(content, bytes):
+            with open(tmp_path, 'wb') as file:
+                file.write(content)
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                file.write(content)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 def split_content(content: str, max_tokens: int = 8000) -> List[str]:
     """
     Разбивает содержимое на части с учетом ограничения по токенам и сохранением структуры markdown.
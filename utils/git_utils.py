@@ -1,131 +1,440 @@
 import os
 import subprocess
+import threading
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, List, Optional, Set, Tuple
 from .logger import log_info, log_error, log_warning
 
-def get_changed_files_in_dir(repo_path: str, target_subdir: str) -> List[str]:
+def _run_git(args: List[str], cwd: str, input_text: Optional[str] = None) -> str:
+    """Выполняет команду git и возвращает stdout (исключение CalledProcessError при ошибке)."""
+    result = subprocess.run(
+        ['git'] + args,
+        cwd=cwd,
+        input=input_text,
+        capture_output=True,
+        text=True,
+        check=True,
+        encoding='utf-8'
+    )
+    return result.stdout
+
+def _parse_status_z(output: str) -> List[Tuple[str, str, Optional[str]]]:
     """
-    Получает список измененных (модифицированных, добавленных, переименованных в) 
-    файлов в указанной поддиректории Git репозитория.
+    Разбирает вывод git status --porcelain=v1 -z.
+
+    Returns:
+        List[Tuple[str, str, Optional[str]]]: (статус XY, путь, исходный путь для переименований и копий)
+    """
+    entries = []
+    tokens = output.split('\0')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+        if len(token) < 4:
+            continue
+        status, path = token[:2], token[3:]
+        orig_path = None
+        if 'R' in status or 'C' in status:
+            # В формате -z исходный путь переименования идет следующим полем
+            orig_path = tokens[i] if i < len(tokens) else None
+            i += 1
+        entries.append((status, path, orig_path))
+    return entries
+
+def _head_blob_hashes(toplevel: str, paths: List[str]) -> Dict[str, str]:
+    """Хэши объектов файлов в HEAD (путь относительно корня репозитория -> хэш)."""
+    if not paths:
+        return {}
+    try:
+        output = _run_git(['ls-tree', '-r', '-z', '--full-name', 'HEAD', '--'] + paths, toplevel)
+    except subprocess.CalledProcessError:
+        # Репозиторий без коммитов
+        return {}
+    hashes = {}
+    for entry in output.split('\0'):
+        if '\t' not in entry:
+            continue
+        meta, path = entry.split('\t', 1)
+        hashes[path] = meta.split()[2]
+    return hashes
+
+def _worktree_blob_hashes(toplevel: str, paths: List[str]) -> Dict[str, str]:
+    """Хэши объектов для текущего содержимого файлов (git hash-object, один процесс на все файлы)."""
+    if not paths:
+        return {}
+    output = _run_git(['hash-object', '--stdin-paths'], toplevel, '\n'.join(paths) + '\n')
+    return dict(zip(paths, output.split()))
+
+def _group_changes(changed: Set[str], renamed: Dict[str, str], deleted: Set[str],
+                   target_subdir_clean: str, prefix_to_check: str) -> Dict[str, List]:
+    """
+    Переводит пути из вывода git в пути относительно target_subdir и группирует изменения.
+
+    Args:
+        changed: Измененные и новые файлы (пути из вывода git)
+        renamed: Переименования: новый путь -> старый путь
+        deleted: Удаленные файлы
+        target_subdir_clean: Поддиректория без крайних слешей (POSIX)
+        prefix_to_check: Имя корневой папки репозитория с '/', которое удаляется из путей ('' - не удалять)
+
+    Returns:
+        Dict[str, List]: changed, renamed (пары (старый, новый)), deleted
+    """
+    changes: Dict[str, List] = {"changed": [], "renamed": [], "deleted": []}
+
+    def to_subdir_path(path: str) -> Optional[str]:
+        """Путь из вывода git -> путь относительно target_subdir (None, если файл вне директории)."""
+        path = Path(path).as_posix()
+        if prefix_to_check and path.startswith(prefix_to_check):
+            path = path[len(prefix_to_check):]
+        if not path.startswith(target_subdir_clean + '/'):
+            return None
+        return Path(os.path.relpath(path, target_subdir_clean)).as_posix()
+
+    for path in sorted(changed):
+        relative = to_subdir_path(path)
+        if relative:
+            changes["changed"].append(relative)
+    for new_path, old_path in sorted(renamed.items()):
+        old_relative, new_relative = to_subdir_path(old_path), to_subdir_path(new_path)
+        if old_relative and new_relative:
+            changes["renamed"].append((old_relative, new_relative))
+        elif new_relative and new_relative not in changes["changed"]:
+            # Файл перемещен в директорию извне: переводим как новый
+            changes["changed"].append(new_relative)
+        elif old_relative:
+            # Файл перемещен из директории: для переводов это удаление
+            changes["deleted"].append(old_relative)
+    for path in sorted(deleted):
+        relative = to_subdir_path(path)
+        if relative:
+            changes["deleted"].append(relative)
+    changes["changed"].sort()
+    changes["deleted"].sort()
+    return changes
+
+def get_changes_in_dir(repo_path: str, target_subdir: str) -> Dict[str, List]:
+    """
+    Получает изменения файлов в поддиректории Git репозитория с разделением
+    на файлы для перевода, переименования и удаления.
+
+    Переименования определяются Git для проиндексированных изменений, а для
+    неиндексированных (удаленный отслеживаемый файл + новый файл) - по совпадению
+    хэша содержимого. Переименованный файл, содержимое которого изменилось,
+    попадает и в renamed (чтобы переместить переводы), и в changed.
 
     Args:
         repo_path: Абсолютный путь к корню Git репозитория.
-        target_subdir: Путь к целевой поддиректории относительно корня репозитория 
+        target_subdir: Путь к целевой поддиректории относительно корня репозитория
                        (используйте POSIX-разделители '/').
 
     Returns:
-        Список путей к измененным файлам относительно target_subdir 
-        (с POSIX-разделителями).
+        Dict[str, List]: changed - пути для перевода, renamed - пары (старый путь, новый путь),
+        deleted - удаленные пути; все пути относительно target_subdir (с POSIX-разделителями).
     """
-    changed_files: Set[str] = set()
-    
-    # Нормализуем target_subdir к POSIX формату на всякий случай
-    target_subdir_posix = Path(target_subdir).as_posix()
-    # Убедимся, что путь к поддиректории не начинается и не заканчивается слешем для согласованности
-    target_subdir_clean = target_subdir_posix.strip('/')
+    changes: Dict[str, List] = {"changed": [], "renamed": [], "deleted": []}
+
+    # Нормализуем target_subdir к POSIX формату и убираем крайние слеши
+    target_subdir_clean = Path(target_subdir).as_posix().strip('/')
 
     # Создаем полный путь к директории для проверки существования
     full_target_path = os.path.join(repo_path, target_subdir_clean)
     if not os.path.isdir(full_target_path):
         log_warning(f"Целевая директория для проверки Git не существует: {full_target_path}")
-        return []
+        return changes
 
     try:
-        # Используем git status --porcelain=v1 для стабильного формата вывода
-        # Передаем target_subdir_clean как аргумент для ограничения области поиска git status
-        # '--' используется для отделения путей от опций
-        git_command = ['git', 'status', '--porcelain=v1', '--untracked-files=all', '--', target_subdir_clean]
-        log_info(f"Выполнение команды git: {' '.join(git_command)} в {repo_path}")
-
-        result = subprocess.run(
-            git_command,
-            cwd=repo_path,
-            capture_output=True,
-            text=True,
-            check=True,
-            encoding='utf-8' # Явно указываем кодировку
-        )
-        
-        # Разделяем вывод по строкам, учитывая разные символы конца строки
-        output_lines = result.stdout.strip().splitlines()
-        
-        if not output_lines or (len(output_lines) == 1 and not output_lines[0]):
-             log_info(f"Нет изменений или неотслеживаемых файлов в {target_subdir_clean}")
-             return []
-
-        # Получаем имя корневой папки репозитория для возможной очистки префикса
-        repo_root_name = Path(repo_path).name
-
-        final_changed_files: Set[str] = set()
-        for line in output_lines:
-            if not line.strip():
-                continue
+        # -z: пути без кавычек и экранирования, исходный путь переименования - отдельным полем
+        git_command = ['-c', 'status.renames=true', 'status', '--porcelain=v1', '-z', '--untracked-files=all',
+                       '--', target_subdir_clean]
+        log_info(f"Выполнение команды git: git {' '.join(git_command)} в {repo_path}")
+        entries = _parse_status_z(_run_git(git_command, repo_path))
+        if not entries:
+            log_info(f"Нет изменений или неотслеживаемых файлов в {target_subdir_clean}")
+            return changes
 
-            parts = line.split(maxsplit=2)
-            status = parts[0]
-            file_path_rel_repo = parts[1]
-
-            if status in ('R', 'C') and '->' in parts[1]:
-                path_parts = parts[1].split(' -> ')
-                if len(path_parts) == 2:
-                    file_path_rel_repo = path_parts[1]
-                else:
-                    log_warning(f"Не удалось разобрать путь для {status}: {parts[1]}")
-                    continue
-            
-            # Убираем кавычки, если Git их добавляет для путей с пробелами
-            file_path_rel_repo = file_path_rel_repo.strip('"')
-
-            # Преобразуем путь к POSIX формату
-            file_path_rel_repo_posix = Path(file_path_rel_repo).as_posix()
-            
-            # --- Новая логика: Обработка префикса ---
-            # Проверяем, не начинается ли путь с имени корневой папки репозитория
-            prefix_to_check = f"{repo_root_name}/"
-            cleaned_path = file_path_rel_repo_posix
-            if file_path_rel_repo_posix.startswith(prefix_to_check):
-                cleaned_path = file_path_rel_repo_posix[len(prefix_to_check):]
-                # log_debug(f"Удален префикс '{prefix_to_check}' из пути: '{file_path_rel_repo_posix}' -> '{cleaned_path}'") # Опциональный дебаг
-
-            # Проверяем, находится ли ОЧИЩЕННЫЙ путь внутри нашей целевой директории
-            if cleaned_path.startswith(target_subdir_clean + '/'):
-                # Получаем путь относительно target_subdir_clean
-                try:
-                    # Используем очищенный путь для вычисления относительного пути
-                    relative_path = os.path.relpath(cleaned_path, target_subdir_clean)
-                    # Снова преобразуем в POSIX для единообразия вывода
-                    final_changed_files.add(Path(relative_path).as_posix())
-                except ValueError as ve:
-                     log_warning(f"Не удалось вычислить относительный путь для '{cleaned_path}' относительно '{target_subdir_clean}': {ve}")
-
-        sorted_files = sorted(list(final_changed_files)) # Используем final_changed_files
-        if sorted_files:
-            log_info(f"Найдено {len(sorted_files)} измененных/новых файлов в '{target_subdir_clean}'")
-        else:
-            # Логируем как INFO, если файлы были в выводе git status, но отфильтровались (не должны при правильной логике)
-            if changed_files: # Используем исходный set до очистки префикса для этой проверки
-                 log_warning(f"Найдены изменения в git status, но не в '{target_subdir_clean}' после фильтрации.")
+        changed: Set[str] = set()
+        renamed: Dict[str, str] = {}      # новый путь -> старый путь (пути из вывода git)
+        deleted: Set[str] = set()
+        added: Set[str] = set()           # новые файлы - кандидаты в переименования
+        for status, path, orig_path in entries:
+            if 'R' in status and orig_path:
+                renamed[path] = orig_path
+                if 'D' in status:
+                    # Переименован в индексе и затем удален в рабочей копии
+                    deleted.add(orig_path)
+                    renamed.pop(path)
+            elif 'D' in status:
+                deleted.add(path)
+            elif status in ('??', 'A ', 'AM'):
+                added.add(path)
             else:
-                 log_info(f"Нет изменений или неотслеживаемых файлов в '{target_subdir_clean}'")
+                changed.add(path)
+
+        if renamed or (deleted and added):
+            toplevel = _run_git(['rev-parse', '--show-toplevel'], repo_path).strip()
+            # Пути вывода status относительны корню репозитория
+            old_hashes = _head_blob_hashes(toplevel, sorted(deleted | set(renamed.values())))
+            new_hashes = _worktree_blob_hashes(toplevel, sorted(
+                path for path in added | set(renamed) if os.path.isfile(os.path.join(toplevel, path))
+            ))
+
+            # Переименования Git: если содержимое изменилось, файл также переводится
+            for new_path, old_path in renamed.items():
+                if old_hashes.get(old_path) is None or old_hashes.get(old_path) != new_hashes.get(new_path):
+                    changed.add(new_path)
+
+            # Неиндексированные перемещения: удаленный файл + новый файл с тем же содержимым
+            deleted_by_hash: Dict[str, List[str]] = {}
+            for path in sorted(deleted):
+                if path in old_hashes:
+                    deleted_by_hash.setdefault(old_hashes[path], []).append(path)
+            for path in sorted(added):
+                candidates = deleted_by_hash.get(new_hashes.get(path, ''))
+                if candidates:
+                    old_path = candidates.pop(0)
+                    renamed[path] = old_path
+                    deleted.discard(old_path)
+                    added.discard(path)
+        changed |= added
 
-        # log_debug(f"Список файлов для обработки: {sorted_files}") # Опциональный дебаг
-        return sorted_files
+        changes = _group_changes(changed, renamed, deleted, target_subdir_clean, f"{Path(repo_path).name}/")
+
+        log_info(f"Изменения в '{target_subdir_clean}': для перевода {len(changes['changed'])}, "
+                 f"переименовано {len(changes['renamed'])}, удалено {len(changes['deleted'])}")
+        return changes
 
     except subprocess.CalledProcessError as e:
         # Логируем stderr для диагностики
         error_message = e.stderr.strip() if e.stderr else str(e)
-        # Попытка декодировать stderr, если это байты
-        if isinstance(error_message, bytes):
-            try:
-                error_message = error_message.decode('utf-8', errors='replace')
-            except Exception:
-                 error_message = str(error_message) # Fallback
         log_error(f"Ошибка выполнения git status в {repo_path}: {error_message}")
-        return []
+        return changes
     except FileNotFoundError:
         log_error("Команда 'git' не найдена. Убедитесь, что Git установлен и доступен в системном PATH.")
-        return []
+        return changes
     except Exception as e:
         log_error(f"Неожиданная ошибка при проверке статуса Git в {repo_path}: {str(e)}")
-        return [] 
\ No newline at end of file
+        return changes
+
+def find_moved_files(repo_path: str, target_subdir: str, deleted: Set[str], added: Set[str],
+                     known_hashes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Сопоставляет удаленные файлы поддиректории с новыми файлами того же содержимого (перемещения).
+
+    Содержимое удаленного файла уже недоступно, поэтому его хэш берется из known_hashes
+    (хэши файлов, которые вызывающий видел ранее), а если его там нет - из HEAD.
+    known_hashes дополняется хэшами новых файлов, удаленные файлы из него исключаются.
+
+    Args:
+        repo_path: Абсолютный путь к корню Git репозитория.
+        target_subdir: Путь к поддиректории относительно корня репозитория (POSIX-разделители '/').
+        deleted: Удаленные пути относительно target_subdir
+        added: Новые и измененные пути относительно target_subdir
+        known_hashes: Хэши объектов Git по путям относительно target_subdir (обновляется)
+
+    Returns:
+        Dict[str, str]: Новый путь -> старый путь для файлов с совпадающим содержимым
+    """
+    known_hashes = known_hashes if known_hashes is not None else {}
+    moves: Dict[str, str] = {}
+    try:
+        toplevel = _run_git(['rev-parse', '--show-toplevel'], repo_path).strip()
+        prefix = Path(os.path.relpath(os.path.join(repo_path, Path(target_subdir).as_posix().strip('/')),
+                                      toplevel)).as_posix()
+        existing = sorted(path for path in added if os.path.isfile(os.path.join(toplevel, prefix, path)))
+        new_hashes = _worktree_blob_hashes(toplevel, [f"{prefix}/{path}" for path in existing])
+        new_hashes = {path: new_hashes[f"{prefix}/{path}"] for path in existing if f"{prefix}/{path}" in new_hashes}
+
+        unknown = sorted(path for path in deleted if path not in known_hashes)
+        head_hashes = _head_blob_hashes(toplevel, [f"{prefix}/{path}" for path in unknown])
+        deleted_by_hash: Dict[str, List[str]] = {}
+        for path in sorted(deleted):
+            old_hash = known_hashes.get(path) or head_hashes.get(f"{prefix}/{path}")
+            if old_hash:
+                deleted_by_hash.setdefault(old_hash, []).append(path)
+        for path in existing:
+            candidates = deleted_by_hash.get(new_hashes.get(path, ''))
+            if candidates:
+                moves[path] = candidates.pop(0)
+    except subprocess.CalledProcessError as e:
+        log_warning(f"Не удалось сопоставить удаленные и новые файлы в {repo_path}: {(e.stderr or '').strip()}")
+        new_hashes = {}
+    except FileNotFoundError:
+        log_error("Команда 'git' не найдена. Убедитесь, что Git установлен и доступен в системном PATH.")
+        new_hashes = {}
+
+    for path in deleted:
+        known_hashes.pop(path, None)
+    known_hashes.update(new_hashes)
+    return moves
+
+def get_changed_files_in_dir(repo_path: str, target_subdir: str) -> List[str]:
+    """
+    Получает список измененных (модифицированных, добавленных, переименованных в) 
+    файлов в указанной поддиректории Git репозитория.
+
+    Переименованные файлы возвращаются под новым путем; переименования и удаления
+    отдельно возвращает get_changes_in_dir.
+
+    Args:
+        repo_path: Абсолютный путь к корню Git репозитория.
+        target_subdir: Путь к целевой поддиректории относительно корня репозитория 
+                       (используйте POSIX-разделители '/').
+
+    Returns:
+        Список путей к измененным файлам относительно target_subdir 
+        (с POSIX-разделителями).
+    """
+    changes = get_changes_in_dir(repo_path, target_subdir)
+    return sorted(set(changes["changed"]) | {new_path for _, new_path in changes["renamed"]})
+
+def get_changes_between(repo_path: str, target_subdir: str, since: str, until: str = "HEAD") -> Dict[str, List]:
+    """
+    Получает изменения файлов в поддиректории между двумя ревизиями (git diff --name-status).
+
+    В отличие от get_changes_in_dir рабочая копия не используется, поэтому функция
+    работает в bare и shallow клонах (если история содержит обе ревизии).
+
+    Args:
+        repo_path: Путь к репозиторию (рабочая копия или bare)
+        target_subdir: Путь к поддиректории относительно корня репозитория (POSIX)
+        since: Начальная ревизия (изменения после нее)
+        until: Конечная ревизия
+
+    Returns:
+        Dict[str, List]: changed - пути для перевода, renamed - пары (старый путь, новый путь),
+        deleted - удаленные пути; все пути относительно target_subdir (с POSIX-разделителями).
+    """
+    target_subdir_clean = Path(target_subdir).as_posix().strip('/')
+    changed: Set[str] = set()
+    renamed: Dict[str, str] = {}
+    deleted: Set[str] = set()
+    try:
+        git_command = ['diff', '--name-status', '-z', '-M', '--no-ext-diff', since, until, '--', target_subdir_clean]
+        log_info(f"Выполнение команды git: git {' '.join(git_command)} в {repo_path}")
+        tokens = _run_git(git_command, repo_path).split('\0')
+        i = 0
+        while i < len(tokens) - 1:
+            status = tokens[i]
+            if not status:
+                i += 1
+                continue
+            if status[0] in 'RC':
+                # R<сходство>/C<сходство>: исходный и новый пути
+                old_path, new_path = tokens[i + 1], tokens[i + 2]
+                i += 3
+                if status[0] == 'R':
+                    renamed[new_path] = old_path
+                    if status[1:] != '100':
+                        # Содержимое переименованного файла тоже изменилось
+                        changed.add(new_path)
+                else:
+                    changed.add(new_path)
+                continue
+            path = tokens[i + 1]
+            i += 2
+            if status[0] == 'D':
+                deleted.add(path)
+            else:
+                # A, M, T (смена типа)
+                changed.add(path)
+    except subprocess.CalledProcessError as e:
+        error_message = e.stderr.strip() if e.stderr else str(e)
+        log_error(f"Ошибка выполнения git diff {since} {until} в {repo_path}: {error_message}")
+        if any(marker in error_message for marker in ("unknown revision", "bad revision", "bad object")):
+            log_error("Ревизия отсутствует в истории (shallow клон?): увеличьте глубину git fetch --depth")
+        return {"changed": [], "renamed": [], "deleted": []}
+    except FileNotFoundError:
+        log_error("Команда 'git' не найдена. Убедитесь, что Git установлен и доступен в системном PATH.")
+        return {"changed": [], "renamed": [], "deleted": []}
+
+    changes = _group_changes(changed, renamed, deleted, target_subdir_clean, "")
+    log_info(f"Изменения в '{target_subdir_clean}' ({since}..{until}): для перевода {len(changes['changed'])}, "
+             f"переименовано {len(changes['renamed'])}, удалено {len(changes['deleted'])}")
+    return changes
+
+class GitBlobReader:
+    """
+    Чтение содержимого файлов ревизии из объектов Git.
+
+    Все файлы читаются через один долгоживущий процесс git cat-file --batch
+    (вместо процесса на файл), рабочая копия не нужна. Экземпляр можно
+    использовать из нескольких потоков.
+    """
+
+    def __init__(self, repo_path: str, revision: str, subdir: str = ""):
+        """
+        Args:
+            repo_path: Путь к репозиторию (рабочая копия или bare)
+            revision: Ревизия, из которой читаются файлы
+            subdir: Поддиректория, относительно которой задаются пути (POSIX)
+
+        Raises:
+            subprocess.CalledProcessError: Если ревизия не найдена
+        """
+        self.repo_path = repo_path
+        self.subdir = Path(subdir).as_posix().strip('/') if subdir else ""
+        # Ревизия фиксируется по хэшу коммита: новые коммиты во время работы не влияют на чтение
+        self.commit = _run_git(['rev-parse', '--verify', f'{revision}^{{commit}}'], repo_path).strip()
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=self.repo_path,
+                                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self._process
+
+    def read(self, rel_path: str) -> Optional[bytes]:
+        """
+        Читает файл ревизии.
+
+        Args:
+            rel_path: Путь относительно subdir (POSIX)
+
+        Returns:
+            Optional[bytes]: Содержимое файла или None, если файла нет в ревизии
+        """
+        path = f"{self.subdir}/{rel_path}" if self.subdir else rel_path
+        with self._lock:
+            try:
+                process = self._start()
+                process.stdin.write(f"{self.commit}:{path}\n".encode('utf-8'))
+                process.stdin.flush()
+                header = process.stdout.readline().decode('utf-8', errors='replace').rstrip('\n')
+                fields = header.split(' ')
+                if len(fields) != 3 or fields[1] != 'blob':
+                    # "<спецификация> missing" или объект другого типа (директория, подмодуль)
+                    log_warning(f"Файл {path} не найден в ревизии {self.commit[:12]}: {header}")
+                    if len(fields) == 3 and fields[2].isdigit():
+                        process.stdout.read(int(fields[2]) + 1)
+                    return None
+                size = int(fields[2])
+                data = process.stdout.read(size)
+                process.stdout.read(1)  # Перевод строки после содержимого
+                return data
+            except (OSError, ValueError) as e:
+                log_error(f"Ошибка чтения {path} через git cat-file: {e}")
+                self._stop_process()
+                return None
+
+    def _stop_process(self) -> None:
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+            self._process = None
+
+    def close(self) -> None:
+        """Завершает процесс git cat-file."""
+        with self._lock:
+            self._stop_process()
+
+    def __enter__(self) -> "GitBlobReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
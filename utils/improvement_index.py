@@ -0,0 +1,167 @@
+import re
+import math
+import threading
+from typing import Dict, List, Any, Set, Tuple
+
+# Слова короче этой длины не индексируются (предлоги, союзы, частицы)
+MIN_WORD_LENGTH = 2
+
+# Длина префикса слова, используемого как основа: "промпт", "промпты", "промптов" -> "промп"
+STEM_LENGTH = 5
+
+# Вес совпадения по переводу относительно совпадения по оригиналу
+TRANSLATED_WEIGHT = 0.5
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def term_stems(text: str) -> Set[str]:
+    """
+    Разбивает текст на основы слов (префиксы фиксированной длины в нижнем регистре).
+
+    Грубое усечение окончаний позволяет находить улучшение для "бэкенд" в тексте
+    с "бэкенде" без морфологического анализатора.
+
+    Args:
+        text: Текст
+
+    Returns:
+        Set[str]: Множество основ
+    """
+    return {
+        word[:STEM_LENGTH]
+        for word in WORD_PATTERN.findall(text.lower())
+        if len(word) >= MIN_WORD_LENGTH
+    }
+
+def estimate_tokens(text: str) -> int:
+    """
+    Оценивает количество токенов в тексте (так же, как split_content: 4 символа на токен).
+
+    Args:
+        text: Текст
+
+    Returns:
+        int: Оценка количества токенов
+    """
+    return len(text) // 4 + 1
+
+class ImprovementIndex:
+    """
+    Инвертированный индекс улучшений промпта по основам слов оригинала и перевода.
+
+    Для фрагмента текста находит улучшения, термины оригинала которых встречаются
+    во фрагменте, и ранжирует их по доле найденных терминов (с весами IDF),
+    совпадениям по переводу, частоте проблемы и новизне записи.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        """
+        Строит индекс по записям улучшений.
+
+        Args:
+            entries: Записи улучшений (original, translated, reason, count)
+        """
+        self.entries = entries
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._entry_terms: List[Tuple[Set[str], Set[str]]] = []
+
+        for position, entry in enumerate(entries):
+            terms = (term_stems(entry.get("original", "")), term_stems(entry.get("translated", "")))
+            self._entry_terms.append(terms)
+            for field, field_terms in enumerate(terms):
+                for stem in field_terms:
+                    self._postings.setdefault(stem, []).append((position, field))
+
+        count = max(len(entries), 1)
+        self._idf = {
+            stem: math.log(1 + count / len({position for position, _ in postings}))
+            for stem, postings in self._postings.items()
+        }
+
+    def _coverage(self, found: Set[str], terms: Set[str]) -> float:
+        total = sum(self._idf[stem] for stem in terms)
+        return sum(self._idf[stem] for stem in found) / total if total else 0.0
+
+    def search(self, text: str, min_coverage: float = 0.6) -> List[Tuple[int, float]]:
+        """
+        Находит улучшения, относящиеся к тексту.
+
+        Запись подходит, если во фрагменте найдена не меньше чем min_coverage (по весам IDF)
+        доля основ ее оригинала. Совпадения по переводу только повышают место в выдаче.
+
+        Args:
+            text: Фрагмент текста для перевода
+            min_coverage: Минимальная доля терминов оригинала записи, найденных в тексте
+
+        Returns:
+            List[Tuple[int, float]]: (номер записи, релевантность), отсортированные по релевантности
+        """
+        matched: Dict[int, Tuple[Set[str], Set[str]]] = {}
+        for stem in term_stems(text):
+            for position, field in self._postings.get(stem, ()):
+                matched.setdefault(position, (set(), set()))[field].add(stem)
+
+        results = []
+        for position, (found_original, found_translated) in matched.items():
+            original_terms, translated_terms = self._entry_terms[position]
+            coverage = self._coverage(found_original, original_terms)
+            if coverage >= min_coverage:
+                score = coverage + TRANSLATED_WEIGHT * self._coverage(found_translated, translated_terms)
+                results.append((position, score))
+
+        results.sort(key=lambda item: (
+            -round(item[1], 2),
+            -int(self.entries[item[0]].get("count", 1)),
+            -item[0]
+        ))
+        return results
+
+    def select(self, text: str, top_k: int, token_budget: int, min_coverage: float = 0.6,
+               format_entry=None) -> List[Dict[str, Any]]:
+        """
+        Выбирает до top_k релевантных улучшений, укладывающихся в бюджет токенов.
+
+        Args:
+            text: Фрагмент текста для перевода
+            top_k: Максимальное количество улучшений
+            token_budget: Максимальный суммарный размер улучшений в токенах
+            min_coverage: Минимальная доля терминов записи, найденных в тексте
+            format_entry: Функция форматирования записи для оценки ее размера
+
+        Returns:
+            List[Dict[str, Any]]: Выбранные записи
+        """
+        selected = []
+        used_tokens = 0
+        for position, _ in self.search(text, min_coverage):
+            entry = self.entries[position]
+            size = estimate_tokens(format_entry(entry) if format_entry else str(entry))
+            if used_tokens + size > token_budget:
+                continue
+            selected.append(entry)
+            used_tokens += size
+            if len(selected) >= top_k:
+                break
+        return selected
+
+_indexes: Dict[str, Tuple[Tuple[int, int], ImprovementIndex]] = {}
+_indexes_lock = threading.Lock()
+
+def get_improvement_index(store) -> ImprovementIndex:
+    """
+    Возвращает индекс для хранилища улучшений, перестраивая его при изменении файла.
+
+    Args:
+        store: Хранилище улучшений (ImprovementStore)
+
+    Returns:
+        ImprovementIndex: Актуальный индекс
+    """
+    entries = store.all()
+    generation = (store.generation, len(entries))
+    with _indexes_lock:
+        cached = _indexes.get(store.improvements_file)
+        if cached is None or cached[0] != generation:
+            cached = (generation, ImprovementIndex(entries))
+            _indexes[store.improvements_file] = cached
+        return cached[1]
@@ -0,0 +1,392 @@
+import os
+import json
+import threading
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from utils.logger import log_info, log_error
+from utils.minhash import MinHashLSH, shingle_kinds
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Пороги схожести, при которых новая проблема считается дубликатом существующей
+REASON_SIMILARITY_THRESHOLD = 0.7
+TEXT_SIMILARITY_THRESHOLD = 0.6
+
+# LSH поиска дубликатов: 20 полос по 2 строки находят пары с коэффициентом Жаккара
+# от 0.5 почти всегда (P(0.6) ≈ 0.9999, P(0.5) ≈ 0.997, P(0.3) ≈ 0.85); лишние кандидаты
+# отсекаются точной функцией calculate_similarity
+DUPLICATE_BANDS = 20
+DUPLICATE_ROWS = 2
+
+class FileLock:
+    """Межпроцессная блокировка на основе отдельного lock-файла (flock/msvcrt)."""
+
+    def __init__(self, lock_path: str):
+        """
+        Инициализирует блокировку.
+
+        Args:
+            lock_path: Путь к lock-файлу
+        """
+        self.lock_path = lock_path
+        self._file = None
+
+    def __enter__(self) -> "FileLock":
+        self._file = open(self.lock_path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+class _FieldIndex:
+    """
+    Индекс кандидатов на схожесть (> TEXT_SIMILARITY_THRESHOLD) для одного поля записи.
+
+    calculate_similarity сравнивает тексты короче 3 слов по множествам слов, поэтому для них
+    достаточно точного поиска по множеству слов
+    (и его подмножествам из 2 слов для множеств из 3 слов).
+    Повторяющиеся слова в множество не входят: текст "a b a" похож на "a b",
+    поэтому тексты индексируются по множеству слов, а не по их числу.
+    Длинные тексты ищутся через MinHash/LSH отдельно по триграммам слов и по триграммам символов:
+    схожесть calculate_similarity (0.7 * слова + 0.3 * символы) выше порога,
+    только если выше порога схожесть хотя бы одного из этих множеств.
+    """
+
+    def __init__(self):
+        self._lsh = MinHashLSH(DUPLICATE_BANDS, DUPLICATE_ROWS)
+        self._word_sets: Dict[frozenset, List[int]] = {}
+
+    def clear(self) -> None:
+        """Очищает индекс."""
+        self._lsh.clear()
+        self._word_sets = {}
+
+    @staticmethod
+    def _word_set_keys(words: List[str]) -> List[frozenset]:
+        word_set = frozenset(words)
+        keys = [word_set]
+        if len(word_set) == 3:
+            keys.extend(word_set - {word} for word in word_set)
+        return keys
+
+    def add(self, position: int, text: str) -> None:
+        """
+        Добавляет значение поля в индекс.
+
+        Args:
+            position: Номер записи
+            text: Значение поля (в нижнем регистре)
+        """
+        words = text.split()
+        if len(set(words)) <= 3:
+            for key in self._word_set_keys(words):
+                self._word_sets.setdefault(key, []).append(position)
+        if len(words) >= 3:
+            for shingles in shingle_kinds(text):
+                self._lsh.add(position, self._lsh.signature(shingles))
+
+    def query(self, text: str) -> set:
+        """
+        Возвращает номера записей, которые могут быть похожи на значение.
+
+        Args:
+            text: Значение поля (в нижнем регистре)
+
+        Returns:
+            set: Номера записей-кандидатов
+        """
+        words = text.split()
+        candidates = set()
+        if len(set(words)) <= 3:
+            for key in self._word_set_keys(words)[:1 if len(set(words)) < 3 else None]:
+                candidates.update(self._word_sets.get(key, ()))
+        if len(words) >= 3:
+            for shingles in shingle_kinds(text):
+                candidates.update(self._lsh.query(self._lsh.signature(shingles)))
+        return candidates
+
+class ImprovementStore:
+    """
+    Хранилище улучшений промптов для одного языка.
+
+    Записи хранятся в JSONL-файле и только дописываются в конец, поэтому сохранение новой
+    проблемы не требует перезаписи файла. Запись выполняется под межпроцессной блокировкой,
+    а перед проверкой на дубликаты дочитываются строки, добавленные другими процессами.
+    Поиск похожих проблем идет через индексы оригинала и перевода (_FieldIndex);
+    кандидаты отсекаются по совпадению полос LSH-сигнатуры причины и только затем
+    проверяются точной функцией calculate_similarity.
+    """
+
+    def __init__(self, improvements_file: str):
+        """
+        Инициализирует хранилище.
+
+        Args:
+            improvements_file: Путь к JSONL-файлу улучшений
+        """
+        self.improvements_file = improvements_file
+        self.lock_file = improvements_file + ".lock"
+        self.legacy_file = os.path.splitext(improvements_file)[0] + ".json"
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._entries: List[Dict[str, Any]] = []
+        self._exact_keys: set = set()
+        self._reason_bands: List[set] = []
+        self._reason_lsh = MinHashLSH(DUPLICATE_BANDS, DUPLICATE_ROWS)
+        self._original_index = _FieldIndex()
+        self._translated_index = _FieldIndex()
+        self._offset = 0
+        self._inode: Optional[int] = None
+
+    def _reset(self) -> None:
+        """Сбрасывает состояние в памяти перед полной перезагрузкой файла."""
+        self._entries = []
+        self._exact_keys = set()
+        self._reason_bands = []
+        self._original_index.clear()
+        self._translated_index.clear()
+        self._offset = 0
+        self._inode = None
+
+    def _index_entry(self, entry: Dict[str, Any]) -> None:
+        """
+        Добавляет запись в индексы в памяти.
+
+        Args:
+            entry: Запись улучшения
+        """
+        position = len(self._entries)
+        self._entries.append(entry)
+        self._exact_keys.add((entry.get("original", ""), entry.get("translated", "")))
+        self._reason_bands.append(self._reason_band_set(entry.get("reason", "")))
+        self._original_index.add(position, entry.get("original", "").lower())
+        self._translated_index.add(position, entry.get("translated", "").lower())
+
+    def _reason_band_set(self, reason: str) -> set:
+        """
+        Возвращает множество полос LSH-сигнатур причины (для быстрого отсева кандидатов).
+
+        Сигнатуры строятся отдельно по триграммам слов и символов (см. _FieldIndex).
+
+        Args:
+            reason: Причина проблемы
+
+        Returns:
+            set: Множество троек (вид шинглов, номер полосы, значения полосы)
+        """
+        index = self._reason_lsh
+        bands = set()
+        for kind, shingles in enumerate(shingle_kinds(reason.lower())):
+            signature = index.signature(shingles)
+            bands.update((kind, i, signature[i * index.rows:(i + 1) * index.rows]) for i in range(index.bands))
+        return bands
+
+    def _migrate_legacy(self) -> None:
+        """Переносит записи из старого JSON-файла в JSONL (однократно)."""
+        if os.path.exists(self.improvements_file) or not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                legacy_entries = json.load(f)
+            tmp_file = self.improvements_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for entry in legacy_entries if isinstance(legacy_entries, list) else []:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_file, self.improvements_file)
+            log_info(f"Улучшения промпта перенесены из {self.legacy_file} в {self.improvements_file}")
+        except Exception as e:
+            log_error(f"Ошибка переноса улучшений промпта из {self.legacy_file}: {e}")
+
+    def _refresh(self) -> None:
+        """Дочитывает строки, добавленные в файл после последнего чтения."""
+        try:
+            stat = os.stat(self.improvements_file)
+        except FileNotFoundError:
+            if self._entries:
+                self._reset()
+                self.generation += 1
+            return
+
+        # Файл был перезаписан целиком (например, консолидацией) - читаем заново
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._reset()
+            self._inode = stat.st_ino
+            self.generation += 1
+
+        if stat.st_size == self._offset:
+            return
+
+        with open(self.improvements_file, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+
+        # Неполную последнюю строку (запись еще идет) оставляем до следующего чтения
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                log_error(f"Пропущена поврежденная строка в {self.improvements_file}: {e}")
+                continue
+            if isinstance(entry, dict):
+                self._index_entry(entry)
+        self._offset += end
+        if end:
+            self.generation += 1
+
+    def all(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает все записи хранилища в порядке добавления.
+
+        Returns:
+            List[Dict[str, Any]]: Список улучшений
+        """
+        with self._lock:
+            self._migrate_legacy()
+            self._refresh()
+            return list(self._entries)
+
+    def find_duplicate(self, original: str, translated: str, reason: str) -> Optional[Tuple[Dict[str, Any], float, float, float]]:
+        """
+        Ищет существующую проблему, совпадающую с новой или похожую на нее.
+
+        Args:
+            original: Фрагмент оригинала
+            translated: Фрагмент перевода
+            reason: Причина проблемы
+
+        Returns:
+            Optional[Tuple]: (запись, схожесть причины, схожесть оригинала, схожесть перевода) или None
+        """
+        from utils.prompt_utils import calculate_similarity
+
+        if (original, translated) in self._exact_keys:
+            return {"original": original, "translated": translated}, 1.0, 1.0, 1.0
+
+        # Дубликат требует схожести оригинала или перевода - берем кандидатов из этих индексов
+        candidates = self._original_index.query(original.lower())
+        candidates |= self._translated_index.query(translated.lower())
+        reason_bands = self._reason_band_set(reason)
+
+        # Сначала проверяем более свежие записи
+        for position in sorted(candidates, reverse=True):
+            # ... и схожести причины: без общей полосы LSH причина почти наверняка не похожа
+            if not reason_bands & self._reason_bands[position]:
+                continue
+            existing = self._entries[position]
+            reason_similarity = calculate_similarity(reason.lower(), existing.get("reason", "").strip().lower())
+            if reason_similarity <= REASON_SIMILARITY_THRESHOLD:
+                continue
+            original_similarity = calculate_similarity(original.lower(), existing.get("original", "").strip().lower())
+            translated_similarity = calculate_similarity(translated.lower(), existing.get("translated", "").strip().lower())
+            if original_similarity > TEXT_SIMILARITY_THRESHOLD or translated_similarity > TEXT_SIMILARITY_THRESHOLD:
+                return existing, reason_similarity, original_similarity, translated_similarity
+        return None
+
+    def add(self, entry: Dict[str, Any]) -> bool:
+        """
+        Добавляет улучшение, если похожей проблемы еще нет.
+
+        Args:
+            entry: Запись улучшения (original, translated, reason)
+
+        Returns:
+            bool: True, если запись добавлена, False если найден дубликат
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(self.improvements_file), exist_ok=True)
+            with FileLock(self.lock_file):
+                self._migrate_legacy()
+                self._refresh()
+
+                duplicate = self.find_duplicate(entry["original"], entry["translated"], entry["reason"])
+                if duplicate is not None:
+                    _, reason_similarity, original_similarity, translated_similarity = duplicate
+                    if reason_similarity == 1.0 and original_similarity == 1.0:
+                        log_info("Точное совпадение улучшения найдено, пропускаем")
+                    else:
+                        log_info(f"Схожая проблема уже существует (схожесть причины: {reason_similarity:.2f}, "
+                                 f"схожесть оригинала: {original_similarity:.2f}, "
+                                 f"схожесть перевода: {translated_similarity:.2f})")
+                    return False
+
+                line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+                with open(self.improvements_file, 'ab') as f:
+                    f.write(line)
+                # Наша строка уже записана - учитываем ее без повторного чтения файла
+                self._refresh()
+                return True
+
+    def replace_all(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Атомарно заменяет содержимое хранилища.
+
+        Args:
+            entries: Новый список улучшений
+        """
+        self.rewrite(lambda _: entries)
+
+    def rewrite(self, transform: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]) -> int:
+        """
+        Атомарно перезаписывает хранилище результатом transform(текущие записи).
+
+        Чтение и запись выполняются под одной межпроцессной блокировкой, поэтому записи,
+        добавленные другими процессами во время преобразования, не теряются.
+
+        Args:
+            transform: Функция, получающая актуальный список записей и возвращающая новый
+
+        Returns:
+            int: Количество записей после перезаписи
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(self.improvements_file), exist_ok=True)
+            with FileLock(self.lock_file):
+                self._migrate_legacy()
+                self._refresh()
+                entries = transform(list(self._entries))
+                tmp_file = self.improvements_file + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    for entry in entries:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                os.replace(tmp_file, self.improvements_file)
+                self._refresh()
+                return len(entries)
+
+_stores: Dict[str, ImprovementStore] = {}
+_stores_lock = threading.Lock()
+
+def get_improvement_store(improvements_file: str) -> ImprovementStore:
+    """
+    Возвращает общий для процесса экземпляр хранилища для файла улучшений.
+
+    Args:
+        improvements_file: Путь к JSONL-файлу улучшений
+
+    Returns:
+        ImprovementStore: Хранилище улучшений
+    """
+    with _stores_lock:
+        store = _stores.get(improvements_file)
+        if store is None:
+            store = ImprovementStore(improvements_file)
+            _stores[improvements_file] = store
+        return store
@@ -1,103 +1,197 @@
 import os
-import time
+import sys
+import json
+import queue
+import atexit
 import logging
-from typing import Optional
+import logging.handlers
+from typing import Any, Optional
 
 # Настройка логгера
 logger = logging.getLogger("translation_system")
+logger.propagate = False
 
-def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None) -> None:
+# Форматы вывода логов
+LOG_FORMATS = ("text", "json")
+
+# Префиксы уровней в текстовом формате (как в выводе print прежних версий)
+_LEVEL_PREFIXES = {
+    logging.DEBUG: "ОТЛАДКА: ",
+    logging.WARNING: "ПРЕДУПРЕЖДЕНИЕ: ",
+    logging.ERROR: "ОШИБКА: ",
+    logging.CRITICAL: "ОШИБКА: ",
+}
+
+# Поля контекста, которые можно передать в log_* (file=..., lang=..., part=...)
+CONTEXT_FIELDS = ("file", "lang", "part")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class TextFormatter(logging.Formatter):
+    """Текстовый формат: "[ЧЧ:ММ:СС] ОШИБКА: сообщение"."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.prefix = _LEVEL_PREFIXES.get(record.levelno, "")
+        return super().format(record)
+
+class JsonFormatter(logging.Formatter):
+    """Формат JSON Lines: время, уровень, сообщение и поля контекста (file, lang, part)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Передает записи в очередь без предварительного форматирования.
+
+    Стандартный QueueHandler форматирует сообщение в потоке вызова и удаляет args;
+    здесь форматирование выполняется только в потоке QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def _make_formatter(log_format: str, date_format: str) -> logging.Formatter:
+    if log_format == "json":
+        return JsonFormatter()
+    return TextFormatter("[%(asctime)s] %(prefix)s%(message)s", date_format)
+
+def _console_handler(log_format: str = "text") -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_make_formatter(log_format, "%H:%M:%S"))
+    return handler
+
+def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None, log_format: str = "text") -> None:
     """
     Настраивает систему логирования с указанным уровнем и, опционально, выводом в файл.
-    
+
+    Записи из рабочих потоков попадают в очередь (QueueHandler), а форматирование
+    и вывод в консоль и файл выполняются одним фоновым потоком (QueueListener),
+    поэтому потоки перевода не ждут друг друга на вводе-выводе. Сообщения
+    библиотек (openai, httpx) уровня WARNING и выше идут через ту же очередь.
+
     Args:
         log_level: Уровень логирования (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Опциональный путь к файлу для сохранения логов
+        log_format: Формат вывода: text или json (JSON Lines с полями file, lang, part)
     """
+    global _listener
     # Преобразование строки уровня логирования в константу
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
-    
-    # Базовая конфигурация
-    log_format = "[%(asctime)s] %(levelname)s: %(message)s"
-    date_format = "%H:%M:%S"
-    
-    # Настройка обработчиков в зависимости от наличия файла логов
-    handlers = []
-    
-    # Консольный обработчик
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(log_format, date_format))
-    handlers.append(console_handler)
-    
+    if log_format not in LOG_FORMATS:
+        log_format = "text"
+
+    shutdown_logging()
+    logger.removeHandler(_default_handler)
+
+    handlers = [_console_handler(log_format)]
+
     # Файловый обработчик (если указан файл)
     if log_file:
         # Создаем директорию для файла логов, если она не существует
         log_dir = os.path.dirname(log_file)
-        if log_dir and not os.path.exists(log_dir):
+        if log_dir:
             os.makedirs(log_dir, exist_ok=True)
-        
+
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(logging.Formatter(
-            "[%(asctime)s] %(levelname)s: %(message)s",
-            "%Y-%m-%d %H:%M:%S"
-        ))
+        file_handler.setFormatter(_make_formatter(log_format, "%Y-%m-%d %H:%M:%S"))
         handlers.append(file_handler)
-    
-    # Конфигурация логгера
-    logging.basicConfig(
-        level=numeric_level,
-        handlers=handlers,
-        format=log_format,
-        datefmt=date_format
-    )
-    
-    # Устанавливаем уровень для нашего логгера
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+
     logger.setLevel(numeric_level)
-    
-    # Добавляем обработчики к нашему логгеру
-    for handler in handlers:
-        logger.addHandler(handler)
-    
-    logger.info(f"Логирование настроено с уровнем {log_level}")
-
-def log_info(message: str) -> None:
+    logger.addHandler(queue_handler)
+    # Сообщения сторонних библиотек: единый путь вывода вместо basicConfig
+    logging.getLogger().addHandler(queue_handler)
+
+    logger.debug("Логирование настроено с уровнем %s (формат %s)", log_level, log_format)
+
+def shutdown_logging() -> None:
+    """
+    Дописывает оставшиеся в очереди записи и останавливает фоновый поток логирования.
+
+    Последующие сообщения выводятся в консоль напрямую.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    for target in (logger, logging.getLogger()):
+        for handler in list(target.handlers):
+            if isinstance(handler, _QueueHandler):
+                target.removeHandler(handler)
+    if _default_handler not in logger.handlers:
+        logger.addHandler(_default_handler)
+
+atexit.register(shutdown_logging)
+
+# До вызова setup_logging (например, при загрузке конфигурации) сообщения выводятся в консоль напрямую
+_default_handler = _console_handler()
+logger.addHandler(_default_handler)
+logger.setLevel(logging.INFO)
+
+def _log(level: int, message: str, args: tuple, fields: dict) -> None:
+    if logger.isEnabledFor(level):
+        extra = {key: value for key, value in fields.items() if key in CONTEXT_FIELDS}
+        logger.log(level, message, *args, extra=extra or None)
+
+def log_info(message: str, *args: Any, **fields: Any) -> None:
     """
     Выводит информационное сообщение с отметкой времени.
-    
+
     Args:
-        message: Текст сообщения
+        message: Текст сообщения (может содержать %-подстановки для args)
+        *args: Аргументы подстановки (форматируются только при выводе)
+        **fields: Поля контекста для формата json: file, lang, part
     """
-    timestamp = time.strftime('%H:%M:%S', time.localtime())
-    print(f"[{timestamp}] {message}")
-    logger.info(message)
+    _log(logging.INFO, message, args, fields)
 
-def log_error(message: str) -> None:
+def log_error(message: str, *args: Any, **fields: Any) -> None:
     """
     Выводит сообщение об ошибке с отметкой времени.
-    
+
     Args:
-        message: Текст сообщения об ошибке
+        message: Текст сообщения об ошибке (может содержать %-подстановки для args)
+        *args: Аргументы подстановки
+        **fields: Поля контекста: file, lang, part
     """
-    timestamp = time.strftime('%H:%M:%S', time.localtime())
-    print(f"[{timestamp}] ОШИБКА: {message}")
-    logger.error(message)
+    _log(logging.ERROR, message, args, fields)
 
-def log_debug(message: str) -> None:
+def log_debug(message: str, *args: Any, **fields: Any) -> None:
     """
     Выводит отладочное сообщение (только если уровень логирования DEBUG).
-    
+
     Args:
-        message: Текст отладочного сообщения
+        message: Текст отладочного сообщения (может содержать %-подстановки для args)
+        *args: Аргументы подстановки
+        **fields: Поля контекста: file, lang, part
     """
-    logger.debug(message)
+    _log(logging.DEBUG, message, args, fields)
 
-def log_warning(message: str) -> None:
+def log_warning(message: str, *args: Any, **fields: Any) -> None:
     """
     Выводит предупреждение.
-    
+
     Args:
-        message: Текст предупреждения
+        message: Текст предупреждения (может содержать %-подстановки для args)
+        *args: Аргументы подстановки
+        **fields: Поля контекста: file, lang, part
     """
-    timestamp = time.strftime('%H:%M:%S', time.localtime())
-    print(f"[{timestamp}] ПРЕДУПРЕЖДЕНИЕ: {message}")
-    logger.warning(message) 
\ No newline at end of file
+    _log(logging.WARNING, message, args, fields)
@@ -0,0 +1,198 @@
+import re
+import hashlib
+from typing import List
+from utils.structure_checks import FENCE_PATTERN, ADMONITION_PATTERN
+
+# Открывающая строка admonition-блока Docusaurus (:::note, :::tip Заголовок); закрывающая - только ":::"
+ADMONITION_OPEN_PATTERN = re.compile(r'^\s*:::+\s*\w')
+
+def split_blocks(text: str) -> List[str]:
+    """
+    Разбивает markdown/MDX текст на блоки - единицы памяти переводов.
+
+    Блоки разделяются пустыми строками; блок кода и admonition-блок (:::note ... :::)
+    вместе с пустыми строками внутри считаются одним блоком, поэтому повторяющиеся
+    врезки и примеры находятся в памяти переводов целиком.
+
+    Args:
+        text: Текст (без фронтматтера)
+
+    Returns:
+        List[str]: Блоки без окружающих пустых строк
+    """
+    blocks = []
+    current: List[str] = []
+    fence = ""
+    admonition_depth = 0
+
+    for line in text.split('\n'):
+        fence_match = FENCE_PATTERN.match(line)
+        if fence:
+            current.append(line)
+            if fence_match and fence_match.group(1).startswith(fence) and not fence_match.group(2).strip():
+                fence = ""
+            continue
+        if fence_match:
+            fence = fence_match.group(1)
+            current.append(line)
+            continue
+
+        if ADMONITION_OPEN_PATTERN.match(line):
+            admonition_depth += 1
+        elif admonition_depth and ADMONITION_PATTERN.match(line) and line.strip().strip(':') == "":
+            admonition_depth -= 1
+            current.append(line)
+            continue
+
+        if not line.strip() and not admonition_depth:
+            if current:
+                blocks.append('\n'.join(current))
+                current = []
+            continue
+        current.append(line)
+
+    if current:
+        blocks.append('\n'.join(current))
+    # Пустые строки в конце незакрытого admonition-блока не входят в блок
+    return [block.strip('\n') for block in blocks if block.strip()]
+
+def normalize_block(block: str) -> str:
+    """
+    Нормализует блок для точного сравнения: пробелы в конце строк и пустые строки по краям
+    блока не учитываются. Отступ в начале строк сохраняется: блок внутри пункта списка
+    и такой же блок без отступа переводятся и хранятся отдельно.
+
+    Args:
+        block: Блок текста
+
+    Returns:
+        str: Нормализованный блок
+    """
+    return '\n'.join(line.rstrip() for line in block.strip('\n').split('\n')).strip('\n')
+
+def leading_indent(block: str) -> str:
+    """
+    Возвращает отступ первой строки блока.
+
+    Args:
+        block: Блок текста
+
+    Returns:
+        str: Пробелы и табуляции в начале первой непустой строки
+    """
+    first = block.strip('\n').split('\n')[0]
+    return first[:len(first) - len(first.lstrip(' \t'))]
+
+def with_indent(block: str, indent: str) -> str:
+    """
+    Заменяет отступ первой строки блока (остальные строки не меняются).
+
+    Args:
+        block: Блок текста
+        indent: Новый отступ
+
+    Returns:
+        str: Блок с отступом indent в первой строке
+    """
+    block = block.strip('\n')
+    return indent + block.lstrip(' \t')
+
+def block_key(block: str) -> str:
+    """
+    Возвращает ключ блока для точного поиска в памяти переводов.
+
+    Args:
+        block: Блок текста
+
+    Returns:
+        str: SHA-1 нормализованного блока
+    """
+    return hashlib.sha1(normalize_block(block).encode('utf-8')).hexdigest()
+
+def join_blocks(blocks: List[str]) -> str:
+    """
+    Собирает текст из блоков (обратная операция к split_blocks).
+
+    Args:
+        blocks: Блоки текста
+
+    Returns:
+        str: Блоки, разделенные пустой строкой
+    """
+    return '\n\n'.join(blocks)
+
+# Элементы блоков, по которым выравниваются оригинал и перевод
+HEADING_BLOCK_PATTERN = re.compile(r'^(#{1,6})\s')
+LIST_ITEM_PATTERN = re.compile(r'^(\s*)([-*+]|\d+[.)])\s')
+TABLE_ROW_PATTERN = re.compile(r'^\s*\|.*\|\s*$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\s*\|?[\s:|-]+\|?\s*$')
+JSX_TAG_PATTERN = re.compile(r'^\s*</?([A-Za-z][\w.]*)')
+MDX_LINE_PATTERN = re.compile(r'^(import|export)\s')
+INLINE_CODE_PATTERN = re.compile(r'`[^`\n]+`')
+INLINE_LINK_PATTERN = re.compile(r'\]\(([^)\s]+)')
+
+def block_kind(block: str) -> str:
+    """
+    Возвращает структурный тип блока, не зависящий от языка текста.
+
+    Тип включает то, что перевод сохраняет: уровень заголовка, язык и длину блока
+    кода, тип admonition, количество пунктов списка и строк таблицы, тег JSX,
+    количество строк кода и ссылок в абзаце.
+    Совпадение типов - признак того, что блоки оригинала и перевода соответствуют
+    друг другу.
+
+    Args:
+        block: Блок текста (см. split_blocks)
+
+    Returns:
+        str: Тип блока, например "h2", "code:bash:3", "list:4", "table:5", "p:1:0", "p"
+    """
+    lines = block.strip('\n').split('\n')
+    first = lines[0]
+    fence_match = FENCE_PATTERN.match(first)
+    if fence_match:
+        return f"code:{fence_match.group(2).strip().split(' ')[0]}:{len(lines)}"
+    heading_match = HEADING_BLOCK_PATTERN.match(first)
+    if heading_match and len(lines) == 1:
+        return f"h{len(heading_match.group(1))}"
+    if ADMONITION_OPEN_PATTERN.match(first):
+        return "admonition:" + first.strip().strip(':').split()[0]
+    if MDX_LINE_PATTERN.match(first):
+        return "mdx:" + block.strip()
+    if all(TABLE_ROW_PATTERN.match(line) for line in lines):
+        return f"table:{len(lines)}"
+    if LIST_ITEM_PATTERN.match(first):
+        return f"list:{sum(1 for line in lines if LIST_ITEM_PATTERN.match(line))}"
+    tag_match = JSX_TAG_PATTERN.match(first)
+    if tag_match:
+        return "jsx:" + tag_match.group(1)
+    # Абзац: количество строк кода и ссылок различает соседние абзацы
+    code_spans, links = len(INLINE_CODE_PATTERN.findall(block)), len(INLINE_LINK_PATTERN.findall(block))
+    return f"p:{code_spans}:{links}" if code_spans or links else "p"
+
+def split_units(block: str) -> List[str]:
+    """
+    Разбивает блок списка или таблицы на пункты и строки (с вложенными строками пункта).
+
+    Args:
+        block: Блок текста
+
+    Returns:
+        List[str]: Пункты списка, строки таблицы (кроме разделителя) или [block] для остальных блоков
+    """
+    lines = block.strip('\n').split('\n')
+    if all(TABLE_ROW_PATTERN.match(line) for line in lines):
+        return [line for line in lines if not TABLE_SEPARATOR_PATTERN.match(line)]
+    list_match = LIST_ITEM_PATTERN.match(lines[0])
+    if not list_match:
+        return [block]
+    indent = len(list_match.group(1))
+    units: List[str] = []
+    for line in lines:
+        item_match = LIST_ITEM_PATTERN.match(line)
+        if item_match and len(item_match.group(1)) == indent or not units:
+            units.append(line)
+        else:
+            # Продолжение или вложенный пункт относятся к текущему пункту
+            units[-1] += '\n' + line
+    return units
@@ -0,0 +1,427 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+from utils.logger import log_info, log_error
+
+# Директория метрик по умолчанию (в корне проекта)
+DEFAULT_METRICS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics")
+
+# Записи истории копятся в памяти и дописываются в файл пачками: по количеству или по времени
+FLUSH_RECORDS = 64
+FLUSH_SECONDS = 5.0
+
+# Счетчики, суммируемые по запросам
+COUNTER_FIELDS = ("requests", "errors", "prompt_tokens", "completion_tokens", "cached_tokens", "retries", "latency")
+
+# Состояние текущего запроса потока (число повторов, выполненных клиентом API)
+_request_state = threading.local()
+
+def begin_request() -> None:
+    """Сбрасывает счетчик повторов и адрес API перед запросом к API в текущем потоке."""
+    _request_state.retries = 0
+    _request_state.endpoint = None
+    _request_state.endpoint_model = None
+
+def note_retry() -> None:
+    """Отмечает повтор запроса к API в текущем потоке."""
+    _request_state.retries = getattr(_request_state, "retries", 0) + 1
+
+def note_endpoint(name: str, model: Optional[str] = None) -> None:
+    """
+    Отмечает адрес API (из пула адресов), обслуживший текущий запрос потока.
+
+    Args:
+        name: Имя адреса
+        model: Модель адреса (если переопределяет модель запроса)
+    """
+    _request_state.endpoint = name
+    _request_state.endpoint_model = model
+
+def request_retries() -> int:
+    """
+    Возвращает количество повторов текущего запроса потока.
+
+    Returns:
+        int: Количество повторов с последнего begin_request()
+    """
+    return getattr(_request_state, "retries", 0)
+
+class _RetryFilter(logging.Filter):
+    """
+    Считает повторы запросов клиента OpenAI по его сообщениям "Retrying request ...".
+
+    Повторы выполняются SDK синхронно в потоке вызова, поэтому счетчик потока
+    относится к текущему запросу. Фильтр пропускает дальше только те записи,
+    которые прошли бы при исходном уровне логгера.
+    """
+
+    def __init__(self, original_level: int):
+        super().__init__()
+        self.original_level = original_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("Retrying request"):
+            note_retry()
+        return record.levelno >= self.original_level
+
+_retry_filter_installed = False
+
+def install_retry_counter() -> None:
+    """Подключает подсчет повторов запросов клиента OpenAI (один раз на процесс)."""
+    global _retry_filter_installed
+    if _retry_filter_installed:
+        return
+    client_logger = logging.getLogger("openai._base_client")
+    client_logger.addFilter(_RetryFilter(client_logger.getEffectiveLevel()))
+    client_logger.setLevel(min(client_logger.getEffectiveLevel(), logging.INFO))
+    _retry_filter_installed = True
+
+class MetricsCollector:
+    """
+    Потокобезопасный сборщик метрик запросов к API.
+
+    Каждый запрос записывается строкой в metrics/requests_<ГГГГ-ММ>.jsonl (история
+    для команды report); строки дописываются пачками вне блокировки счетчиков
+    и при завершении запуска (finish, выход из процесса). Агрегаты по языку, модели, виду запроса и результату
+    в конце запуска выгружаются в Prometheus textfile metrics/<команда>.prom.
+    """
+
+    def __init__(self, command: str = "translate", metrics_dir: Optional[str] = None, enabled: bool = True):
+        """
+        Инициализирует сборщик.
+
+        Args:
+            command: Название команды (translate, translate_target, validate)
+            metrics_dir: Директория для файлов метрик
+            enabled: Записывать метрики на диск (иначе только в памяти)
+        """
+        self.command = command
+        self.metrics_dir = metrics_dir or DEFAULT_METRICS_DIR
+        self.enabled = enabled
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, str, str, str], Dict[str, float]] = defaultdict(
+            lambda: dict.fromkeys(COUNTER_FIELDS, 0)
+        )
+        self._files: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        self._endpoints: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        self._pending: List[Dict[str, Any]] = []
+        self._last_flush = time.monotonic()
+        self._write_lock = threading.Lock()
+
+    def record_request(self, kind: str, file_path: Optional[str], part: Optional[int], language: str, model: str,
+                       prompt_tokens: int = 0, completion_tokens: int = 0, cached_tokens: int = 0,
+                       latency: float = 0.0, retries: int = 0, outcome: str = "ok", **extra: Any) -> None:
+        """
+        Записывает метрики одного запроса к API.
+
+        Args:
+            kind: Вид запроса (translate, validate)
+            file_path: Относительный путь файла
+            part: Номер части файла
+            language: Целевой язык
+            model: Модель
+            prompt_tokens: Токены промпта
+            completion_tokens: Токены ответа
+            cached_tokens: Токены промпта, взятые из кэша провайдера
+            latency: Длительность запроса в секундах
+            retries: Количество повторов запроса
+            outcome: Результат (ok, error, ...)
+            **extra: Дополнительные поля записи
+        """
+        # Адрес и модель из пула адресов API, если запрос обслужен им
+        endpoint = extra.pop("endpoint", None) or getattr(_request_state, "endpoint", None)
+        model = getattr(_request_state, "endpoint_model", None) or model
+
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "run_id": self.run_id,
+            "command": self.command,
+            "kind": kind,
+            "file": file_path,
+            "part": part,
+            "language": language,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "latency": round(latency, 4),
+            "retries": retries,
+            "outcome": outcome
+        }
+        if endpoint:
+            record["endpoint"] = endpoint
+        record.update(extra)
+
+        with self._lock:
+            targets = [self._counters[(language, model, kind, outcome)], self._files[file_path or ""]]
+            if endpoint:
+                targets.append(self._endpoints[endpoint])
+            for counters in targets:
+                counters["requests"] += 1
+                counters["errors"] += outcome != "ok"
+                counters["prompt_tokens"] += prompt_tokens
+                counters["completion_tokens"] += completion_tokens
+                counters["cached_tokens"] += cached_tokens
+                counters["retries"] += retries
+                counters["latency"] += latency
+
+            if not self.enabled:
+                return
+            self._pending.append(record)
+            flush = (len(self._pending) >= FLUSH_RECORDS
+                     or time.monotonic() - self._last_flush >= FLUSH_SECONDS)
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Дописывает накопленные записи в файлы истории (requests_<ГГГГ-ММ>.jsonl по времени записи)."""
+        with self._write_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if not records:
+                return
+            by_month: Dict[str, List[str]] = defaultdict(list)
+            for record in records:
+                by_month[record["timestamp"][:7]].append(json.dumps(record, ensure_ascii=False) + "\n")
+            try:
+                os.makedirs(self.metrics_dir, exist_ok=True)
+                for month, lines in by_month.items():
+                    with open(os.path.join(self.metrics_dir, f"requests_{month}.jsonl"), 'a', encoding='utf-8') as f:
+                        f.writelines(lines)
+            except OSError as e:
+                log_error(f"Ошибка записи метрик: {e}")
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Возвращает суммарные счетчики запуска.
+
+        Returns:
+            Dict[str, float]: Сумма счетчиков по всем запросам
+        """
+        with self._lock:
+            totals = dict.fromkeys(COUNTER_FIELDS, 0)
+            for counters in self._counters.values():
+                for field in COUNTER_FIELDS:
+                    totals[field] += counters[field]
+            return totals
+
+    def file_totals(self) -> Dict[str, Dict[str, float]]:
+        """
+        Возвращает счетчики по файлам.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Счетчики по относительным путям файлов
+        """
+        with self._lock:
+            return {file_path: dict(counters) for file_path, counters in self._files.items()}
+
+    def endpoint_totals(self) -> Dict[str, Dict[str, float]]:
+        """
+        Возвращает счетчики по адресам API (при использовании пула адресов).
+
+        Returns:
+            Dict[str, Dict[str, float]]: Счетчики по именам адресов
+        """
+        with self._lock:
+            return {name: dict(counters) for name, counters in self._endpoints.items()}
+
+    def render_prometheus(self) -> str:
+        """
+        Формирует метрики запуска в текстовом формате Prometheus.
+
+        Returns:
+            str: Содержимое textfile для node_exporter
+        """
+        metrics = [
+            ("requests", "translation_api_requests_total", "counter", "API requests"),
+            ("prompt_tokens", "translation_api_prompt_tokens_total", "counter", "Prompt tokens"),
+            ("completion_tokens", "translation_api_completion_tokens_total", "counter", "Completion tokens"),
+            ("cached_tokens", "translation_api_cached_tokens_total", "counter", "Cached prompt tokens"),
+            ("retries", "translation_api_retries_total", "counter", "Client retries"),
+            ("latency", "translation_api_request_duration_seconds_sum", "counter", "Total request latency"),
+        ]
+        with self._lock:
+            counters = {key: dict(value) for key, value in self._counters.items()}
+        endpoints = self.endpoint_totals()
+
+        lines = []
+        for field, name, metric_type, help_text in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (language, model, kind, outcome), values in sorted(counters.items()):
+                labels = (f'command="{self.command}",language="{language}",model="{model}",'
+                          f'kind="{kind}",outcome="{outcome}"')
+                lines.append(f"{name}{{{labels}}} {values[field]:g}")
+        for field, name in (("requests", "translation_api_endpoint_requests_total"),
+                            ("errors", "translation_api_endpoint_errors_total"),
+                            ("latency", "translation_api_endpoint_request_duration_seconds_sum")):
+            if not endpoints:
+                break
+            lines.append(f"# HELP {name} Per-endpoint {field}")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, values in sorted(endpoints.items()):
+                lines.append(f'{name}{{command="{self.command}",endpoint="{endpoint}"}} {values[field]:g}')
+        lines.append("# HELP translation_run_timestamp_seconds Last run finish time")
+        lines.append("# TYPE translation_run_timestamp_seconds gauge")
+        lines.append(f'translation_run_timestamp_seconds{{command="{self.command}"}} {time.time():.0f}')
+        return "\n".join(lines) + "\n"
+
+    def finish(self) -> Dict[str, float]:
+        """
+        Завершает запуск: записывает Prometheus textfile и выводит итоги.
+
+        Returns:
+            Dict[str, float]: Суммарные счетчики запуска
+        """
+        totals = self.totals()
+        if self.enabled:
+            self.flush()
+            try:
+                os.makedirs(self.metrics_dir, exist_ok=True)
+                prom_file = os.path.join(self.metrics_dir, f"{self.command}.prom")
+                tmp_file = prom_file + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(self.render_prometheus())
+                os.replace(tmp_file, prom_file)
+            except OSError as e:
+                log_error(f"Ошибка записи метрик Prometheus: {e}")
+
+        if totals["requests"]:
+            log_info(
+                f"Метрики запуска: запросов {totals['requests']:.0f} (ошибок {totals['errors']:.0f}, "
+                f"повторов {totals['retries']:.0f}), токенов промпта {totals['prompt_tokens']:.0f} "
+                f"(из кэша {totals['cached_tokens']:.0f}, {cache_hit_rate(totals):.0%}), ответа {totals['completion_tokens']:.0f}, "
+                f"среднее время запроса {totals['latency'] / totals['requests']:.2f} с"
+            )
+        for endpoint, counters in sorted(self.endpoint_totals().items()):
+            log_info(
+                f"Адрес API '{endpoint}': запросов {counters['requests']:.0f} (ошибок {counters['errors']:.0f}), "
+                f"токенов {counters['prompt_tokens'] + counters['completion_tokens']:.0f}, "
+                f"среднее время запроса {counters['latency'] / counters['requests']:.2f} с"
+            )
+        return totals
+
+_metrics = MetricsCollector(enabled=False)
+
+def init_metrics(command: str, metrics_config: Optional[Dict[str, Any]] = None) -> MetricsCollector:
+    """
+    Создает сборщик метрик запуска по секции metrics конфигурации.
+
+    Args:
+        command: Название команды (translate, translate_target, validate)
+        metrics_config: Секция metrics из config.yaml
+
+    Returns:
+        MetricsCollector: Новый текущий сборщик
+    """
+    global _metrics
+    metrics_config = metrics_config or {}
+    _metrics = MetricsCollector(command, metrics_config.get("dir"), metrics_config.get("enabled", True))
+    # Записи, не дописанные из-за ошибки до finish(), сохраняются при выходе из процесса
+    atexit.register(_metrics.flush)
+    install_retry_counter()
+    return _metrics
+
+def get_metrics() -> MetricsCollector:
+    """
+    Возвращает текущий сборщик метрик (без init_metrics - только в памяти).
+
+    Returns:
+        MetricsCollector: Сборщик метрик
+    """
+    return _metrics
+
+def usage_tokens(usage: Any) -> Tuple[int, int, int]:
+    """
+    Извлекает количество токенов из объекта usage ответа API.
+
+    Args:
+        usage: response.usage (может отсутствовать у некоторых прокси)
+
+    Returns:
+        Tuple[int, int, int]: (токены промпта, токены ответа, токены промпта из кэша)
+    """
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) if details is not None else 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, cached_tokens or 0
+
+def load_history(metrics_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Загружает историю запросов из всех файлов requests_*.jsonl.
+
+    Args:
+        metrics_dir: Директория метрик
+
+    Returns:
+        List[Dict[str, Any]]: Записи о запросах
+    """
+    metrics_dir = metrics_dir or DEFAULT_METRICS_DIR
+    records = []
+    if not os.path.isdir(metrics_dir):
+        return records
+    for name in sorted(os.listdir(metrics_dir)):
+        if not (name.startswith("requests_") and name.endswith(".jsonl")):
+            continue
+        with open(os.path.join(metrics_dir, name), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        log_error(f"Пропущена поврежденная строка в {name}: {e}")
+    return records
+
+def cache_hit_rate(counters: Dict[str, float]) -> float:
+    """
+    Доля токенов промпта, взятых из кэша префиксов провайдера.
+
+    Args:
+        counters: Счетчики с полями prompt_tokens и cached_tokens
+
+    Returns:
+        float: Доля от 0 до 1 (0, если токенов промпта нет)
+    """
+    return counters["cached_tokens"] / counters["prompt_tokens"] if counters["prompt_tokens"] else 0.0
+
+def aggregate_history(records: List[Dict[str, Any]], group_by: List[str]) -> List[Dict[str, Any]]:
+    """
+    Агрегирует записи о запросах по месяцу, языку, модели и другим полям.
+
+    Args:
+        records: Записи о запросах
+        group_by: Поля группировки (month, language, model, kind, command, outcome, endpoint)
+
+    Returns:
+        List[Dict[str, Any]]: Строки отчета, отсортированные по значениям группировки
+    """
+    groups: Dict[Tuple, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for record in records:
+        key = tuple(
+            record.get("timestamp", "")[:7] if field == "month" else record.get(field)
+            for field in group_by
+        )
+        counters = groups[key]
+        counters["requests"] += 1
+        counters["errors"] += record.get("outcome", "ok") != "ok"
+        for field in ("prompt_tokens", "completion_tokens", "cached_tokens", "retries", "latency"):
+            counters[field] += record.get(field) or 0
+
+    rows = []
+    for key, counters in sorted(groups.items(), key=lambda item: tuple(str(value) for value in item[0])):
+        row = dict(zip(group_by, key))
+        row.update(counters)
+        row["total_tokens"] = counters["prompt_tokens"] + counters["completion_tokens"]
+        row["avg_latency"] = counters["latency"] / counters["requests"] if counters["requests"] else 0.0
+        row["cache_hit_rate"] = cache_hit_rate(counters)
+        rows.append(row)
+    return rows
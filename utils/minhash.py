@@ -0,0 +1,140 @@
+import zlib
+import threading
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+# Параметры MinHash/LSH: 10 полос по 3 строки дают кандидатов с высокой вероятностью
+# начиная с коэффициента Жаккара ~0.5 (P(0.7) ≈ 0.98, P(0.5) ≈ 0.74, P(0.3) ≈ 0.24)
+DEFAULT_BANDS = 10
+DEFAULT_ROWS = 3
+
+_MAX_HASH = (1 << 32) - 1
+
+def text_shingles(text: str) -> Set[str]:
+    """
+    Строит множество шинглов текста так же, как calculate_similarity:
+    для коротких текстов (меньше 3 слов) - слова, иначе триграммы слов и символов.
+
+    Args:
+        text: Текст (обычно в нижнем регистре)
+
+    Returns:
+        Set[str]: Множество шинглов
+    """
+    words = text.split()
+    if len(words) < 3:
+        return {f"w:{word}" for word in words}
+
+    shingles = {"w:" + ' '.join(words[i:i+3]) for i in range(len(words) - 2)}
+    text_clean = ''.join(c for c in text if c.isalnum() or c.isspace())
+    shingles.update("c:" + text_clean[i:i+3] for i in range(len(text_clean) - 2))
+    return shingles
+
+def shingle_kinds(text: str) -> List[Set[str]]:
+    """
+    Разделяет шинглы текста (см. text_shingles) на непустые множества триграмм слов и символов.
+
+    calculate_similarity - взвешенное среднее коэффициентов Жаккара этих множеств, поэтому
+    пара со схожестью выше порога похожа выше порога хотя бы по одному из них.
+
+    Args:
+        text: Текст (обычно в нижнем регистре)
+
+    Returns:
+        List[Set[str]]: Множества шинглов слов и символов (пустые не возвращаются)
+    """
+    shingles = text_shingles(text)
+    kinds = [{shingle for shingle in shingles if shingle.startswith(prefix)} for prefix in ("w:", "c:")]
+    return [kind for kind in kinds if kind]
+
+class MinHashLSH:
+    """
+    Индекс MinHash/LSH для поиска кандидатов на схожесть по коэффициенту Жаккара.
+
+    Сигнатура строится однопроходным MinHash (one permutation hashing): каждый шингл
+    хэшируется один раз и попадает в одну из корзин, пустые корзины заполняются
+    из соседних (densification). Это в десятки раз быстрее k независимых перестановок.
+    """
+
+    def __init__(self, bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS):
+        """
+        Инициализирует индекс.
+
+        Args:
+            bands: Количество полос LSH
+            rows: Количество строк сигнатуры в одной полосе
+        """
+        self.bands = bands
+        self.rows = rows
+        self.num_hashes = bands * rows
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def signature(self, shingles: Iterable[str]) -> Tuple[int, ...]:
+        """
+        Рассчитывает MinHash-сигнатуру множества шинглов.
+
+        Args:
+            shingles: Множество шинглов
+
+        Returns:
+            Tuple[int, ...]: Сигнатура длиной bands * rows
+        """
+        k = self.num_hashes
+        bins = [_MAX_HASH] * k
+        for shingle in shingles:
+            h = zlib.crc32(shingle.encode('utf-8'))
+            index = h % k
+            value = h // k
+            if value < bins[index]:
+                bins[index] = value
+
+        # Заполняем пустые корзины значением ближайшей непустой корзины справа (по кругу)
+        if _MAX_HASH in bins and any(value != _MAX_HASH for value in bins):
+            filled = list(bins)
+            for i in range(k):
+                if bins[i] == _MAX_HASH:
+                    distance = 1
+                    while bins[(i + distance) % k] == _MAX_HASH:
+                        distance += 1
+                    filled[i] = bins[(i + distance) % k] + distance * (_MAX_HASH // k)
+            bins = filled
+        return tuple(bins)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        return [signature[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+    def add(self, key: Hashable, signature: Tuple[int, ...]) -> None:
+        """
+        Добавляет запись в индекс.
+
+        Args:
+            key: Идентификатор записи
+            signature: MinHash-сигнатура записи
+        """
+        with self._lock:
+            for band, band_key in zip(self._buckets, self._band_keys(signature)):
+                band.setdefault(band_key, []).append(key)
+            self.size += 1
+
+    def query(self, signature: Tuple[int, ...]) -> Set[Hashable]:
+        """
+        Возвращает кандидатов, совпавших с сигнатурой хотя бы в одной полосе.
+
+        Args:
+            signature: MinHash-сигнатура запроса
+
+        Returns:
+            Set[Hashable]: Идентификаторы кандидатов
+        """
+        candidates: Set[Hashable] = set()
+        with self._lock:
+            for band, band_key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(band.get(band_key, ()))
+        return candidates
+
+    def clear(self) -> None:
+        """Очищает индекс."""
+        with self._lock:
+            self._buckets = [{} for _ in range(self.bands)]
+            self.size = 0
@@ -0,0 +1,224 @@
+import re
+import threading
+from typing import Dict, Any, Optional, Tuple
+from utils.logger import log_info, log_debug
+
+# Параметры маршрутизации по умолчанию (секция routing в config.yaml)
+DEFAULT_ROUTING = {
+    "enabled": False,
+    "fast_model": None,        # Модель для простых фрагментов
+    "strong_model": None,      # Модель для сложных фрагментов (по умолчанию api.model_name)
+    "fast_max_score": 0.35,    # Фрагменты со сложностью не выше порога отправляются быстрой модели
+    "long_tokens": 1500,       # Длина фрагмента (токены), при которой вклад длины максимален
+    "weights": {               # Вклад признаков в оценку сложности (сумма - 1)
+        "length": 0.35,
+        "code": 0.2,
+        "terms": 0.25,
+        "markup": 0.2,
+    },
+}
+
+# Строки таблиц, JSX/HTML-теги и MDX-выражения
+_TABLE_LINE = re.compile(r'^\s*\|.*\|\s*$')
+_MARKUP = re.compile(r'</?[A-Za-z][\w.]*[^>]*>|\{[^}\n]*\}')
+_FENCE = re.compile(r'^(```|~~~)')
+_HEADING_OR_LIST = re.compile(r'^\s*(#{1,6}\s|[-*+]\s|\d+[.)]\s)')
+_WORD = re.compile(r'\w+')
+
+def estimate_tokens(text: str) -> int:
+    """Оценка количества токенов (4 символа на токен)."""
+    return len(text) // 4 + 1
+
+def chunk_features(text: str, term_pattern: Optional[re.Pattern] = None) -> Dict[str, float]:
+    """
+    Вычисляет признаки сложности фрагмента.
+
+    Args:
+        text: Текст фрагмента
+        term_pattern: Регулярное выражение терминов глоссария
+
+    Returns:
+        Dict[str, float]: tokens, code (доля символов в блоках кода), terms (терминов на слово),
+                          markup (доля строк с таблицами и JSX), simple (доля заголовков и пунктов списков)
+    """
+    lines = text.splitlines() or [""]
+    code_chars = 0
+    in_code = False
+    markup_lines = 0
+    simple_lines = 0
+    text_lines = 0
+
+    for line in lines:
+        if _FENCE.match(line.strip()):
+            in_code = not in_code
+            code_chars += len(line) + 1
+            continue
+        if in_code:
+            code_chars += len(line) + 1
+            continue
+        if not line.strip():
+            continue
+        text_lines += 1
+        if _TABLE_LINE.match(line) or _MARKUP.search(line):
+            markup_lines += 1
+        elif _HEADING_OR_LIST.match(line) and len(line) < 120:
+            simple_lines += 1
+
+    words = len(_WORD.findall(text)) or 1
+    terms = len(term_pattern.findall(text)) if term_pattern is not None else 0
+    return {
+        "tokens": estimate_tokens(text),
+        "code": code_chars / max(len(text), 1),
+        "terms": terms / words,
+        "markup": markup_lines / max(text_lines, 1),
+        "simple": simple_lines / max(text_lines, 1),
+    }
+
+def complexity_score(features: Dict[str, float], settings: Dict[str, Any]) -> float:
+    """
+    Оценивает сложность фрагмента по признакам (0 - простой, 1 - сложный).
+
+    Args:
+        features: Признаки фрагмента (см. chunk_features)
+        settings: Параметры маршрутизации
+
+    Returns:
+        float: Оценка сложности
+    """
+    weights = settings["weights"]
+    length = min(features["tokens"] / settings["long_tokens"], 1.0)
+    # Плотность терминов: 1 термин на 10 слов уже считается высокой
+    terms = min(features["terms"] * 10, 1.0)
+    score = (weights.get("length", 0) * length + weights.get("code", 0) * features["code"]
+             + weights.get("terms", 0) * terms + weights.get("markup", 0) * features["markup"])
+    # Фрагменты только из заголовков и коротких пунктов списков упрощают задачу
+    return score * (1.0 - 0.5 * features["simple"])
+
+def model_price(pricing: Dict[str, Any], model: str) -> Tuple[float, float]:
+    """
+    Возвращает цену модели за миллион токенов промпта и ответа.
+
+    Args:
+        pricing: Секция pricing из config.yaml
+        model: Модель
+
+    Returns:
+        Tuple[float, float]: (цена промпта, цена ответа); нули, если цена не задана
+    """
+    price = pricing.get(model) or {}
+    return float(price.get("input", 0.0)), float(price.get("output", 0.0))
+
+class ModelRouter:
+    """
+    Выбор модели для фрагмента по его сложности.
+
+    Оценка учитывает длину фрагмента, долю кода, плотность терминов глоссария и долю
+    таблиц и JSX. Простые фрагменты (фронтматтер, заголовки, короткие списки)
+    отправляются быстрой модели, остальные - основной. Собирает статистику токенов
+    по уровням и оценивает экономию по ценам из секции pricing.
+    """
+
+    def __init__(self, settings: Dict[str, Any], glossary: Dict[str, Dict[str, str]],
+                 pricing: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            settings: Параметры маршрутизации (fast_model и strong_model заданы)
+            glossary: Глоссарий терминов
+            pricing: Цены моделей за миллион токенов (секция pricing)
+        """
+        self.settings = settings
+        self.fast_model = settings["fast_model"]
+        self.strong_model = settings["strong_model"]
+        self.pricing = pricing or {}
+        terms = sorted((re.escape(term) for term in glossary), key=len, reverse=True)
+        self.term_pattern = re.compile("|".join(terms), re.IGNORECASE) if terms else None
+        self._lock = threading.Lock()
+        self.stats = {tier: {"chunks": 0, "prompt_tokens": 0, "completion_tokens": 0} for tier in ("fast", "strong")}
+
+    def route(self, text: str, file_path: Optional[str] = None, part: Optional[int] = None) -> Tuple[str, str]:
+        """
+        Выбирает модель для фрагмента.
+
+        Args:
+            text: Текст фрагмента
+            file_path: Путь файла (для лога)
+            part: Номер части (для лога)
+
+        Returns:
+            Tuple[str, str]: (уровень fast или strong, модель)
+        """
+        features = chunk_features(text, self.term_pattern)
+        score = complexity_score(features, self.settings)
+        tier = "fast" if score <= self.settings["fast_max_score"] else "strong"
+        log_debug("Маршрутизация %s часть %s: сложность %.2f (токены %d, код %.2f, термины %.3f, разметка %.2f) -> %s",
+                  file_path or '', part, score, features['tokens'], features['code'], features['terms'],
+                  features['markup'], tier, file=file_path, part=part)
+        return tier, self.fast_model if tier == "fast" else self.strong_model
+
+    def record(self, tier: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Учитывает токены запроса, выполненного выбранной моделью.
+
+        Args:
+            tier: Уровень (fast или strong)
+            prompt_tokens: Токены промпта
+            completion_tokens: Токены ответа
+        """
+        with self._lock:
+            stats = self.stats[tier]
+            stats["chunks"] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+
+    def savings(self) -> float:
+        """
+        Оценивает экономию: стоимость фрагментов быстрой модели по цене основной минус фактическая.
+
+        Returns:
+            float: Экономия в долларах (0, если цены не заданы)
+        """
+        fast_in, fast_out = model_price(self.pricing, self.fast_model)
+        strong_in, strong_out = model_price(self.pricing, self.strong_model)
+        with self._lock:
+            fast = dict(self.stats["fast"])
+        return (fast["prompt_tokens"] * (strong_in - fast_in) + fast["completion_tokens"] * (strong_out - fast_out)) / 1e6
+
+    def log_summary(self) -> None:
+        """Выводит итоги маршрутизации."""
+        with self._lock:
+            stats = {tier: dict(values) for tier, values in self.stats.items()}
+        if not any(values["chunks"] for values in stats.values()):
+            return
+        parts = []
+        for tier, model in (("fast", self.fast_model), ("strong", self.strong_model)):
+            values = stats[tier]
+            parts.append(f"{tier} ({model}): {values['chunks']} фрагментов, "
+                         f"{values['prompt_tokens'] + values['completion_tokens']:,} токенов")
+        message = "Маршрутизация моделей: " + "; ".join(parts)
+        if self.pricing:
+            message += f"; экономия ~${self.savings():.4f}"
+        log_info(message)
+
+def create_model_router(config: Dict[str, Any], model_name: str,
+                        glossary: Dict[str, Dict[str, str]]) -> Optional[ModelRouter]:
+    """
+    Создает маршрутизатор моделей по секции routing конфигурации.
+
+    Args:
+        config: Общая конфигурация
+        model_name: Основная модель (api.model_name)
+        glossary: Глоссарий терминов
+
+    Returns:
+        Optional[ModelRouter]: Маршрутизатор или None, если маршрутизация выключена
+    """
+    settings = dict(DEFAULT_ROUTING)
+    routing_config = config.get("routing") or {}
+    settings.update({key: value for key, value in routing_config.items() if value is not None})
+    settings["weights"] = dict(DEFAULT_ROUTING["weights"], **(routing_config.get("weights") or {}))
+    if not settings["enabled"] or not settings["fast_model"]:
+        return None
+    settings["strong_model"] = settings["strong_model"] or model_name
+    log_info(f"Маршрутизация моделей: простые фрагменты -> {settings['fast_model']}, "
+             f"сложные -> {settings['strong_model']} (порог сложности {settings['fast_max_score']})")
+    return ModelRouter(settings, glossary, config.get("pricing"))
@@ -0,0 +1,390 @@
+import heapq
+from typing import Dict, List, Any, Optional, Tuple
+from utils.logger import log_info, log_warning
+from utils.config import get_language_config, get_part_token_limit, get_system_prompt
+from utils.file_utils import is_binary_file, remove_local_text, extract_frontmatter, split_content
+from utils.improvement_index import estimate_tokens, get_improvement_index
+from utils.improvement_store import get_improvement_store
+from utils.prompt_utils import get_improvements_file, format_prompt_improvement
+from utils.model_router import ModelRouter, model_price
+from utils.metrics import load_history
+from utils.git_utils import GitBlobReader
+from utils.translation_memory import get_translation_memory
+
+# Параметры планирования по умолчанию (секция planning в config.yaml)
+DEFAULT_PLANNING = {
+    "output_expansion": 1.0,          # Токенов перевода на токен оригинала (languages.<язык>.output_expansion)
+    "request_overhead_seconds": 1.5,  # Время запроса без учета генерации ответа, с
+    "output_tokens_per_second": 80.0, # Скорость генерации ответа, токенов/с
+    "requests_per_minute": None,      # Ограничение API на запросы в минуту (None - без ограничения)
+    "tokens_per_minute": None,        # Ограничение API на токены в минуту (None - без ограничения)
+    "calibrate": True,                # Уточнять время запроса по истории metrics/requests_*.jsonl
+    "min_history": 20,                # Минимум запросов модели в истории для калибровки
+}
+
+# Промпт перевода поля фронтматтера (см. translate_frontmatter), для оценки его размера
+_FRONTMATTER_PROMPT_TOKENS = 90
+
+# Инструкция уточнения черновика (см. Translator.translate_text)
+_REFINE_PROMPT_TOKENS = 60
+
+def get_planning_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Возвращает параметры планирования с подставленными значениями по умолчанию.
+
+    Args:
+        config: Общая конфигурация
+
+    Returns:
+        Dict[str, Any]: Параметры планирования
+    """
+    settings = dict(DEFAULT_PLANNING)
+    settings.update({key: value for key, value in (config.get("planning") or {}).items() if value is not None})
+    return settings
+
+def calibrate_latency(records: List[Dict[str, Any]], model: str, min_history: int) -> Optional[Tuple[float, float]]:
+    """
+    Оценивает время запроса модели по истории: latency = overhead + completion_tokens / tokens_per_second.
+
+    Args:
+        records: Записи истории запросов (load_history)
+        model: Модель
+        min_history: Минимум успешных запросов перевода для оценки
+
+    Returns:
+        Optional[Tuple[float, float]]: (накладные расходы в секундах, токенов в секунду) или None
+    """
+    points = [(float(r.get("completion_tokens", 0)), float(r.get("latency", 0.0))) for r in records
+              if r.get("model") == model and r.get("kind") == "translate" and r.get("outcome", "ok") == "ok"
+              and r.get("latency")]
+    if len(points) < min_history:
+        return None
+
+    count = len(points)
+    mean_tokens = sum(tokens for tokens, _ in points) / count
+    mean_latency = sum(latency for _, latency in points) / count
+    variance = sum((tokens - mean_tokens) ** 2 for tokens, _ in points)
+    if variance > 0:
+        slope = sum((tokens - mean_tokens) * (latency - mean_latency) for tokens, latency in points) / variance
+        overhead = mean_latency - slope * mean_tokens
+        if slope > 0 and overhead >= 0:
+            return overhead, 1.0 / slope
+    # Вырожденная выборка: вся задержка относится к генерации ответа
+    if mean_latency <= 0 or mean_tokens <= 0:
+        return None
+    return 0.0, mean_tokens / mean_latency
+
+def project_makespan(durations: List[float], workers: int) -> float:
+    """
+    Оценивает время обработки файлов пулом потоков (файлы длиннее назначаются раньше).
+
+    Args:
+        durations: Время обработки каждого файла (части файла переводятся последовательно)
+        workers: Количество потоков
+
+    Returns:
+        float: Время до завершения последнего файла, с
+    """
+    workers = max(int(workers), 1)
+    finish = [0.0] * min(workers, max(len(durations), 1))
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(finish, heapq.heappop(finish) + duration)
+    return max(finish)
+
+def format_duration(seconds: float) -> str:
+    """Форматирует длительность как ЧЧ:ММ:СС."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+class TranslationPlanner:
+    """
+    Оценка запуска перевода без обращения к API.
+
+    Для каждого файла выполняет те же шаги подготовки, что и перевод (удаление
+    LOCAL TEXT, выделение фронтматтера, split_content), и оценивает запросы:
+    токены промпта (системный промпт, глоссарий, уже переведенные термины,
+    улучшения промпта, черновик), токены ответа, стоимость по секции pricing
+    и время по скорости модели.
+    """
+
+    def __init__(self, config: Dict[str, Any], glossary: Dict[str, Dict[str, str]], model_name: str,
+                 max_tokens: int, router: Optional[ModelRouter] = None, draft_model: Optional[str] = None,
+                 source_reader: Optional[GitBlobReader] = None):
+        """
+        Args:
+            config: Общая конфигурация
+            glossary: Глоссарий терминов
+            model_name: Основная модель
+            max_tokens: Максимальное количество токенов для разбиения
+            router: Маршрутизатор моделей (None - все фрагменты в model_name)
+            draft_model: Модель черновика (режим --draft; итоговый перевод - model_name)
+            source_reader: Чтение исходных файлов из объектов Git (режим --since; None - файлы на диске)
+        """
+        self.config = config
+        self.glossary = glossary
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.router = router
+        self.draft_model = draft_model
+        self.source_reader = source_reader
+        self.settings = get_planning_config(config)
+        self.pricing = config.get("pricing") or {}
+        self.improvements_config = config.get("prompt_improvements") or {}
+        self._languages: Dict[str, Dict[str, Any]] = {}
+        self._latency: Dict[str, Tuple[float, float]] = {}
+        self._history: Optional[List[Dict[str, Any]]] = None
+
+    def _language(self, target_language: str) -> Dict[str, Any]:
+        """Постоянные для языка данные: размер системного промпта и глоссария, индекс улучшений."""
+        if target_language not in self._languages:
+            glossary_prompt = "\nГлоссарий терминов (русский -> целевой язык):\n" + "".join(
+                f"'{ru_term}' -> '{translations[target_language]}'\n"
+                for ru_term, translations in self.glossary.items() if target_language in translations
+            )
+            language_config = get_language_config(self.config, target_language)
+            expansion = language_config.get("output_expansion", self.settings["output_expansion"])
+            store = get_improvement_store(get_improvements_file(target_language))
+            self._languages[target_language] = {
+                "system_tokens": estimate_tokens(get_system_prompt(self.config, target_language)),
+                "glossary_tokens": estimate_tokens(glossary_prompt),
+                "expansion": float(expansion),
+                "index": get_improvement_index(store),
+            }
+        return self._languages[target_language]
+
+    def _improvements_tokens(self, language: Dict[str, Any], text: str) -> int:
+        """Размер улучшений промпта, которые будут выбраны для фрагмента."""
+        if not self.improvements_config.get("retrieval", True):
+            return int(self.improvements_config.get("token_budget", 600))
+        selected = language["index"].select(
+            text, self.improvements_config.get("top_k", 10), self.improvements_config.get("token_budget", 600),
+            self.improvements_config.get("min_coverage", 0.6),
+            format_entry=lambda entry: format_prompt_improvement(1, entry)
+        )
+        if not selected:
+            return 0
+        return estimate_tokens("".join(format_prompt_improvement(i, entry) for i, entry in enumerate(selected, 1))) + 20
+
+    def request_seconds(self, model: str, completion_tokens: int) -> float:
+        """
+        Оценивает время одного запроса.
+
+        Args:
+            model: Модель
+            completion_tokens: Токены ответа
+
+        Returns:
+            float: Время запроса, с
+        """
+        if model not in self._latency:
+            estimate = None
+            if self.settings["calibrate"]:
+                if self._history is None:
+                    self._history = load_history((self.config.get("metrics") or {}).get("dir"))
+                estimate = calibrate_latency(self._history, model, int(self.settings["min_history"]))
+            self._latency[model] = estimate or (float(self.settings["request_overhead_seconds"]),
+                                                float(self.settings["output_tokens_per_second"]))
+        overhead, tokens_per_second = self._latency[model]
+        return overhead + completion_tokens / max(tokens_per_second, 1e-6)
+
+    def _request(self, plan: Dict[str, Any], model: str, prompt_tokens: int, completion_tokens: int,
+                 stage: str = "final") -> None:
+        """Добавляет запрос в план файла."""
+        price_in, price_out = model_price(self.pricing, model)
+        plan["requests"] += 1
+        plan["prompt_tokens"] += prompt_tokens
+        plan["completion_tokens"] += completion_tokens
+        plan["cost"] += (prompt_tokens * price_in + completion_tokens * price_out) / 1e6
+        plan[f"{stage}_seconds"] += self.request_seconds(model, completion_tokens)
+        models = plan["models"].setdefault(model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        models["requests"] += 1
+        models["prompt_tokens"] += prompt_tokens
+        models["completion_tokens"] += completion_tokens
+
+    def _model_for(self, text: str, rel_path: str, part: int) -> str:
+        if self.router is not None:
+            return self.router.route(text, rel_path, part)[1]
+        return self.model_name
+
+    def plan_file(self, file_path: str, rel_path: str, target_language: str) -> Dict[str, Any]:
+        """
+        Оценивает перевод одного файла.
+
+        Args:
+            file_path: Путь к исходному файлу
+            rel_path: Относительный путь файла (для отчета)
+            target_language: Целевой язык
+
+        Returns:
+            Dict[str, Any]: План файла: части, запросы, токены, стоимость, время
+        """
+        plan = {"file": rel_path, "lang": target_language, "parts": 0, "requests": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "cost": 0.0, "final_seconds": 0.0, "draft_seconds": 0.0,
+                "models": {}, "copied": False}
+        if self.source_reader is not None:
+            data = self.source_reader.read(rel_path)
+            try:
+                text = data.decode('utf-8') if data is not None and file_path.lower().endswith(('.md', '.mdx')) else None
+            except UnicodeDecodeError:
+                text = None
+            if text is None:
+                plan["copied"] = True
+                return plan
+        else:
+            if not file_path.lower().endswith(('.md', '.mdx')) or is_binary_file(file_path):
+                plan["copied"] = True
+                return plan
+            with open(file_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        content = remove_local_text(text)
+        has_frontmatter, frontmatter, main_content = extract_frontmatter(content)
+        language = self._language(target_language)
+        expansion = language["expansion"]
+        base_tokens = language["system_tokens"] + language["glossary_tokens"]
+
+        # Поля фронтматтера переводятся отдельными запросами
+        if has_frontmatter and frontmatter:
+            for value in _frontmatter_values(frontmatter):
+                tokens = estimate_tokens(value)
+                prompt_tokens = (_FRONTMATTER_PROMPT_TOKENS + language["glossary_tokens"]
+                                 + self._improvements_tokens(language, value) + tokens)
+                completion_tokens = int(tokens * expansion) + 1
+                if self.draft_model:
+                    # В режиме --draft фронтматтер переводится и черновой, и итоговой моделью
+                    self._request(plan, self.draft_model, prompt_tokens, completion_tokens, "draft")
+                self._request(plan, self._model_for(value, rel_path, 0), prompt_tokens, completion_tokens)
+
+        # Уже переведенные термины добавляются в промпт следующих частей файла
+        seen_terms: Dict[str, int] = {}
+        memory = get_translation_memory(target_language)
+        max_tokens = get_part_token_limit(self.config, [target_language], self.max_tokens)
+        for number, part in enumerate(split_content(main_content, max_tokens), 1):
+            plan["parts"] += 1
+            if memory is not None and memory.covers(part):
+                # Фрагмент будет собран из памяти переводов без запроса к API
+                continue
+            tokens = estimate_tokens(part)
+            completion_tokens = int(tokens * expansion) + 1
+            prompt_tokens = (base_tokens + self._improvements_tokens(language, part) + tokens
+                             + sum(seen_terms.values()))
+            if self.draft_model:
+                self._request(plan, self.draft_model, prompt_tokens, completion_tokens, "draft")
+                self._request(plan, self.model_name, prompt_tokens + _REFINE_PROMPT_TOKENS + completion_tokens,
+                              completion_tokens)
+            else:
+                self._request(plan, self._model_for(part, rel_path, number), prompt_tokens, completion_tokens)
+            for ru_term, translations in self.glossary.items():
+                if ru_term not in seen_terms and target_language in translations and ru_term in part:
+                    seen_terms[ru_term] = estimate_tokens(f"'{ru_term}' -> '{translations[target_language]}'\n")
+        return plan
+
+    def plan(self, files: List[Tuple[str, str]], target_languages: List[str], max_workers: int) -> Dict[str, Any]:
+        """
+        Оценивает запуск перевода набора файлов на несколько языков.
+
+        Языки обрабатываются по очереди, файлы одного языка - пулом из max_workers потоков.
+
+        Args:
+            files: Пары (путь к файлу, относительный путь)
+            target_languages: Целевые языки
+            max_workers: Количество параллельных потоков
+
+        Returns:
+            Dict[str, Any]: Планы файлов, итоги по языкам и общий итог с прогнозом времени
+        """
+        file_plans = []
+        languages = {}
+        for target_language in target_languages:
+            lang_plans = []
+            for file_path, rel_path in files:
+                try:
+                    lang_plans.append(self.plan_file(file_path, rel_path, target_language))
+                except Exception as e:
+                    log_warning(f"[{target_language}] Не удалось оценить файл {rel_path}: {e}")
+            file_plans.extend(lang_plans)
+
+            seconds = project_makespan([plan["final_seconds"] for plan in lang_plans], max_workers)
+            if self.draft_model:
+                # Черновики и уточнения выполняются двумя пулами одновременно
+                seconds = max(seconds, project_makespan([plan["draft_seconds"] for plan in lang_plans], max_workers))
+            languages[target_language] = dict(_sum_plans(lang_plans), seconds=seconds)
+
+        total = _sum_plans(file_plans)
+        seconds = sum(language["seconds"] for language in languages.values())
+        limits = {}
+        if self.settings["requests_per_minute"]:
+            limits["requests_per_minute"] = total["requests"] / float(self.settings["requests_per_minute"]) * 60
+        if self.settings["tokens_per_minute"]:
+            limits["tokens_per_minute"] = ((total["prompt_tokens"] + total["completion_tokens"])
+                                           / float(self.settings["tokens_per_minute"]) * 60)
+        total["seconds"] = max([seconds] + list(limits.values()))
+        total["bound"] = max(limits, key=limits.get) if limits and max(limits.values()) > seconds else "max_workers"
+        return {"files": file_plans, "languages": languages, "total": total, "max_workers": max_workers,
+                "latency": dict(self._latency), "unpriced": sorted(set(total["models"]) - set(self.pricing))}
+
+def _frontmatter_values(frontmatter: str) -> List[str]:
+    """Строковые значения фронтматтера, которые переводятся (см. translate_frontmatter)."""
+    import yaml
+
+    yaml_content = frontmatter.strip().replace('---', '', 1)
+    end_pos = yaml_content.rfind('---')
+    if end_pos != -1:
+        yaml_content = yaml_content[:end_pos].strip()
+    try:
+        data = yaml.safe_load(yaml_content)
+    except yaml.YAMLError:
+        return []
+    if not isinstance(data, dict):
+        return []
+    return [value for value in data.values() if isinstance(value, str) and value.strip()]
+
+def _sum_plans(plans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    total = {"files": 0, "copied": 0, "parts": 0, "requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "cost": 0.0, "models": {}}
+    for plan in plans:
+        total["files"] += 1
+        total["copied"] += plan["copied"]
+        for field in ("parts", "requests", "prompt_tokens", "completion_tokens", "cost"):
+            total[field] += plan[field]
+        for model, counters in plan["models"].items():
+            model_total = total["models"].setdefault(model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            for field, value in counters.items():
+                model_total[field] += value
+    return total
+
+def log_plan(result: Dict[str, Any], per_file: bool = True) -> None:
+    """
+    Выводит план запуска: файлы, итоги по языкам, общий итог.
+
+    Args:
+        result: Результат TranslationPlanner.plan
+        per_file: Выводить строку для каждого файла
+    """
+    if per_file:
+        for plan in result["files"]:
+            if plan["copied"]:
+                continue
+            log_info("[%s] %s: частей %d, запросов %d, токены ~%s промпт / ~%s ответ, ~$%.4f",
+                     plan["lang"], plan["file"], plan["parts"], plan["requests"], f"{plan['prompt_tokens']:,}",
+                     f"{plan['completion_tokens']:,}", plan["cost"], file=plan["file"], lang=plan["lang"])
+
+    for target_language, language in result["languages"].items():
+        log_info("[%s] Итого: файлов %d (копируется %d), частей %d, запросов %d, токены ~%s промпт / ~%s ответ, "
+                 "~$%.4f, время ~%s", target_language, language["files"], language["copied"], language["parts"],
+                 language["requests"], f"{language['prompt_tokens']:,}", f"{language['completion_tokens']:,}",
+                 language["cost"], format_duration(language["seconds"]), lang=target_language)
+
+    total = result["total"]
+    for model, counters in total["models"].items():
+        overhead, tokens_per_second = result["latency"].get(model, (0.0, 0.0))
+        log_info("Модель %s: запросов %d, токены ~%s промпт / ~%s ответ (запрос ~%.1f с + %.0f токенов/с)",
+                 model, counters["requests"], f"{counters['prompt_tokens']:,}", f"{counters['completion_tokens']:,}",
+                 overhead, tokens_per_second)
+    bound = {"max_workers": f"{result['max_workers']} потоков", "requests_per_minute": "лимит запросов в минуту",
+             "tokens_per_minute": "лимит токенов в минуту"}[total["bound"]]
+    log_info("План: запросов %d, токенов ~%s, стоимость ~$%.4f, время ~%s (ограничение: %s)",
+             total["requests"], f"{total['prompt_tokens'] + total['completion_tokens']:,}", total["cost"],
+             format_duration(total["seconds"]), bound)
+    if result["unpriced"]:
+        log_warning("Цены моделей %s не заданы в секции pricing config.yaml: их стоимость не учтена",
+                    ", ".join(result["unpriced"]))
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Any, Optional, Callable
+from utils.logger import log_info, log_error, log_warning
+
+# Директория для файлов профилирования по умолчанию
+DEFAULT_PROFILE_DIR = "profile"
+
+# Количество строк в отчете tracemalloc
+TRACEMALLOC_TOP = 30
+
+_NULL_SPAN = nullcontext()
+
+class Profiler:
+    """
+    Сборщик интервалов (spans) этапов конвейера перевода.
+
+    Интервалы выгружаются в формате Chrome Trace Event (открывается в chrome://tracing
+    и Perfetto): каждый рабочий поток - отдельная дорожка. Дополнительно может собирать
+    профиль cProfile по всем рабочим потокам и снимок памяти tracemalloc.
+    """
+
+    def __init__(self, command: str = "translate", enabled: bool = False, use_cprofile: bool = False,
+                 use_tracemalloc: bool = False, output_dir: str = DEFAULT_PROFILE_DIR):
+        """
+        Инициализирует профилировщик.
+
+        Args:
+            command: Название команды (используется в именах файлов)
+            enabled: Собирать интервалы этапов
+            use_cprofile: Собирать профиль cProfile
+            use_tracemalloc: Собирать снимок памяти tracemalloc
+            output_dir: Директория для файлов профилирования
+        """
+        self.command = command
+        self.enabled = enabled
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.output_dir = output_dir
+        self._origin = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._profiles = []
+        self._cprofile_warned = False
+        self._local = threading.local()
+
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+
+    def span(self, name: str, **args: Any):
+        """
+        Возвращает контекстный менеджер, измеряющий время этапа.
+
+        Args:
+            name: Название этапа
+            **args: Дополнительные атрибуты (файл, часть и т.п.)
+
+        Returns:
+            Контекстный менеджер интервала (пустой, если профилирование выключено)
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+            }
+            if args:
+                event["args"] = {key: str(value) for key, value in args.items()}
+            with self._lock:
+                self._events.append(event)
+                self._threads.setdefault(thread.ident, thread.name)
+
+    def profile_thread(self, func: Callable) -> Callable:
+        """
+        Оборачивает задачу рабочего потока сбором профиля cProfile.
+
+        cProfile видит только поток, в котором он включен, поэтому у каждого рабочего
+        потока свой профиль; в конце запуска профили объединяются. В Python 3.12+
+        одновременно может быть включен только один профиль cProfile: потоки, которым
+        не удалось включить свой профиль, выполняют задачи без профилирования.
+
+        Args:
+            func: Функция задачи
+
+        Returns:
+            Callable: Обернутая функция (или исходная, если cProfile выключен)
+        """
+        if not self.use_cprofile:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Вложенные задачи потока профилируются внешним вызовом
+            depth = getattr(self._local, "depth", 0)
+            if depth:
+                self._local.depth = depth + 1
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._local.depth = depth
+
+            profile = getattr(self._local, "profile", None)
+            if profile is None:
+                import cProfile
+                profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Python 3.12+: профиль уже включен в другом потоке (sys.monitoring)
+                with self._lock:
+                    warn, self._cprofile_warned = not self._cprofile_warned, True
+                if warn:
+                    log_warning(f"cProfile: задачи потока {threading.current_thread().name} "
+                                f"и других потоков выполняются без профилирования ({e})")
+                return func(*args, **kwargs)
+            if getattr(self._local, "profile", None) is None:
+                self._local.profile = profile
+                with self._lock:
+                    self._profiles.append(profile)
+            self._local.depth = 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.depth = 0
+                profile.disable()
+        return wrapper
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Формирует трассировку в формате Chrome Trace Event.
+
+        Returns:
+            Dict[str, Any]: Объект с полем traceEvents
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        metadata.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": self.command}})
+        return {"traceEvents": metadata + sorted(events, key=lambda event: event["ts"]), "displayTimeUnit": "ms"}
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Суммирует время по этапам.
+
+        Returns:
+            List[Dict[str, Any]]: Этапы с количеством вызовов и суммарным временем, по убыванию времени
+        """
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for event in self._events:
+                stage = totals.setdefault(event["name"], {"count": 0, "total_ms": 0.0})
+                stage["count"] += 1
+                stage["total_ms"] += event["dur"] / 1000
+        return sorted(({"name": name, **values} for name, values in totals.items()),
+                      key=lambda stage: -stage["total_ms"])
+
+    def finish(self) -> List[str]:
+        """
+        Записывает собранные данные профилирования в файлы.
+
+        Returns:
+            List[str]: Пути записанных файлов
+        """
+        if not (self.enabled or self.use_cprofile or self.use_tracemalloc):
+            return []
+
+        written = []
+        prefix = os.path.join(self.output_dir, f"{self.command}_{time.strftime('%Y%m%d_%H%M%S')}")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+            if self.enabled:
+                with open(prefix + ".trace.json", 'w', encoding='utf-8') as f:
+                    json.dump(self.chrome_trace(), f)
+                written.append(prefix + ".trace.json")
+                for stage in self.summary()[:15]:
+                    log_info(f"Профиль: {stage['name']}: {stage['count']} раз, {stage['total_ms']:.1f} мс")
+
+            if self.use_cprofile and self._profiles:
+                import pstats
+                stats = pstats.Stats(self._profiles[0])
+                for profile in self._profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(prefix + ".prof")
+                written.append(prefix + ".prof")
+
+            if self.use_tracemalloc:
+                import tracemalloc
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                with open(prefix + ".tracemalloc.txt", 'w', encoding='utf-8') as f:
+                    f.write(f"current: {current / 1024 / 1024:.1f} MiB, peak: {peak / 1024 / 1024:.1f} MiB\n\n")
+                    for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                        f.write(f"{stat}\n")
+                written.append(prefix + ".tracemalloc.txt")
+        except Exception as e:
+            log_error(f"Ошибка записи данных профилирования: {e}")
+
+        for path in written:
+            log_info(f"Данные профилирования сохранены: {path}")
+        return written
+
+def add_profiling_arguments(parser) -> None:
+    """
+    Добавляет аргументы профилирования в парсер командной строки.
+
+    Args:
+        parser: argparse.ArgumentParser скрипта
+    """
+    parser.add_argument('--profile', action='store_true',
+                        help='Записать трассировку этапов в формате Chrome Trace (chrome://tracing, Perfetto)')
+    parser.add_argument('--profile_cprofile', action='store_true',
+                        help='Записать профиль cProfile по всем рабочим потокам (.prof)')
+    parser.add_argument('--profile_tracemalloc', action='store_true',
+                        help='Записать отчет tracemalloc о выделении памяти')
+    parser.add_argument('--profile_dir', type=str, default=DEFAULT_PROFILE_DIR,
+                        help='Директория для файлов профилирования')
+
+_profiler = Profiler()
+
+def init_profiling(command: str, enabled: bool = False, use_cprofile: bool = False,
+                   use_tracemalloc: bool = False, output_dir: Optional[str] = None) -> Profiler:
+    """
+    Создает профилировщик запуска.
+
+    Args:
+        command: Название команды (translate, translate_target, validate)
+        enabled: Собирать интервалы этапов (--profile)
+        use_cprofile: Собирать профиль cProfile (--profile_cprofile)
+        use_tracemalloc: Собирать снимок памяти tracemalloc (--profile_tracemalloc)
+        output_dir: Директория для файлов профилирования
+
+    Returns:
+        Profiler: Новый текущий профилировщик
+    """
+    global _profiler
+    _profiler = Profiler(command, enabled, use_cprofile, use_tracemalloc, output_dir or DEFAULT_PROFILE_DIR)
+    return _profiler
+
+def get_profiler() -> Profiler:
+    """
+    Возвращает текущий профилировщик (по умолчанию выключенный).
+
+    Returns:
+        Profiler: Профилировщик
+    """
+    return _profiler
+
+def span(name: str, **args: Any):
+    """
+    Интервал этапа текущего профилировщика.
+
+    Args:
+        name: Название этапа
+        **args: Дополнительные атрибуты
+
+    Returns:
+        Контекстный менеджер интервала
+    """
+    if not _profiler.enabled:
+        return _NULL_SPAN
+    return _profiler._span(name, args)
@@ -1,7 +1,9 @@
 import os
 import json
-from typing import Dict, List, Any
-from utils.logger import log_info, log_error
+from typing import Dict, List, Any, Optional
+from utils.logger import log_info, log_error, log_debug
+from utils.improvement_store import get_improvement_store
+from utils.improvement_index import get_improvement_index
 
 def get_improvements_dir() -> str:
     """
@@ -24,48 +26,96 @@ def get_improvements_dir() -> str:
     
     return improvements_dir
 
-def load_prompt_improvements(target_language: str) -> str:
+def get_improvements_file(target_language: str) -> str:
+    """
+    Возвращает путь к JSONL-файлу улучшений промпта для языка.
+    
+    Args:
+        target_language: Код целевого языка
+        
+    Returns:
+        str: Путь к файлу prompt_improvements_<язык>.jsonl
+    """
+    return os.path.join(get_improvements_dir(), f"prompt_improvements_{target_language}.jsonl")
+
+def format_prompt_improvement(idx: int, improvement: Dict[str, Any]) -> str:
+    """
+    Форматирует одно улучшение для добавления в промпт перевода.
+    
+    Args:
+        idx: Порядковый номер улучшения в промпте
+        improvement: Запись улучшения
+        
+    Returns:
+        str: Текст улучшения (пустая строка для неполной записи)
+    """
+    original = improvement.get("original", "")
+    translated = improvement.get("translated", "")
+    reason = improvement.get("reason", "")
+    count = int(improvement.get("count", 1))
+    
+    if not (original and translated and reason):
+        return ""
+    
+    text = f"{idx}. Issue: {reason}\n"
+    if count > 1:
+        text += f"   Seen {count} times.\n"
+    text += f"   Original: {original}\n"
+    text += f"   Incorrect translation: {translated}\n"
+    text += f"   Avoid this mistake.\n\n"
+    return text
+
+def load_prompt_improvements(target_language: str, text: Optional[str] = None, top_k: int = 10,
+                             token_budget: int = 600, min_coverage: float = 0.6) -> str:
     """
     Загружает и применяет улучшения промпта из файла для указанного языка.
     
+    Если передан переводимый текст, по инвертированному индексу выбираются только
+    улучшения, термины оригинала которых встречаются в тексте (не более top_k
+    и не больше token_budget токенов). Без текста берутся самые частые и самые новые.
+    
     Args:
         target_language: Код целевого языка
+        text: Переводимый фрагмент текста
+        top_k: Максимальное количество улучшений
+        token_budget: Максимальный размер улучшений в токенах (при выборе по тексту)
+        min_coverage: Минимальная доля терминов улучшения, найденных в тексте
         
     Returns:
         str: Дополнительный контекст для промпта на основе предыдущих ошибок
     """
-    # Путь к директории с улучшениями
-    improvements_dir = get_improvements_dir()
-    
-    # Полный путь к файлу улучшений
-    improvements_file = os.path.join(improvements_dir, f"prompt_improvements_{target_language}.json")
+    # Хранилище улучшений для языка
+    store = get_improvement_store(get_improvements_file(target_language))
     
     try:
-        if not os.path.exists(improvements_file):
-            log_info(f"Файл улучшений промпта '{improvements_file}' не найден, используем базовый промпт")
-            return ""
-        
-        with open(improvements_file, 'r', encoding='utf-8') as f:
-            improvements = json.load(f)
-        
-        if not improvements or not isinstance(improvements, list):
-            return ""
+        if text is not None:
+            selected = get_improvement_index(store).select(
+                text, top_k, token_budget, min_coverage,
+                format_entry=lambda entry: format_prompt_improvement(1, entry)
+            )
+            if not selected:
+                log_debug(f"Релевантных улучшений промпта для языка '{target_language}' не найдено")
+                return ""
+        else:
+            improvements = store.all()
+            if not improvements:
+                log_info(f"Улучшения промпта для языка '{target_language}' не найдены, используем базовый промпт")
+                return ""
+            
+            # Сначала самые частые (после консолидации), затем самые новые
+            selected = [
+                improvement for _, improvement in sorted(
+                    enumerate(improvements),
+                    key=lambda item: (-int(item[1].get("count", 1)), -item[0])
+                )[:top_k]
+            ]
         
         # Формируем контекст для улучшения промпта
         context = "\n\nBased on previous translation issues, pay special attention to these cases:\n"
+        for idx, improvement in enumerate(selected, 1):
+            context += format_prompt_improvement(idx, improvement)
         
-        for idx, improvement in enumerate(improvements[-10:], 1):  # Берем только последние 10 улучшений
-            original = improvement.get("original", "")
-            translated = improvement.get("translated", "")
-            reason = improvement.get("reason", "")
-            
-            if original and translated and reason:
-                context += f"{idx}. Issue: {reason}\n"
-                context += f"   Original: {original}\n"
-                context += f"   Incorrect translation: {translated}\n"
-                context += f"   Avoid this mistake.\n\n"
-        
-        log_info(f"Применено {min(len(improvements), 10)} улучшений промпта для языка '{target_language}'")
+        log_info(f"Применено {len(selected)} улучшений промпта для языка '{target_language}'")
         return context
     
     except Exception as e:
@@ -80,23 +130,7 @@ def save_prompt_improvement(target_language: str, issue: Dict[str, str]) -> None
         target_language: Код целевого языка
         issue: Информация о проблеме (оригинал, перевод, причина)
     """
-    # Путь к директории с улучшениями
-    improvements_dir = get_improvements_dir()
-    
-    # Создаем директорию, если она не существует
-    os.makedirs(improvements_dir, exist_ok=True)
-    
-    # Полный путь к файлу улучшений
-    improvements_file = os.path.join(improvements_dir, f"prompt_improvements_{target_language}.json")
-    
     try:
-        # Загружаем существующие улучшения
-        existing_improvements = []
-        
-        if os.path.exists(improvements_file):
-            with open(improvements_file, 'r', encoding='utf-8') as f:
-                existing_improvements = json.load(f)
-        
         # Получаем данные из проблемы
         original = issue.get("original", "").strip()
         translated = issue.get("translated", "").strip()
@@ -106,52 +140,12 @@ def save_prompt_improvement(target_language: str, issue: Dict[str, str]) -> None
         if not original or not translated or not reason:
             log_info("Неполные данные в проблеме, пропускаем сохранение улучшения")
             return
-            
-        # Проверка на дубликаты и схожие проблемы
-        is_duplicate = False
-        
-        for existing in existing_improvements:
-            existing_original = existing.get("original", "").strip()
-            existing_translated = existing.get("translated", "").strip()
-            existing_reason = existing.get("reason", "").strip()
-            
-            # Проверка на точное совпадение (как было раньше)
-            if original == existing_original and translated == existing_translated:
-                log_info("Точное совпадение улучшения найдено, пропускаем")
-                return
-            
-            # Проверка на схожесть проблем
-            # 1. Проверяем схожесть причины проблемы
-            reason_similarity = calculate_similarity(reason.lower(), existing_reason.lower())
-            
-            # 2. Проверяем схожесть текста оригинала и перевода
-            original_similarity = calculate_similarity(original.lower(), existing_original.lower())
-            translated_similarity = calculate_similarity(translated.lower(), existing_translated.lower())
-            
-            # Если и причина и тексты достаточно похожи, считаем проблему дубликатом
-            if (reason_similarity > 0.7 and 
-                (original_similarity > 0.6 or translated_similarity > 0.6)):
-                log_info(f"Схожая проблема уже существует (схожесть причины: {reason_similarity:.2f}, " 
-                        f"схожесть оригинала: {original_similarity:.2f}, "
-                        f"схожесть перевода: {translated_similarity:.2f})")
-                is_duplicate = True
-                break
-        
-        if is_duplicate:
-            return
-        
-        # Добавляем новое улучшение
-        existing_improvements.append({
-            "original": original,
-            "translated": translated,
-            "reason": reason
-        })
-        
-        # Сохраняем обновленный список улучшений
-        with open(improvements_file, 'w', encoding='utf-8') as f:
-            json.dump(existing_improvements, f, ensure_ascii=False, indent=2)
         
-        log_info(f"Добавлено новое улучшение промпта для языка '{target_language}'")
+        # Хранилище само проверяет точные и схожие дубликаты (через MinHash/LSH-индекс)
+        # и дописывает новую запись в конец файла под межпроцессной блокировкой
+        store = get_improvement_store(get_improvements_file(target_language))
+        if store.add({"original": original, "translated": translated, "reason": reason}):
+            log_info(f"Добавлено новое улучшение промпта для языка '{target_language}'")
     
     except Exception as e:
         log_error(f"Ошибка при сохранении улучшения промпта: {e}")
@@ -230,7 +224,8 @@ def calculate_similarity(text1: str, text2: str) -> float:
     # с большим весом для схожести слов
     return 0.7 * word_similarity + 0.3 * char_similarity
 
-def translate_frontmatter(frontmatter: str, translate_text_func, target_language: str, system_prompt: str) -> str:
+def translate_frontmatter(frontmatter: str, translate_text_func, target_language: str, system_prompt: str,
+                          file_path: Optional[str] = None) -> str:
     """
     Парсит YAML фронтматтер, переводит значения (но не ключи) и восстанавливает структуру.
     
@@ -239,6 +234,7 @@ def translate_frontmatter(frontmatter: str, translate_text_func, target_language
         translate_text_func: Функция для перевода текста
         target_language: Целевой язык перевода
         system_prompt: Системный промпт для перевода
+        file_path: Относительный путь файла (для метрик)
         
     Returns:
         str: Переведенный фронтматтер в формате YAML
@@ -276,11 +272,12 @@ def translate_frontmatter(frontmatter: str, translate_text_func, target_language
                 JUST translate the text as concisely as possible.
                 """
                 
-                # Специальный контекст для фронтматтера
+                # Специальный контекст для фронтматтера (в метриках учитывается как часть 0)
                 frontmatter_context = {
                     "translated_terms": {},
-                    "part_number": 1,
-                    "total_tokens": 0
+                    "part_number": 0,
+                    "total_tokens": 0,
+                    "file_path": file_path
                 }
                 
                 # Используем тот же механизм перевода, но с модифицированным промптом
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional, Callable
+from utils.logger import log_info, log_error
+
+# Режимы работы с API
+BACKENDS = ("live", "record", "replay")
+
+# Файл кассеты по умолчанию
+DEFAULT_CASSETTE = "cassettes/api.jsonl"
+
+class ReplayMissError(LookupError):
+    """Запрос не найден в кассете (режим replay)."""
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    Вычисляет ключ запроса к API.
+
+    Ключ - sha256 от канонического JSON параметров запроса (модель, сообщения,
+    температура, response_format и т.п.), поэтому совпадает только для
+    полностью одинаковых запросов.
+
+    Args:
+        request: Параметры chat.completions.create
+
+    Returns:
+        str: Хэш запроса
+    """
+    import hashlib
+
+    canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class Cassette:
+    """
+    Файл кассеты: пары запрос/ответ в формате JSON Lines.
+
+    Каждая строка содержит ключ запроса, сам запрос, ответ API (включая usage)
+    и время ответа. Одинаковые запросы записываются и воспроизводятся по порядку;
+    если повторов при воспроизведении больше, чем записей, повторяется последняя.
+    """
+
+    def __init__(self, path: str):
+        """
+        Загружает кассету (если файл существует).
+
+        Args:
+            path: Путь к файлу кассеты
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        log_error(f"Поврежденная строка {line_number} в кассете {path}: {e}")
+                        continue
+                    self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, key: str, request: Dict[str, Any], response: Dict[str, Any], latency: float) -> None:
+        """
+        Дописывает пару запрос/ответ в кассету.
+
+        Args:
+            key: Ключ запроса
+            request: Параметры запроса
+            response: Ответ API (словарь)
+            latency: Время ответа в секундах
+        """
+        entry = {"key": key, "request": request, "response": response, "latency": round(latency, 4),
+                 "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает очередную запись для ключа.
+
+        Args:
+            key: Ключ запроса
+
+        Returns:
+            Optional[Dict[str, Any]]: Запись кассеты или None, если запрос не записан
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+def _to_completion(response: Dict[str, Any]):
+    """Восстанавливает объект ответа openai из словаря."""
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(response)
+
+class RecordingClient:
+    """
+    Обертка клиента OpenAI, записывающая все запросы chat.completions.create в кассету.
+
+    Ошибочные ответы не записываются: исключения передаются вызывающему коду как есть.
+    """
+
+    def __init__(self, client, cassette: Cassette):
+        """
+        Args:
+            client: Клиент OpenAI API
+            cassette: Кассета для записи
+        """
+        self.client = client
+        self.cassette = cassette
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**kwargs)
+        latency = time.perf_counter() - started
+        try:
+            self.cassette.append(request_key(kwargs), kwargs, response.model_dump(mode="json"), latency)
+        except Exception as e:
+            log_error(f"Ошибка записи ответа в кассету {self.cassette.path}: {e}")
+        return response
+
+class ReplayClient:
+    """
+    Клиент, воспроизводящий ответы из кассеты без обращения к сети.
+
+    Запрос, отсутствующий в кассете, завершается ошибкой ReplayMissError.
+    """
+
+    def __init__(self, cassette: Cassette, replay_latency: bool = False):
+        """
+        Args:
+            cassette: Кассета с записанными ответами
+            replay_latency: Выдерживать записанное время ответа
+        """
+        self.cassette = cassette
+        self.replay_latency = replay_latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        key = request_key(kwargs)
+        entry = self.cassette.next(key)
+        if entry is None:
+            raise ReplayMissError(f"Запрос {key[:12]} не найден в кассете {self.cassette.path}")
+        if self.replay_latency:
+            time.sleep(entry.get("latency", 0.0))
+        return _to_completion(entry["response"])
+
+def add_backend_arguments(parser) -> None:
+    """
+    Добавляет аргументы выбора режима работы с API в парсер командной строки.
+
+    Args:
+        parser: argparse.ArgumentParser скрипта
+    """
+    parser.add_argument('--backend', type=str, choices=BACKENDS,
+                        help='Режим работы с API: live, record (запись в кассету), replay (воспроизведение без сети)')
+    parser.add_argument('--cassette', type=str, help='Файл кассеты для режимов record и replay')
+    parser.add_argument('--replay_latency', action='store_true', default=None,
+                        help='В режиме replay выдерживать записанное время ответов')
+
+def resolve_backend(api_config: Dict[str, Any], backend: Optional[str] = None) -> str:
+    """
+    Возвращает режим работы с API: аргумент командной строки, затем config.yaml, иначе live.
+
+    Args:
+        api_config: Секция api из config.yaml
+        backend: Режим из аргументов командной строки
+
+    Returns:
+        str: live, record или replay
+    """
+    return backend or api_config.get("backend", "live")
+
+def open_backend(api_config: Dict[str, Any], make_client: Callable[[], Any], backend: Optional[str] = None,
+                 cassette_path: Optional[str] = None, replay_latency: Optional[bool] = None):
+    """
+    Создает клиента API в выбранном режиме.
+
+    В режиме replay клиент OpenAI не создается (ключ API и сеть не нужны).
+
+    Args:
+        api_config: Секция api из config.yaml (backend, cassette, replay_latency)
+        make_client: Функция, создающая клиента OpenAI
+        backend: Режим (по умолчанию из config.yaml, иначе live)
+        cassette_path: Файл кассеты (по умолчанию из config.yaml)
+        replay_latency: Выдерживать записанное время ответов (по умолчанию из config.yaml)
+
+    Returns:
+        Клиент с интерфейсом chat.completions.create
+    """
+    backend = resolve_backend(api_config, backend)
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный режим работы с API: {backend}")
+    if backend == "live":
+        return make_client()
+
+    cassette = Cassette(cassette_path or api_config.get("cassette", DEFAULT_CASSETTE))
+    if backend == "record":
+        log_info(f"Запись запросов к API в кассету {cassette.path} (записей: {len(cassette)})")
+        return RecordingClient(make_client(), cassette)
+
+    if replay_latency is None:
+        replay_latency = api_config.get("replay_latency", False)
+    log_info(f"Воспроизведение ответов API из кассеты {cassette.path} (записей: {len(cassette)})")
+    return ReplayClient(cassette, replay_latency)
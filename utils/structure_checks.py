@@ -0,0 +1,206 @@
+import re
+from collections import Counter
+from typing import Dict, List, Any, Optional
+from utils.file_utils import remove_local_text, extract_frontmatter
+
+# Регулярные выражения для разбора структуры markdown/MDX
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+)$')
+FENCE_PATTERN = re.compile(r'^\s*(```+|~~~+)(.*)$')
+MDX_STATEMENT_PATTERN = re.compile(r'^(import|export)\s')
+LINK_PATTERN = re.compile(r'\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+JSX_LINK_PATTERN = re.compile(r'\b(?:href|src)\s*=\s*["\']([^"\']+)["\']')
+DETAILS_OPEN_PATTERN = re.compile(r'<details\b', re.IGNORECASE)
+DETAILS_CLOSE_PATTERN = re.compile(r'</details\s*>', re.IGNORECASE)
+ADMONITION_PATTERN = re.compile(r'^\s*:::')
+PREAMBLE_PATTERN = re.compile(r'^\s*(translation|translated text|перевод|переведенный текст)\s*:', re.IGNORECASE)
+CYRILLIC_PATTERN = re.compile(r'[Ѐ-ӿ]')
+
+def parse_structure(content: str) -> Dict[str, Any]:
+    """
+    Строит структурный скелет markdown/MDX документа за один проход по строкам.
+
+    Args:
+        content: Содержимое документа
+
+    Returns:
+        Dict[str, Any]: Ключи фронтматтера, заголовки, блоки кода, import/export,
+        ссылки, количество тегов <details> и admonition-блоков
+    """
+    has_frontmatter, frontmatter, main_content = extract_frontmatter(content)
+
+    frontmatter_keys: Optional[List[str]] = None
+    if has_frontmatter and frontmatter:
+        frontmatter_keys = [
+            line.split(':', 1)[0].strip()
+            for line in frontmatter.strip('-').splitlines()
+            if re.match(r'^[A-Za-z_][\w-]*\s*:', line)
+        ]
+
+    structure = {
+        "frontmatter_keys": frontmatter_keys,
+        "first_line": next((line for line in main_content.splitlines() if line.strip()), ""),
+        "headings": [],
+        "code_blocks": [],
+        "mdx_statements": [],
+        "links": Counter(),
+        "details_open": 0,
+        "details_close": 0,
+        "admonitions": 0
+    }
+
+    in_code_block = False
+    fence = ""
+    code_info = ""
+    code_lines: List[str] = []
+
+    for line in main_content.splitlines():
+        fence_match = FENCE_PATTERN.match(line)
+        if in_code_block:
+            if fence_match and fence_match.group(1).startswith(fence) and not fence_match.group(2).strip():
+                structure["code_blocks"].append((code_info, code_lines))
+                in_code_block = False
+            else:
+                code_lines.append(line)
+            continue
+
+        if fence_match:
+            in_code_block = True
+            fence = fence_match.group(1)
+            code_info = fence_match.group(2).strip()
+            code_lines = []
+            continue
+
+        heading_match = HEADING_PATTERN.match(line)
+        if heading_match:
+            structure["headings"].append(len(heading_match.group(1)))
+
+        if MDX_STATEMENT_PATTERN.match(line):
+            structure["mdx_statements"].append(line.strip())
+
+        if ADMONITION_PATTERN.match(line):
+            structure["admonitions"] += 1
+
+        for target in LINK_PATTERN.findall(line) + JSX_LINK_PATTERN.findall(line):
+            # Якоря внутри страницы зависят от переведенных заголовков, их не сравниваем
+            if not target.startswith('#'):
+                structure["links"][target] += 1
+
+        structure["details_open"] += len(DETAILS_OPEN_PATTERN.findall(line))
+        structure["details_close"] += len(DETAILS_CLOSE_PATTERN.findall(line))
+
+    # Незакрытый блок кода учитываем как есть
+    if in_code_block:
+        structure["code_blocks"].append((code_info, code_lines))
+
+    return structure
+
+def _make_issue(file_path: str, check: str, original: str, translated: str, reason: str) -> Dict[str, str]:
+    """
+    Формирует запись о структурной проблеме в формате отчета валидации.
+
+    Args:
+        file_path: Путь к файлу для включения в отчет
+        check: Название проверки
+        original: Фрагмент исходного текста
+        translated: Фрагмент перевода
+        reason: Описание проблемы
+
+    Returns:
+        Dict[str, str]: Запись о проблеме
+    """
+    return {
+        "file_path": file_path,
+        "original": original,
+        "translated": translated,
+        "reason": reason,
+        "category": "structure",
+        "check": check
+    }
+
+def check_structure(original_text: str, translated_text: str, file_path: str) -> List[Dict[str, str]]:
+    """
+    Сравнивает структуру оригинала и перевода без обращения к API.
+
+    Проверяет потерянные строки import/export, количество заголовков по уровням,
+    блоки кода, цели ссылок, ключи фронтматтера, теги <details>, admonition-блоки
+    и оставленные моделью преамбулы вида "Translation:".
+
+    Args:
+        original_text: Исходный текст на русском
+        translated_text: Переведенный текст
+        file_path: Путь к файлу для включения в отчет
+
+    Returns:
+        List[Dict[str, str]]: Список структурных проблем
+    """
+    # Блоки LOCAL TEXT не переводятся и отсутствуют в переводе
+    source = parse_structure(remove_local_text(original_text))
+    target = parse_structure(translated_text)
+    issues = []
+
+    # Строки import/export должны сохраняться дословно
+    target_statements = set(target["mdx_statements"])
+    for statement in source["mdx_statements"]:
+        if statement not in target_statements:
+            issues.append(_make_issue(file_path, "mdx_statements", statement, "",
+                                      "Строка import/export из оригинала потеряна в переводе"))
+
+    # Количество заголовков каждого уровня
+    source_levels = Counter(source["headings"])
+    target_levels = Counter(target["headings"])
+    for level in sorted(set(source_levels) | set(target_levels)):
+        if source_levels[level] != target_levels[level]:
+            issues.append(_make_issue(
+                file_path, "headings", f"{'#' * level}: {source_levels[level]}", f"{'#' * level}: {target_levels[level]}",
+                f"Не совпадает количество заголовков уровня {level}"
+            ))
+
+    # Блоки кода: количество, язык и строки без кириллицы должны совпадать
+    if len(source["code_blocks"]) != len(target["code_blocks"]):
+        issues.append(_make_issue(
+            file_path, "code_blocks", str(len(source["code_blocks"])), str(len(target["code_blocks"])),
+            "Не совпадает количество блоков кода"
+        ))
+    else:
+        for (source_info, source_lines), (target_info, target_lines) in zip(source["code_blocks"], target["code_blocks"]):
+            if source_info != target_info:
+                issues.append(_make_issue(file_path, "code_blocks", f"```{source_info}", f"```{target_info}",
+                                          "Изменен язык блока кода"))
+                continue
+            target_line_set = set(line.strip() for line in target_lines)
+            for line in source_lines:
+                # Строки с кириллицей (комментарии, строковые литералы) могут переводиться
+                if line.strip() and not CYRILLIC_PATTERN.search(line) and line.strip() not in target_line_set:
+                    issues.append(_make_issue(file_path, "code_blocks", line.strip(), "",
+                                              "Изменена строка внутри блока кода"))
+                    break
+
+    # Цели ссылок
+    missing_links = source["links"] - target["links"]
+    for link in sorted(missing_links):
+        issues.append(_make_issue(file_path, "links", link, "",
+                                  "Цель ссылки из оригинала отсутствует в переводе"))
+
+    # Ключи фронтматтера
+    if source["frontmatter_keys"] is not None:
+        if target["frontmatter_keys"] is None:
+            issues.append(_make_issue(file_path, "frontmatter", ", ".join(source["frontmatter_keys"]), "",
+                                      "Фронтматтер потерян в переводе"))
+        else:
+            missing_keys = [key for key in source["frontmatter_keys"] if key not in target["frontmatter_keys"]]
+            if missing_keys:
+                issues.append(_make_issue(file_path, "frontmatter", ", ".join(missing_keys), "",
+                                          "Ключи фронтматтера отсутствуют в переводе"))
+
+    # Теги <details> и admonition-блоки
+    for key, title in (("details_open", "<details>"), ("details_close", "</details>"), ("admonitions", ":::")):
+        if source[key] != target[key]:
+            issues.append(_make_issue(file_path, "tags", f"{title}: {source[key]}", f"{title}: {target[key]}",
+                                      f"Не совпадает количество {title}"))
+
+    # Преамбула модели в начале перевода
+    if PREAMBLE_PATTERN.match(target["first_line"]) and not PREAMBLE_PATTERN.match(source["first_line"]):
+        issues.append(_make_issue(file_path, "preamble", "", target["first_line"],
+                                  "Перевод начинается со служебной преамбулы модели"))
+
+    return issues
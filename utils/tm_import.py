@@ -0,0 +1,177 @@
+import os
+import time
+import difflib
+from typing import Dict, List, Any, Optional, Tuple
+from utils.logger import log_info, log_warning, log_debug
+from utils.file_utils import remove_local_text, extract_frontmatter
+from utils.markdown_blocks import split_blocks, split_units, block_kind, INLINE_CODE_PATTERN, INLINE_LINK_PATTERN
+from utils.translation_memory import TranslationMemory
+
+# Допустимое отношение длины перевода к длине оригинала (китайский текст в 3-5 раз короче русского)
+MIN_LENGTH_RATIO = 0.15
+MAX_LENGTH_RATIO = 4.0
+
+# Импортируются только файлы, которые переводит main_target.py
+TRANSLATABLE_EXTENSIONS = ('.md', '.mdx')
+
+# Поле фронтматтера с уровнем перевода (main_target.TIER_FIELD)
+TIER_FIELD = "translation_tier"
+
+def _compatible(source: str, target: str) -> bool:
+    """
+    Проверяет, может ли блок перевода соответствовать блоку оригинала.
+
+    Перевод сохраняет строки кода и адреса ссылок, а его длина остается в
+    разумных пределах относительно оригинала.
+
+    Args:
+        source: Блок оригинала
+        target: Блок перевода
+
+    Returns:
+        bool: True, если пару можно сохранить в память переводов
+    """
+    if not source.strip() or not target.strip():
+        return False
+    ratio = len(target) / len(source)
+    if ratio < MIN_LENGTH_RATIO or ratio > MAX_LENGTH_RATIO:
+        return False
+    if len(INLINE_CODE_PATTERN.findall(source)) != len(INLINE_CODE_PATTERN.findall(target)):
+        return False
+    return sorted(INLINE_LINK_PATTERN.findall(source)) == sorted(INLINE_LINK_PATTERN.findall(target))
+
+def _frontmatter_values(frontmatter: Optional[str]) -> Dict[str, str]:
+    """Строковые значения полей фронтматтера (как их получает translate_frontmatter)."""
+    if not frontmatter:
+        return {}
+    import yaml
+
+    yaml_content = frontmatter.strip().replace('---', '', 1)
+    end_pos = yaml_content.rfind('---')
+    if end_pos != -1:
+        yaml_content = yaml_content[:end_pos]
+    try:
+        data = yaml.safe_load(yaml_content)
+    except yaml.YAMLError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {key: value for key, value in data.items() if isinstance(value, str) and value.strip()}
+
+def align_documents(source_text: str, target_text: str) -> List[Tuple[str, str]]:
+    """
+    Выравнивает оригинал и перевод документа по блокам.
+
+    Последовательности структурных типов блоков (block_kind) сопоставляются
+    difflib.SequenceMatcher; совпавшие участки и замены одинаковой длины дают
+    пары блоков. Списки и таблицы дополнительно сопоставляются по пунктам и
+    строкам, значения фронтматтера - по ключам. Пары, не прошедшие проверку
+    длины, строк кода и ссылок, отбрасываются.
+
+    Args:
+        source_text: Документ на русском
+        target_text: Перевод документа
+
+    Returns:
+        List[Tuple[str, str]]: Пары (блок оригинала, блок перевода); для черновика - пустой список
+    """
+    _, source_frontmatter, source_main = extract_frontmatter(remove_local_text(source_text))
+    _, target_frontmatter, target_main = extract_frontmatter(target_text)
+
+    pairs: List[Tuple[str, str]] = []
+    target_values = _frontmatter_values(target_frontmatter)
+    if target_values.get(TIER_FIELD) == "draft":
+        # Черновик быстрой модели (main_target.py --draft) не используется как образец
+        return pairs
+    for key, value in _frontmatter_values(source_frontmatter).items():
+        if key in target_values and target_values[key] != value:
+            pairs.append((value, target_values[key]))
+
+    source_blocks = split_blocks(source_main)
+    target_blocks = split_blocks(target_main)
+    source_kinds = [block_kind(block) for block in source_blocks]
+    target_kinds = [block_kind(block) for block in target_blocks]
+    if source_kinds == target_kinds:
+        # Структура совпадает (обычный случай) - сопоставление без difflib
+        opcodes = [('equal', 0, len(source_kinds), 0, len(target_kinds))]
+    else:
+        opcodes = difflib.SequenceMatcher(None, source_kinds, target_kinds, autojunk=False).get_opcodes()
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != 'equal' and not (tag == 'replace' and i2 - i1 == j2 - j1):
+            continue
+        for i, j in zip(range(i1, i2), range(j1, j2)):
+            source, target = source_blocks[i], target_blocks[j]
+            # В заменах одинаковой длины совпадать должен хотя бы основной тип блока
+            if source_kinds[i].split(':')[0] != target_kinds[j].split(':')[0] or not _compatible(source, target):
+                continue
+            pairs.append((source, target))
+            if source_kinds[i].startswith(('list', 'table')):
+                source_units, target_units = split_units(source), split_units(target)
+                if len(source_units) > 1 and len(source_units) == len(target_units):
+                    pairs.extend((s, t) for s, t in zip(source_units, target_units) if _compatible(s, t))
+    return pairs
+
+def find_translated_pairs(source_dir: str, target_dir: str) -> List[Tuple[str, str, str]]:
+    """
+    Находит пары "исходный файл - перевод" с одинаковым относительным путем.
+
+    Args:
+        source_dir: Директория оригиналов
+        target_dir: Директория переводов
+
+    Returns:
+        List[Tuple[str, str, str]]: (путь к оригиналу, путь к переводу, относительный путь)
+    """
+    pairs = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(files):
+            if not name.lower().endswith(TRANSLATABLE_EXTENSIONS):
+                continue
+            source_path = os.path.join(root, name)
+            rel_path = os.path.relpath(source_path, source_dir).replace(os.sep, '/')
+            target_path = os.path.join(target_dir, rel_path)
+            if os.path.isfile(target_path):
+                pairs.append((source_path, target_path, rel_path))
+    return pairs
+
+def import_translation_memory(source_dir: str, target_dir: str, memory: TranslationMemory,
+                              dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Загружает в память переводов пары блоков из уже переведенных файлов.
+
+    Args:
+        source_dir: Директория оригиналов (RU)
+        target_dir: Директория переводов языка
+        memory: Память переводов языка
+        dry_run: Только выровнять и посчитать пары, не записывая память
+
+    Returns:
+        Dict[str, Any]: files - файлов с переводом, pairs - выровненных пар,
+        added - новых пар в памяти, seconds - время
+    """
+    started = time.perf_counter()
+    stats = {"files": 0, "pairs": 0, "added": 0, "seconds": 0.0}
+    all_pairs: List[Tuple[str, str]] = []
+    for source_path, target_path, rel_path in find_translated_pairs(source_dir, target_dir):
+        try:
+            with open(source_path, 'r', encoding='utf-8') as f:
+                source_text = f.read()
+            with open(target_path, 'r', encoding='utf-8') as f:
+                target_text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            log_warning(f"Пропуск {rel_path}: {e}")
+            continue
+        file_pairs = align_documents(source_text, target_text)
+        log_debug("%s: выровнено пар %d", rel_path, len(file_pairs), file=rel_path)
+        stats["files"] += 1
+        stats["pairs"] += len(file_pairs)
+        all_pairs.extend(file_pairs)
+
+    if not dry_run and all_pairs:
+        # Одна запись в файл памяти на язык (одна блокировка вместо блокировки на файл книги)
+        stats["added"] = memory.add_pairs(all_pairs, model="import")
+    stats["seconds"] = time.perf_counter() - started
+    log_info(f"Импорт {target_dir}: файлов {stats['files']}, выровнено пар {stats['pairs']}, "
+             f"добавлено {stats['added']} за {stats['seconds']:.1f} с")
+    return stats
@@ -0,0 +1,374 @@
+import os
+import re
+import json
+import time
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from utils.logger import log_info, log_error, log_debug
+from utils.minhash import MinHashLSH, text_shingles
+from utils.improvement_store import FileLock
+from utils.improvement_index import estimate_tokens
+from utils.markdown_blocks import split_blocks, join_blocks, normalize_block, block_key, leading_indent, with_indent
+from utils.structure_checks import FENCE_PATTERN, ADMONITION_PATTERN
+
+# Директория памяти переводов по умолчанию (translation_memory/ в корне проекта)
+DEFAULT_MEMORY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "translation_memory")
+
+# Параметры памяти переводов по умолчанию (секция translation_memory в config.yaml)
+DEFAULT_TRANSLATION_MEMORY = {
+    "enabled": True,
+    "dir": None,              # Директория памяти (None - translation_memory/ в корне проекта)
+    "min_similarity": 0.5,    # Минимальная схожесть блока для примера в промпте
+    "max_references": 5,      # Максимум примеров в промпте
+    "token_budget": 800,      # Максимум токенов примеров в промпте
+    "min_words": 3,           # Блоки короче ищутся только по точному совпадению
+}
+
+# Перевод с кириллицей считается непереведенным и в память не попадает
+_CYRILLIC_PATTERN = re.compile(r'[Ѐ-ӿ]')
+
+def _markup_lines(block: str) -> int:
+    """Количество строк разметки блока (ограждения кода и admonition), которое перевод должен сохранить."""
+    if '```' not in block and '~~~' not in block and ':::' not in block:
+        return 0
+    return sum(1 for line in block.split('\n') if FENCE_PATTERN.match(line) or ADMONITION_PATTERN.match(line))
+
+class TranslationMemory:
+    """
+    Память переводов одного языка: пары "блок оригинала -> блок перевода".
+
+    Блоки (см. split_blocks) хранятся в JSONL-файле, который только дописывается.
+    Точные совпадения ищутся по ключу нормализованного блока и позволяют не
+    обращаться к API, похожие блоки - через MinHash/LSH по шинглам с проверкой
+    calculate_similarity; они добавляются в промпт как эталонные переводы.
+    """
+
+    def __init__(self, memory_file: str, settings: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            memory_file: Путь к JSONL-файлу памяти переводов
+            settings: Параметры (см. DEFAULT_TRANSLATION_MEMORY)
+        """
+        self.memory_file = memory_file
+        self.lock_file = memory_file + ".lock"
+        self.settings = dict(DEFAULT_TRANSLATION_MEMORY)
+        self.settings.update({key: value for key, value in (settings or {}).items() if value is not None})
+        self._lock = threading.RLock()
+        self._entries: List[Dict[str, Any]] = []
+        self._exact: Dict[str, int] = {}
+        self._lsh = MinHashLSH()
+        # Ключи, еще не добавленные в LSH-индекс (индекс строится при первом нечетком поиске)
+        self._lsh_pending: List[str] = []
+        self._loaded = False
+        self.stats = {"parts_from_memory": 0, "exact_blocks": 0, "fuzzy_blocks": 0, "added": 0}
+
+    def _index_entry(self, entry: Dict[str, Any], key: Optional[str] = None) -> None:
+        position = len(self._entries)
+        self._entries.append(entry)
+        key = key or block_key(entry["source"])
+        is_new = key not in self._exact
+        # Более поздний перевод того же блока заменяет ранний
+        self._exact[key] = position
+        if is_new and len(entry["source"].split()) >= self.settings["min_words"]:
+            self._lsh_pending.append(key)
+
+    def _update_lsh(self) -> None:
+        """Добавляет в LSH-индекс записи, загруженные после последнего нечеткого поиска."""
+        for key in self._lsh_pending:
+            source = self._entries[self._exact[key]]["source"]
+            self._lsh.add(key, self._lsh.signature(text_shingles(normalize_block(source).lower())))
+        self._lsh_pending = []
+
+    def _load(self) -> None:
+        """Читает файл памяти при первом обращении."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.memory_file):
+            return
+        try:
+            with open(self.memory_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        log_error(f"Пропущена поврежденная строка в {self.memory_file}: {e}")
+                        continue
+                    if isinstance(entry, dict) and entry.get("source") and entry.get("target"):
+                        self._index_entry(entry)
+            log_debug(f"Память переводов {self.memory_file}: {len(self._exact)} блоков")
+        except Exception as e:
+            log_error(f"Ошибка чтения памяти переводов {self.memory_file}: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._exact)
+
+    def lookup(self, block: str) -> Optional[str]:
+        """
+        Ищет точный перевод блока.
+
+        Args:
+            block: Блок оригинала
+
+        Returns:
+            Optional[str]: Перевод блока или None
+        """
+        with self._lock:
+            self._load()
+            position = self._exact.get(block_key(block))
+            return self._entries[position]["target"] if position is not None else None
+
+    def find_similar(self, block: str) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Ищет похожие блоки (схожесть не ниже min_similarity, без точного совпадения).
+
+        Args:
+            block: Блок оригинала
+
+        Returns:
+            List[Tuple[float, Dict[str, Any]]]: Пары (схожесть, запись) по убыванию схожести
+        """
+        from utils.prompt_utils import calculate_similarity
+
+        text = normalize_block(block).lower()
+        if len(text.split()) < self.settings["min_words"]:
+            return []
+        with self._lock:
+            self._load()
+            self._update_lsh()
+            own_key = block_key(block)
+            matches = []
+            for key in self._lsh.query(self._lsh.signature(text_shingles(text))):
+                if key == own_key:
+                    continue
+                entry = self._entries[self._exact[key]]
+                similarity = calculate_similarity(text, normalize_block(entry["source"]).lower())
+                if similarity >= self.settings["min_similarity"]:
+                    matches.append((similarity, entry))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches
+
+    def covers(self, text: str) -> bool:
+        """
+        Проверяет, переведен ли ранее каждый блок фрагмента (для оценки запуска).
+
+        Args:
+            text: Фрагмент оригинала
+
+        Returns:
+            bool: True, если фрагмент можно собрать из памяти переводов
+        """
+        blocks = split_blocks(text)
+        return bool(blocks) and all(self.lookup(block) is not None for block in blocks)
+
+    def translate_from_memory(self, text: str) -> Optional[str]:
+        """
+        Собирает перевод фрагмента из памяти, если каждый его блок переведен ранее.
+
+        Каждый блок перевода получает отступ первой строки блока оригинала, поэтому
+        вложенные в пункты списка блоки остаются на своем уровне.
+
+        Args:
+            text: Фрагмент оригинала
+
+        Returns:
+            Optional[str]: Перевод фрагмента или None, если хотя бы одного блока нет в памяти
+        """
+        blocks = split_blocks(text)
+        if not blocks:
+            return None
+        targets = []
+        for block in blocks:
+            target = self.lookup(block)
+            if target is None:
+                return None
+            targets.append(with_indent(target, leading_indent(block)))
+        with self._lock:
+            self.stats["parts_from_memory"] += 1
+            self.stats["exact_blocks"] += len(blocks)
+        return join_blocks(targets)
+
+    def references_prompt(self, text: str) -> str:
+        """
+        Формирует раздел промпта с переводами совпадающих и похожих блоков фрагмента.
+
+        Args:
+            text: Фрагмент оригинала
+
+        Returns:
+            str: Раздел промпта или пустая строка, если подходящих блоков нет
+        """
+        references: List[Tuple[float, Dict[str, Any]]] = []
+        seen = set()
+        for block in split_blocks(text):
+            target = self.lookup(block)
+            if target is not None:
+                references.append((1.0, {"source": block, "target": target}))
+                continue
+            for similarity, entry in self.find_similar(block)[:1]:
+                if entry["source"] not in seen:
+                    seen.add(entry["source"])
+                    references.append((similarity, entry))
+        if not references:
+            return ""
+
+        # Сначала точные совпадения, затем самые похожие, в пределах бюджета токенов
+        references.sort(key=lambda reference: reference[0], reverse=True)
+        lines = []
+        budget = self.settings["token_budget"]
+        exact = fuzzy = 0
+        for similarity, entry in references[:self.settings["max_references"]]:
+            line = f"\nОригинал:\n{entry['source']}\nПеревод:\n{entry['target']}\n"
+            tokens = estimate_tokens(line)
+            if tokens > budget:
+                continue
+            budget -= tokens
+            lines.append(line)
+            if similarity == 1.0:
+                exact += 1
+            else:
+                fuzzy += 1
+        if not lines:
+            return ""
+        with self._lock:
+            self.stats["exact_blocks"] += exact
+            self.stats["fuzzy_blocks"] += fuzzy
+        return ("\n\nПереводы совпадающих и похожих блоков из памяти переводов. Совпадающие блоки переведи так же, "
+                "для похожих сохраняй формулировки и терминологию:\n" + "".join(lines))
+
+    def add(self, source_text: str, target_text: str, model: Optional[str] = None) -> int:
+        """
+        Сохраняет пары блоков переведенного фрагмента.
+
+        Блоки сопоставляются по порядку, поэтому пары сохраняются, только если
+        количество блоков оригинала и перевода совпадает. Блоки перевода с
+        кириллицей (непереведенные), с потерянной разметкой и уже известные
+        пары не сохраняются.
+
+        Args:
+            source_text: Фрагмент оригинала
+            target_text: Перевод фрагмента
+            model: Модель, выполнившая перевод
+
+        Returns:
+            int: Количество добавленных пар
+        """
+        source_blocks = split_blocks(source_text)
+        target_blocks = split_blocks(target_text)
+        if not source_blocks or len(source_blocks) != len(target_blocks):
+            return 0
+        return self.add_pairs(list(zip(source_blocks, target_blocks)), model)
+
+    def add_pairs(self, pairs: List[Tuple[str, str]], model: Optional[str] = None) -> int:
+        """
+        Сохраняет пары "блок оригинала -> блок перевода".
+
+        Args:
+            pairs: Пары блоков
+            model: Источник перевода (модель или import)
+
+        Returns:
+            int: Количество добавленных пар
+        """
+        with self._lock:
+            self._load()
+            entries = []
+            keys = []
+            batch: Dict[str, str] = {}
+            added_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            for source, target in pairs:
+                source, target = normalize_block(source), normalize_block(target)
+                if not source.strip() or not target.strip() or _CYRILLIC_PATTERN.search(target):
+                    continue
+                if _markup_lines(source) != _markup_lines(target):
+                    # Перевод потерял ограждение кода или admonition - такой блок не переиспользуется
+                    continue
+                # Перевод хранится с отступом оригинала: модель может потерять отступ первой строки
+                target = with_indent(target, leading_indent(source))
+                key = block_key(source)
+                position = self._exact.get(key)
+                if batch.get(key, self._entries[position]["target"] if position is not None else None) == target:
+                    continue
+                batch[key] = target
+                entry = {"source": source, "target": target, "time": added_at}
+                if model:
+                    entry["model"] = model
+                entries.append(entry)
+                keys.append(key)
+            if not entries:
+                return 0
+            try:
+                os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
+                with FileLock(self.lock_file):
+                    with open(self.memory_file, 'a', encoding='utf-8') as f:
+                        for entry in entries:
+                            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            except Exception as e:
+                log_error(f"Ошибка записи памяти переводов {self.memory_file}: {e}")
+                return 0
+            for entry, key in zip(entries, keys):
+                self._index_entry(entry, key)
+            self.stats["added"] += len(entries)
+            return len(entries)
+
+_settings: Optional[Dict[str, Any]] = None
+_memories: Dict[str, TranslationMemory] = {}
+_memories_lock = threading.Lock()
+
+def init_translation_memory(memory_config: Optional[Dict[str, Any]] = None, backend: str = "live") -> None:
+    """
+    Включает память переводов по секции translation_memory конфигурации.
+
+    В режимах record и replay память выключается: собранные из нее фрагменты и образцы
+    в промпте зависят от накопленных переводов, и воспроизведенный запуск отправлял бы
+    другие запросы, чем записанный.
+
+    Args:
+        memory_config: Секция translation_memory из config.yaml
+        backend: Режим работы с API (см. utils.replay.resolve_backend)
+    """
+    global _settings
+    settings = dict(DEFAULT_TRANSLATION_MEMORY)
+    settings.update({key: value for key, value in (memory_config or {}).items() if value is not None})
+    if settings["enabled"] and backend != "live":
+        log_info(f"Память переводов выключена в режиме {backend}")
+        settings["enabled"] = False
+    with _memories_lock:
+        _settings = settings if settings["enabled"] else None
+        _memories.clear()
+
+def get_translation_memory(target_language: str) -> Optional[TranslationMemory]:
+    """
+    Возвращает общую для процесса память переводов языка.
+
+    Args:
+        target_language: Код целевого языка
+
+    Returns:
+        Optional[TranslationMemory]: Память переводов или None, если она выключена
+        (или init_translation_memory не вызывался)
+    """
+    if _settings is None:
+        return None
+    with _memories_lock:
+        memory = _memories.get(target_language)
+        if memory is None:
+            memory_dir = _settings["dir"] or DEFAULT_MEMORY_DIR
+            memory = TranslationMemory(os.path.join(memory_dir, f"{target_language}.jsonl"), _settings)
+            _memories[target_language] = memory
+        return memory
+
+def log_translation_memory_summary() -> None:
+    """Выводит в лог использование памяти переводов за запуск."""
+    with _memories_lock:
+        memories = dict(_memories)
+    for target_language, memory in sorted(memories.items()):
+        stats = memory.stats
+        if any(stats.values()):
+            log_info(f"[{target_language}] Память переводов: фрагментов без API {stats['parts_from_memory']}, "
+                     f"совпавших блоков {stats['exact_blocks']}, похожих блоков в промпте {stats['fuzzy_blocks']}, "
+                     f"добавлено пар {stats['added']}")
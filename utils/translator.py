@@ -1,13 +1,46 @@
 import re
-from typing import Dict, Tuple, Any, Optional
-from openai import OpenAI
-from utils.logger import log_info, log_error
+import json
+import time
+import threading
+import concurrent.futures
+from typing import Dict, List, Tuple, Any, Optional, TYPE_CHECKING
+from utils.logger import log_info, log_error, log_warning, log_debug
 from utils.prompt_utils import load_prompt_improvements
+from utils.metrics import get_metrics, begin_request, request_retries, usage_tokens
+from utils.profiling import span
+from utils.file_utils import split_content
+from utils.model_router import ModelRouter
+from utils.translation_memory import TranslationMemory, get_translation_memory
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Системный промпт перевода на несколько языков одним запросом; за ним следуют инструкции каждого языка
+MULTI_TARGET_PROMPT = """You translate one Russian markdown fragment into several languages at once.
+The instructions for each target language follow in separate sections; each section applies only to the translation into that language.
+Return a JSON object of the form {{"translations": {{"<language code>": "<translation>"}}}}.
+Required language keys: {keys}
+Each value is the complete translation of the whole fragment into that language, as markdown text.
+Requirements of the sections about returning only the translated text apply to these values."""
+
+# Запрос продолжения перевода, обрезанного лимитом токенов ответа модели
+CONTINUE_PROMPT = ("Your translation was cut off by the output limit. Continue the translation exactly from the point "
+                   "where it stopped. Return only the remaining part, without repeating already translated text.")
+
+# Максимальное количество запросов продолжения одной части
+MAX_CONTINUATIONS = 3
+
+def _token_shares(tokens: int, count: int) -> List[int]:
+    """Делит токены общего запроса между языками поровну (остаток - первым языкам)."""
+    share, remainder = divmod(tokens, count)
+    return [share + (index < remainder) for index in range(count)]
 
 class Translator:
     """Класс для перевода текста с использованием OpenAI API."""
     
-    def __init__(self, client: OpenAI, model_name: str, glossary: Dict[str, Dict[str, str]]):
+    def __init__(self, client: "OpenAI", model_name: str, glossary: Dict[str, Dict[str, str]],
+                 improvements_config: Optional[Dict[str, Any]] = None, router: Optional[ModelRouter] = None,
+                 tier: Optional[str] = None):
         """
         Инициализирует переводчик.
         
@@ -15,11 +48,20 @@ class Translator:
             client: Клиент OpenAI API
             model_name: Название модели для использования
             glossary: Словарь с терминами для глоссария
+            improvements_config: Настройки выбора улучшений промпта (секция prompt_improvements)
+            router: Маршрутизатор моделей по сложности фрагмента (None - всегда model_name)
+            tier: Уровень перевода для метрик без маршрутизатора (draft, final)
         """
         self.client = client
         self.model_name = model_name
         self.glossary = glossary
+        self.improvements_config = improvements_config or {}
+        self.router = router
+        self.tier = tier
         self.total_tokens_processed = 0
+        self._tokens_lock = threading.Lock()
+        # Глоссарий в виде текста промпта по языкам (строится один раз)
+        self._glossary_prompts: Dict[str, str] = {}
     
     def translate_text(self, text: str, target_language: str, system_prompt: str, 
                        context: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
@@ -43,47 +85,88 @@ class Translator:
                 "total_tokens": 0        # Общее количество обработанных токенов
             }
         
-        # Добавляем глоссарий к системному промпту
-        glossary_prompt = "\nГлоссарий терминов (русский -> целевой язык):\n"
-        for ru_term, translations in self.glossary.items():
-            if target_language in translations:
-                glossary_prompt += f"'{ru_term}' -> '{translations[target_language]}'\n"
+        # Фрагмент, все блоки которого уже переведены, собирается из памяти переводов без запроса к API
+        memory = get_translation_memory(target_language)
+        if memory is not None:
+            with span("translation_memory", file=context.get("file_path")):
+                remembered = memory.translate_from_memory(text)
+            if remembered is not None:
+                log_debug("Фрагмент взят из памяти переводов", file=context.get("file_path"), lang=target_language,
+                          part=context.get("part_number"))
+                context["part_number"] += 1
+                self._update_translated_terms(text, target_language, context)
+                return remembered, context
         
-        # Добавляем предыдущие переводы терминов для согласованности
-        if context["translated_terms"]:
-            glossary_prompt += "\nПредыдущие переводы терминов в этом документе:\n"
-            for term, translation in context["translated_terms"].items():
-                glossary_prompt += f"'{term}' -> '{translation}'\n"
+        # Формируем итоговый промпт: постоянный префикс языка и переменная часть фрагмента
+        stable_prompt, volatile_prompt = self._language_prompt(text, target_language, system_prompt, context, memory)
         
-        # Добавляем улучшения промпта на основе предыдущих ошибок
-        improvements = load_prompt_improvements(target_language)
-        
-        # Формируем итоговый промпт
-        enhanced_system_prompt = system_prompt + glossary_prompt + improvements
+        # Уточнение чернового перевода (режим draft): черновик - основа для итогового перевода
+        if context.get("draft"):
+            volatile_prompt += (
+                "\n\nНиже черновой перевод этого фрагмента, выполненный быстрой моделью. Используй его как основу: "
+                "исправь ошибки, неточности и пропуски, сохрани удачные формулировки и разметку. "
+                "Верни только итоговый перевод.\nЧерновой перевод:\n" + context["draft"]
+            )
         
         # Больше не добавляем информацию о части, т.к. она не должна быть в итоговом файле
         user_prompt = text
         
+        part_number = context.get("part_number")
+        
+        # Выбор модели по сложности фрагмента
+        model_name, tier = self.model_name, self.tier
+        if self.router is not None:
+            tier, model_name = self.router.route(text, context.get("file_path"), part_number)
+        tier_fields = {"tier": tier} if tier else {}
+        
+        messages = [{"role": "system", "content": stable_prompt}]
+        if volatile_prompt:
+            messages.append({"role": "system", "content": volatile_prompt.strip()})
+        messages.append({"role": "user", "content": user_prompt})
+        begin_request()
+        started = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": enhanced_system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.0
-            )
+            with span("api_call", file=context.get("file_path"), part=part_number):
+                response = self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=0.0
+                )
             translated_text = response.choices[0].message.content
+            truncated = response.choices[0].finish_reason == "length"
             
             # Подсчитываем токены
-            prompt_tokens = response.usage.prompt_tokens
-            completion_tokens = response.usage.completion_tokens
+            prompt_tokens, completion_tokens, cached_tokens = usage_tokens(response.usage)
             total_tokens = prompt_tokens + completion_tokens
             
-            # Увеличиваем глобальный счетчик
-            self.total_tokens_processed += total_tokens
+            # Увеличиваем общий счетчик (переводчик используется несколькими потоками)
+            with self._tokens_lock:
+                self.total_tokens_processed += total_tokens
             context["total_tokens"] += total_tokens
             
+            get_metrics().record_request(
+                "translate", context.get("file_path"), part_number, target_language, model_name,
+                prompt_tokens, completion_tokens, cached_tokens,
+                time.perf_counter() - started, request_retries(),
+                **tier_fields, **({"truncated": True} if truncated else {})
+            )
+            if self.router is not None:
+                self.router.record(tier, prompt_tokens, completion_tokens)
+            
+            # Ответ обрезан лимитом токенов ответа модели: часть делится пополам по границам
+            # разделов и абзацев, неделимая часть дописывается запросами продолжения.
+            # Уточнение черновика не делится: черновик относится ко всей части
+            if truncated:
+                pieces = split_content(text, max(1, int(len(text) / 4 / 2))) if not context.get("draft") else [text]
+                if len(pieces) > 1:
+                    log_warning("Перевод части обрезан лимитом ответа модели, часть переводится заново по %d фрагментам",
+                                len(pieces), file=context.get("file_path"), lang=target_language, part=part_number)
+                    return self._translate_pieces(pieces, target_language, system_prompt, context), context
+                translated_text = self._continue_translation(messages, translated_text, model_name, target_language,
+                                                             context, tier_fields)
+                if translated_text is None:
+                    return text, context
+            
             # Проверяем, не содержит ли ответ дополнительные объяснения
             # Если ответ начинается с "Translation:" или подобных фраз, удаляем их
             if translated_text.lower().startswith(("translation:", "перевод:", "translated text:", "переведенный текст:")):
@@ -93,6 +176,10 @@ class Translator:
             translated_text = re.sub(r'^```.*\n', '', translated_text)
             translated_text = re.sub(r'\n```$', '', translated_text)
             
+            # Сохраняем пары блоков в память переводов (черновики быстрой модели не сохраняются)
+            if memory is not None and tier != "draft":
+                memory.add(text, translated_text, model_name)
+            
             # Обновляем номер части для следующего вызова
             context["part_number"] += 1
             
@@ -102,9 +189,302 @@ class Translator:
             return translated_text, context
         
         except Exception as e:
-            log_error(f"Ошибка при переводе текста: {e}")
+            log_error("Ошибка при переводе текста: %s", e, file=context.get("file_path"), lang=target_language, part=part_number)
+            get_metrics().record_request(
+                "translate", context.get("file_path"), part_number, target_language, model_name,
+                latency=time.perf_counter() - started, retries=request_retries(),
+                outcome="error", error=type(e).__name__, **tier_fields
+            )
             return text, context
     
+    def _translate_pieces(self, pieces: List[str], target_language: str, system_prompt: str,
+                          context: Dict[str, Any]) -> str:
+        """
+        Переводит фрагменты обрезанной части параллельно и собирает перевод части.
+
+        Не используется для уточнения черновика: черновик относится ко всей части,
+        поэтому обрезанный ответ уточнения дописывается запросами продолжения.
+
+        Args:
+            pieces: Фрагменты части (split_content)
+            target_language: Целевой язык перевода
+            system_prompt: Системный промпт для перевода
+            context: Контекст документа (обновляется как после перевода одной части)
+
+        Returns:
+            str: Перевод части
+        """
+        def translate_piece(piece: str) -> Tuple[str, Dict[str, Any]]:
+            # У каждого фрагмента своя копия контекста: фрагменты переводятся одновременно
+            piece_context = {"translated_terms": dict(context["translated_terms"]), "part_number": context["part_number"],
+                             "total_tokens": 0, "file_path": context.get("file_path")}
+            return self.translate_text(piece, target_language, system_prompt, piece_context)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="split") as executor:
+            results = list(executor.map(translate_piece, pieces))
+        translated_pieces = [translated_piece for translated_piece, _ in results]
+        # Токены фрагментов суммируются после завершения потоков
+        context["total_tokens"] += sum(piece_context["total_tokens"] for _, piece_context in results)
+        context["part_number"] += 1
+        self._update_translated_terms("\n".join(pieces), target_language, context)
+        return '\n\n'.join(translated_pieces)
+
+    def _continue_translation(self, messages: List[Dict[str, str]], translated_text: str, model_name: str,
+                              target_language: str, context: Dict[str, Any],
+                              tier_fields: Dict[str, Any]) -> Optional[str]:
+        """
+        Дописывает обрезанный перевод запросами продолжения с места обрыва.
+
+        Args:
+            messages: Сообщения исходного запроса
+            translated_text: Обрезанный перевод
+            model_name: Модель
+            target_language: Целевой язык перевода
+            context: Контекст документа
+            tier_fields: Поле tier для метрик
+
+        Returns:
+            Optional[str]: Полный перевод или None, если ответ обрезан и после MAX_CONTINUATIONS продолжений
+        """
+        file_path, part_number = context.get("file_path"), context.get("part_number")
+        for attempt in range(1, MAX_CONTINUATIONS + 1):
+            log_warning("Перевод части обрезан лимитом ответа модели, запрос продолжения %d/%d", attempt,
+                        MAX_CONTINUATIONS, file=file_path, lang=target_language, part=part_number)
+            begin_request()
+            started = time.perf_counter()
+            with span("api_call", file=file_path, part=part_number):
+                response = self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages + [
+                        {"role": "assistant", "content": translated_text},
+                        {"role": "user", "content": CONTINUE_PROMPT}
+                    ],
+                    temperature=0.0
+                )
+            translated_text += response.choices[0].message.content or ""
+            truncated = response.choices[0].finish_reason == "length"
+
+            prompt_tokens, completion_tokens, cached_tokens = usage_tokens(response.usage)
+            with self._tokens_lock:
+                self.total_tokens_processed += prompt_tokens + completion_tokens
+            context["total_tokens"] += prompt_tokens + completion_tokens
+            get_metrics().record_request(
+                "translate", file_path, part_number, target_language, model_name,
+                prompt_tokens, completion_tokens, cached_tokens,
+                time.perf_counter() - started, request_retries(), continuation=attempt,
+                **tier_fields, **({"truncated": True} if truncated else {})
+            )
+            if not truncated:
+                return translated_text
+        log_error("Перевод части не поместился в лимит ответа модели после %d продолжений", MAX_CONTINUATIONS,
+                  file=file_path, lang=target_language, part=part_number)
+        return None
+
+    def translate_text_multi(self, text: str, target_languages: List[str], system_prompts: Dict[str, str],
+                             contexts: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """
+        Переводит текст сразу на несколько языков одним запросом (режим --multi_target).
+
+        Фрагмент передается один раз, системный промпт содержит инструкции каждого языка
+        (промпт, глоссарий, улучшения, образцы из памяти переводов), ответ - JSON-объект
+        с переводами по кодам языков. Языки, фрагмент которых собран из памяти переводов,
+        в запрос не входят.
+
+        Args:
+            text: Текст для перевода
+            target_languages: Целевые языки
+            system_prompts: Системные промпты по языкам
+            contexts: Контексты документа по языкам (обновляются для переведенных языков)
+
+        Returns:
+            Dict[str, Optional[str]]: Переводы по языкам; None - язык отсутствует в ответе
+            или запрос не удался (такой фрагмент переводится отдельным запросом)
+        """
+        file_path = contexts[target_languages[0]].get("file_path")
+        results: Dict[str, Optional[str]] = {}
+        memories = {lang: get_translation_memory(lang) for lang in target_languages}
+        pending = []
+        for lang in target_languages:
+            remembered = None
+            if memories[lang] is not None:
+                with span("translation_memory", file=file_path):
+                    remembered = memories[lang].translate_from_memory(text)
+            if remembered is None:
+                pending.append(lang)
+                continue
+            log_debug("Фрагмент взят из памяти переводов", file=file_path, lang=lang,
+                      part=contexts[lang].get("part_number"))
+            contexts[lang]["part_number"] += 1
+            self._update_translated_terms(text, lang, contexts[lang])
+            results[lang] = remembered
+        if not pending:
+            return results
+
+        # Постоянный префикс - инструкции и глоссарии языков, переменная часть - данные фрагмента по языкам
+        prompts = {lang: self._language_prompt(text, lang, system_prompts[lang], contexts[lang], memories[lang])
+                   for lang in pending}
+        messages = [{"role": "system", "content": MULTI_TARGET_PROMPT.format(keys=", ".join(pending)) + "".join(
+            f"\n\n=== {lang} ===\n" + prompts[lang][0].strip() for lang in pending
+        )}]
+        volatile_prompt = "\n\n".join(f"=== {lang} ===\n{prompts[lang][1]}" for lang in pending if prompts[lang][1])
+        if volatile_prompt:
+            messages.append({"role": "system", "content": volatile_prompt})
+        messages.append({"role": "user", "content": text})
+        part_number = contexts[pending[0]].get("part_number")
+        languages = "+".join(pending)
+
+        model_name, tier = self.model_name, self.tier
+        if self.router is not None:
+            tier, model_name = self.router.route(text, file_path, part_number)
+        tier_fields = {"tier": tier} if tier else {}
+
+        begin_request()
+        started = time.perf_counter()
+        try:
+            with span("api_call", file=file_path, part=part_number):
+                response = self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=0.0
+                )
+            content = response.choices[0].message.content
+
+            prompt_tokens, completion_tokens, cached_tokens = usage_tokens(response.usage)
+            with self._tokens_lock:
+                self.total_tokens_processed += prompt_tokens + completion_tokens
+            # Одна запись метрик на язык с его долей токенов: поле language остается кодом языка
+            latency, retries = time.perf_counter() - started, request_retries()
+            prompt_shares, completion_shares, cached_shares = (
+                _token_shares(tokens, len(pending)) for tokens in (prompt_tokens, completion_tokens, cached_tokens)
+            )
+            for index, lang in enumerate(pending):
+                get_metrics().record_request(
+                    "translate", file_path, part_number, lang, model_name,
+                    prompt_shares[index], completion_shares[index], cached_shares[index],
+                    latency, retries, languages=languages, **tier_fields
+                )
+            if self.router is not None:
+                self.router.record(tier, prompt_tokens, completion_tokens)
+            if response.choices[0].finish_reason == "length":
+                # Обрезанный JSON не разбирается: части переводятся запросами отдельных языков
+                log_warning("Ответ на запрос перевода на несколько языков обрезан лимитом ответа модели",
+                            file=file_path, lang=languages, part=part_number)
+                content = None
+        except Exception as e:
+            log_error("Ошибка при переводе текста: %s", e, file=file_path, lang=languages, part=part_number)
+            latency, retries = time.perf_counter() - started, request_retries()
+            for lang in pending:
+                get_metrics().record_request(
+                    "translate", file_path, part_number, lang, model_name,
+                    latency=latency, retries=retries, outcome="error", error=type(e).__name__,
+                    languages=languages, **tier_fields
+                )
+            results.update((lang, None) for lang in pending)
+            return results
+
+        try:
+            translations = json.loads(content) if content is not None else None
+        except (TypeError, ValueError):
+            translations = None
+        if isinstance(translations, dict) and isinstance(translations.get("translations"), dict):
+            translations = translations["translations"]
+        if not isinstance(translations, dict):
+            if content is not None:
+                log_warning("Ответ на запрос перевода на несколько языков не является JSON-объектом",
+                            file=file_path, lang=languages, part=part_number)
+            translations = {}
+
+        for index, lang in enumerate(pending):
+            translated_text = translations.get(lang)
+            if not isinstance(translated_text, str) or not translated_text.strip():
+                if content is not None:
+                    log_warning("В ответе нет перевода на язык %s, фрагмент будет переведен отдельно", lang,
+                                file=file_path, lang=lang, part=part_number)
+                results[lang] = None
+                continue
+            # Сохраняем пары блоков в память переводов (черновики быстрой модели не сохраняются)
+            if memories[lang] is not None and tier != "draft":
+                memories[lang].add(text, translated_text, model_name)
+            contexts[lang]["part_number"] += 1
+            contexts[lang]["total_tokens"] += prompt_shares[index] + completion_shares[index]
+            self._update_translated_terms(text, lang, contexts[lang])
+            results[lang] = translated_text
+        return results
+
+    def _language_prompt(self, text: str, target_language: str, system_prompt: str, context: Dict[str, Any],
+                         memory: Optional[TranslationMemory]) -> Tuple[str, str]:
+        """
+        Собирает системный промпт фрагмента для языка из постоянной и переменной частей.
+
+        Постоянная часть (инструкции и глоссарий языка, а при prompt_improvements.retrieval:
+        false - и улучшения промпта) побайтно совпадает для всех фрагментов языка и
+        отправляется первым сообщением, поэтому провайдер API берет ее из кэша префиксов.
+        Переменная часть (улучшения, выбранные для фрагмента, переводы терминов документа,
+        образцы из памяти переводов) отправляется следующим сообщением.
+
+        Args:
+            text: Фрагмент для перевода
+            target_language: Целевой язык перевода
+            system_prompt: Системный промпт языка
+            context: Контекст документа с переведенными терминами
+            memory: Память переводов языка (None - без образцов)
+
+        Returns:
+            Tuple[str, str]: (постоянная часть, переменная часть; пустая строка, если ее нет)
+        """
+        retrieval = self.improvements_config.get("retrieval", True)
+
+        # Добавляем улучшения промпта на основе предыдущих ошибок (при retrieval - относящиеся к этому фрагменту)
+        with span("prompt_improvements", file=context.get("file_path")):
+            improvements = load_prompt_improvements(
+                target_language,
+                text if retrieval else None,
+                top_k=self.improvements_config.get("top_k", 10),
+                token_budget=self.improvements_config.get("token_budget", 600),
+                min_coverage=self.improvements_config.get("min_coverage", 0.6)
+            )
+
+        # Добавляем глоссарий к системному промпту
+        stable_prompt = system_prompt + self._glossary_prompt(target_language)
+        volatile_prompt = ""
+        if retrieval:
+            volatile_prompt += improvements
+        else:
+            stable_prompt += improvements
+
+        # Добавляем предыдущие переводы терминов для согласованности
+        if context["translated_terms"]:
+            volatile_prompt += "\nПредыдущие переводы терминов в этом документе:\n"
+            for term, translation in context["translated_terms"].items():
+                volatile_prompt += f"'{term}' -> '{translation}'\n"
+
+        # Переводы совпадающих и похожих блоков из памяти переводов
+        if memory is not None:
+            with span("translation_memory", file=context.get("file_path")):
+                volatile_prompt += memory.references_prompt(text)
+
+        return stable_prompt, volatile_prompt.strip()
+
+    def _glossary_prompt(self, target_language: str) -> str:
+        """
+        Возвращает глоссарий языка в виде текста для системного промпта.
+        
+        Args:
+            target_language: Целевой язык перевода
+            
+        Returns:
+            str: Строки "'термин' -> 'перевод'" для всех терминов языка
+        """
+        glossary_prompt = self._glossary_prompts.get(target_language)
+        if glossary_prompt is None:
+            glossary_prompt = "\nГлоссарий терминов (русский -> целевой язык):\n" + "".join(
+                f"'{ru_term}' -> '{translations[target_language]}'\n"
+                for ru_term, translations in self.glossary.items() if target_language in translations
+            )
+            self._glossary_prompts[target_language] = glossary_prompt
+        return glossary_prompt
+    
     def _update_translated_terms(self, text: str, target_language: str, context: Dict[str, Any]) -> None:
         """
         Обновляет список переведенных терминов в контексте.
@@ -126,4 +506,5 @@ class Translator:
         Returns:
             int: Количество токенов
         """
-        return self.total_tokens_processed 
\ No newline at end of file
+        with self._tokens_lock:
+            return self.total_tokens_processed 
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional
+from utils.logger import log_info, log_error
+
+def get_validation_cache_dir() -> str:
+    """
+    Возвращает полный путь к директории с кэшем валидации.
+
+    Returns:
+        str: Путь к директории validation_cache
+    """
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(project_dir, "validation_cache")
+
+def text_hash(text: str) -> str:
+    """
+    Рассчитывает SHA-256 хэш текста.
+
+    Args:
+        text: Текст для хэширования
+
+    Returns:
+        str: Хэш в шестнадцатеричном виде
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class ValidationCache:
+    """Постоянный кэш результатов валидации для пар (оригинал, перевод)."""
+
+    def __init__(self, target_language: str, model_name: str, validation_prompt: str,
+                 cache_dir: Optional[str] = None):
+        """
+        Инициализирует кэш валидации для языка.
+
+        Args:
+            target_language: Код целевого языка
+            model_name: Название модели для валидации
+            validation_prompt: Итоговый системный промпт валидации (входит в ключ кэша)
+            cache_dir: Директория для файла кэша (по умолчанию validation_cache/)
+        """
+        self.target_language = target_language
+        self.model_name = model_name
+        self.prompt_hash = text_hash(validation_prompt)
+        self.cache_dir = cache_dir or get_validation_cache_dir()
+        self.cache_file = os.path.join(self.cache_dir, f"validation_cache_{target_language}.json")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._touched: set = set()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Загружает кэш с диска.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Записи кэша по ключу
+        """
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                log_info(f"Загружено {len(entries):,} записей кэша валидации для языка '{self.target_language}'")
+                return entries
+        except Exception as e:
+            log_error(f"Ошибка загрузки кэша валидации из {self.cache_file}: {e}")
+        return {}
+
+    def make_key(self, original_text: str, translated_text: str) -> str:
+        """
+        Формирует ключ кэша из хэшей текстов, языка, модели и промпта валидации.
+
+        Args:
+            original_text: Исходный текст на русском
+            translated_text: Переведенный текст
+
+        Returns:
+            str: Ключ записи кэша
+        """
+        parts = [
+            text_hash(original_text),
+            text_hash(translated_text),
+            self.target_language,
+            self.model_name,
+            self.prompt_hash
+        ]
+        return text_hash("|".join(parts))
+
+    def get(self, original_text: str, translated_text: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Возвращает закэшированные проблемы для пары текстов.
+
+        Args:
+            original_text: Исходный текст на русском
+            translated_text: Переведенный текст
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Список проблем или None, если записи нет
+        """
+        key = self.make_key(original_text, translated_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            self._touched.add(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [dict(issue) for issue in entry.get("issues", [])]
+
+    def put(self, original_text: str, translated_text: str, issues: List[Dict[str, Any]]) -> None:
+        """
+        Сохраняет отфильтрованные проблемы для пары текстов.
+
+        Args:
+            original_text: Исходный текст на русском
+            translated_text: Переведенный текст
+            issues: Отфильтрованный список проблем
+        """
+        key = self.make_key(original_text, translated_text)
+        with self._lock:
+            self._entries[key] = {"model": self.model_name, "issues": [dict(issue) for issue in issues]}
+            self._touched.add(key)
+            self._dirty = True
+
+    def save(self, prune: bool = False) -> None:
+        """
+        Сохраняет кэш на диск (атомарно через временный файл).
+
+        Args:
+            prune: Удалить записи, к которым не обращались в текущем запуске
+        """
+        with self._lock:
+            if prune:
+                stale_keys = [key for key in self._entries if key not in self._touched]
+                for key in stale_keys:
+                    del self._entries[key]
+                if stale_keys:
+                    self._dirty = True
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_file = self.cache_file + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+                self._dirty = False
+                log_info(f"Кэш валидации сохранен: {self.cache_file} ({len(self._entries):,} записей)")
+            except Exception as e:
+                log_error(f"Ошибка сохранения кэша валидации в {self.cache_file}: {e}")
@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+from typing import Dict, Iterator, Optional, Set, Tuple
+from utils.logger import log_info, log_warning, log_debug
+
+# Параметры наблюдения по умолчанию (секция watch в config.yaml)
+DEFAULT_WATCH = {
+    "backend": "auto",          # auto (inotify, если доступен), inotify, polling
+    "debounce_seconds": 0.5,    # Пауза без новых событий, после которой пачка изменений обрабатывается
+    "max_delay_seconds": 5.0,   # Максимальная задержка пачки при непрерывных сохранениях
+    "poll_interval": 1.0,       # Период опроса файловой системы (backend polling), с
+}
+
+# Флаги inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Временные файлы редакторов (vim, emacs, JetBrains), которые не переводятся
+_TEMP_SUFFIXES = ("~", ".swp", ".swx", ".swo", ".tmp", ".part", ".crdownload")
+
+def is_temporary_file(name: str) -> bool:
+    """
+    Проверяет, является ли файл временным файлом редактора.
+
+    Args:
+        name: Имя файла
+
+    Returns:
+        bool: True для скрытых файлов, резервных копий и файлов подкачки редакторов
+    """
+    return name.startswith((".", "#")) or name.endswith(_TEMP_SUFFIXES) or name == "4913"
+
+def _load_inotify():
+    """Возвращает функции inotify из libc или None, если inotify недоступен."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class DirectoryWatcher:
+    """
+    Наблюдение за изменениями файлов в дереве директорий.
+
+    На Linux используется inotify (через ctypes, без сторонних пакетов) с
+    рекурсивной подпиской на поддиректории; на других системах и при ошибке
+    inotify - периодический опрос времени изменения файлов. Сохранения
+    группируются: пачка изменений выдается после паузы debounce_seconds без
+    новых событий (но не позже max_delay_seconds после первого события).
+    """
+
+    def __init__(self, root: str, settings: Optional[Dict] = None):
+        """
+        Args:
+            root: Наблюдаемая директория
+            settings: Параметры наблюдения (см. DEFAULT_WATCH)
+        """
+        self.root = os.path.abspath(root)
+        self.settings = dict(DEFAULT_WATCH)
+        self.settings.update({key: value for key, value in (settings or {}).items() if value is not None})
+        self._stop = threading.Event()
+        self._fd: Optional[int] = None
+        self._libc = None
+        self._watches: Dict[int, str] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._last_batch = time.time()
+
+        backend = self.settings["backend"]
+        if backend in ("auto", "inotify"):
+            self._libc = _load_inotify()
+            if self._libc is not None:
+                fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+                if fd < 0:
+                    log_warning(f"inotify недоступен: {os.strerror(self._get_errno())}")
+                    self._libc = None
+                else:
+                    self._fd = fd
+                    self._add_tree(self.root)
+            elif backend == "inotify":
+                log_warning("inotify недоступен на этой системе, используется опрос файлов")
+        if self._fd is None:
+            self._snapshot = self._scan()
+        self.backend = "inotify" if self._fd is not None else "polling"
+        log_info(f"Наблюдение за {self.root} ({self.backend}, пауза {self.settings['debounce_seconds']} с)")
+
+    def _get_errno(self) -> int:
+        import ctypes
+        return ctypes.get_errno()
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            error = self._get_errno()
+            if error == errno.ENOSPC:
+                log_warning("Достигнут лимит inotify (fs.inotify.max_user_watches): "
+                            f"изменения в {path} не отслеживаются")
+            elif error not in (errno.ENOENT, errno.ENOTDIR):
+                log_warning(f"Не удалось отслеживать {path}: {os.strerror(error)}")
+            return
+        self._watches[wd] = path
+
+    def _add_tree(self, directory: str) -> Set[str]:
+        """Подписывается на директорию и поддиректории; возвращает уже существующие в них файлы."""
+        found = set()
+        for current, dirs, files in os.walk(directory):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            self._add_watch(current)
+            for name in files:
+                if not is_temporary_file(name):
+                    found.add(self._relative(os.path.join(current, name)))
+        return found
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Снимок дерева: относительный путь -> (mtime_ns, размер)."""
+        snapshot = {}
+        for current, dirs, files in os.walk(self.root):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in files:
+                if is_temporary_file(name):
+                    continue
+                path = os.path.join(current, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[self._relative(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _recent_files(self) -> Set[str]:
+        """Файлы, измененные после предыдущей пачки (после переполнения очереди inotify)."""
+        threshold = int((self._last_batch - 1.0) * 1e9)
+        return {path for path, (mtime_ns, _) in self._scan().items() if mtime_ns >= threshold}
+
+    def _read_events(self, timeout: float, changed: Set[str], deleted: Set[str]) -> bool:
+        """Читает события inotify; возвращает True, если были изменения."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        had_changes = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                log_warning("Переполнение очереди событий inotify: проверяются все недавно измененные файлы")
+                changed.update(self._recent_files())
+                had_changes = True
+                continue
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None or not name or is_temporary_file(name):
+                continue
+
+            path = os.path.join(directory, name)
+            relative = self._relative(path)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Новая директория: подписываемся и берем файлы, появившиеся до подписки
+                    changed.update(self._add_tree(path))
+                    had_changes = True
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                changed.add(relative)
+                deleted.discard(relative)
+                had_changes = True
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                deleted.add(relative)
+                changed.discard(relative)
+                had_changes = True
+        return had_changes
+
+    def _poll(self, timeout: float, changed: Set[str], deleted: Set[str]) -> bool:
+        """Сравнивает снимок дерева с предыдущим; возвращает True, если были изменения."""
+        if self._stop.wait(min(timeout, self.settings["poll_interval"])):
+            return False
+        snapshot = self._scan()
+        had_changes = False
+        for path, state in snapshot.items():
+            if self._snapshot.get(path) != state:
+                changed.add(path)
+                deleted.discard(path)
+                had_changes = True
+        for path in self._snapshot.keys() - snapshot.keys():
+            deleted.add(path)
+            changed.discard(path)
+            had_changes = True
+        self._snapshot = snapshot
+        return had_changes
+
+    def _wait(self, timeout: float, changed: Set[str], deleted: Set[str]) -> bool:
+        if self._fd is not None:
+            return self._read_events(timeout, changed, deleted)
+        return self._poll(timeout, changed, deleted)
+
+    def batches(self) -> Iterator[Tuple[Set[str], Set[str]]]:
+        """
+        Выдает пачки изменений до вызова stop().
+
+        Yields:
+            Tuple[Set[str], Set[str]]: (измененные или новые файлы, удаленные файлы) -
+            пути относительно наблюдаемой директории с разделителями '/'
+        """
+        debounce = float(self.settings["debounce_seconds"])
+        max_delay = float(self.settings["max_delay_seconds"])
+        while not self._stop.is_set():
+            changed: Set[str] = set()
+            deleted: Set[str] = set()
+            if not self._wait(0.5, changed, deleted):
+                continue
+
+            # Ждем окончания серии сохранений
+            first_event = time.monotonic()
+            while not self._stop.is_set():
+                remaining = max_delay - (time.monotonic() - first_event)
+                if remaining <= 0 or not self._wait(min(debounce, remaining), changed, deleted):
+                    break
+
+            # Файл мог быть удален после события записи
+            changed = {path for path in changed if os.path.isfile(os.path.join(self.root, path))}
+            self._last_batch = time.time()
+            if changed or deleted:
+                log_debug(f"Пачка изменений: {len(changed)} изменено, {len(deleted)} удалено")
+                yield changed, deleted
+
+    def stop(self) -> None:
+        """Останавливает выдачу пачек (можно вызывать из другого потока или обработчика сигнала)."""
+        self._stop.set()
+
+    def close(self) -> None:
+        """Освобождает дескриптор inotify."""
+        self.stop()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
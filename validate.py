@@ -1,24 +1,55 @@
 import os
 import json
+import time
 import argparse
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Импортируем наши утилиты
 from utils import (
     log_info, log_error, log_warning, setup_logging,
     load_config, get_validation_prompt, load_glossary,
-    save_prompt_improvement
+    save_prompt_improvement, ValidationCache, check_structure
 )
+from utils.metrics import init_metrics, get_metrics, begin_request, request_retries, usage_tokens
+from utils.profiling import init_profiling, span, add_profiling_arguments
+from utils.replay import add_backend_arguments
+from utils.client import create_client
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # Глобальный счетчик токенов
 total_tokens_used = 0
 
+def build_validation_system_prompt(config: Dict[str, Any], target_language: str,
+                                   glossary: Dict[str, Dict[str, str]]) -> str:
+    """
+    Формирует итоговый системный промпт валидации с глоссарием.
+    
+    Args:
+        config: Общая конфигурация
+        target_language: Целевой язык перевода
+        glossary: Словарь с терминами для глоссария
+        
+    Returns:
+        str: Системный промпт для запроса валидации
+    """
+    # Получаем валидационный промпт
+    system_prompt = get_validation_prompt(config, target_language)
+    
+    # Формируем промпт с глоссарием
+    glossary_prompt = "\nГлоссарий терминов (русский -> целевой язык):\n"
+    for ru_term, translations in glossary.items():
+        if target_language in translations:
+            glossary_prompt += f"'{ru_term}' -> '{translations[target_language]}'\n"
+    
+    return f"{system_prompt}\n{glossary_prompt}\n\nВАЖНО: Возвращай ответ ТОЛЬКО в JSON формате с полем 'issues'. Проверяй ТОЛЬКО на серьезные ошибки перевода. НЕ отмечай как ошибки правильно переведенные термины из глоссария. Если ошибок нет, верни пустой массив issues: []."
+
 def validate_translation(original_text: str, translated_text: str, target_language: str, file_path: str,
-                         client: OpenAI, model_name: str, glossary: Dict[str, Dict[str, str]],
-                         config: Dict[str, Any]) -> Dict[str, Any]:
+                         client: "OpenAI", model_name: str, glossary: Dict[str, Dict[str, str]],
+                         config: Dict[str, Any], cache: Optional[ValidationCache] = None) -> Dict[str, Any]:
     """
     Валидирует перевод с использованием GPT.
     
@@ -31,22 +62,23 @@ def validate_translation(original_text: str, translated_text: str, target_langua
         model_name: Название модели для валидации
         glossary: Словарь с терминами для глоссария
         config: Общая конфигурация
+        cache: Кэш результатов валидации (опционально)
         
     Returns:
         Dict: Результат валидации в формате JSON
     """
     global total_tokens_used
     
-    # Получаем валидационный промпт
-    system_prompt = get_validation_prompt(config, target_language)
+    # Если пара текстов уже проверялась, берем проблемы из кэша без запроса к API
+    if cache is not None:
+        cached_issues = cache.get(original_text, translated_text)
+        if cached_issues is not None:
+            for issue in cached_issues:
+                issue["file_path"] = file_path
+            log_info(f"Результат валидации для {file_path} взят из кэша (проблем: {len(cached_issues)})")
+            return {"issues": cached_issues, "cached": True}
     
-    # Формируем промпт с глоссарием
-    glossary_prompt = "\nГлоссарий терминов (русский -> целевой язык):\n"
-    for ru_term, translations in glossary.items():
-        if target_language in translations:
-            glossary_prompt += f"'{ru_term}' -> '{translations[target_language]}'\n"
-    
-    enhanced_system_prompt = f"{system_prompt}\n{glossary_prompt}\n\nВАЖНО: Возвращай ответ ТОЛЬКО в JSON формате с полем 'issues'. Проверяй ТОЛЬКО на серьезные ошибки перевода. НЕ отмечай как ошибки правильно переведенные термины из глоссария. Если ошибок нет, верни пустой массив issues: []."
+    enhanced_system_prompt = build_validation_system_prompt(config, target_language, glossary)
     
     try:
         # Подготовка пользовательского сообщения
@@ -79,22 +111,37 @@ def validate_translation(original_text: str, translated_text: str, target_langua
         
         # Отправка запроса на валидацию
         log_info(f"Отправка запроса на валидацию перевода для {file_path}")
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": enhanced_system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.0,  # Уменьшаем температуру для более предсказуемых результатов
-            response_format={"type": "json_object"},  # Указываем формат ответа как JSON
-            max_tokens=2000
-        )
+        begin_request()
+        started = time.perf_counter()
+        try:
+            with span("api_call", file=file_path):
+                response = client.chat.completions.create(
+                    model=model_name,
+                    messages=[
+                        {"role": "system", "content": enhanced_system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    temperature=0.0,  # Уменьшаем температуру для более предсказуемых результатов
+                    response_format={"type": "json_object"},  # Указываем формат ответа как JSON
+                    max_tokens=2000
+                )
+        except Exception as e:
+            get_metrics().record_request(
+                "validate", file_path, None, target_language, model_name,
+                latency=time.perf_counter() - started, retries=request_retries(),
+                outcome="error", error=type(e).__name__
+            )
+            raise
         
         # Подсчет токенов
-        prompt_tokens = response.usage.prompt_tokens
-        completion_tokens = response.usage.completion_tokens
+        prompt_tokens, completion_tokens, cached_tokens = usage_tokens(response.usage)
         file_total_tokens = prompt_tokens + completion_tokens
         total_tokens_used += file_total_tokens
+        get_metrics().record_request(
+            "validate", file_path, None, target_language, model_name,
+            prompt_tokens, completion_tokens, cached_tokens,
+            time.perf_counter() - started, request_retries()
+        )
         
         # Логируем информацию о токенах
         log_info(f"Использовано токенов для {file_path}: {file_total_tokens} (промпт: {prompt_tokens}, ответ: {completion_tokens})")
@@ -136,26 +183,36 @@ def validate_translation(original_text: str, translated_text: str, target_langua
                         filtered_issues.append(issue)
                         
                         # Сохраняем улучшение промпта для будущих переводов
-                        save_prompt_improvement(target_language, issue)
+                        with span("save_prompt_improvement", file=file_path):
+                            save_prompt_improvement(target_language, issue)
             
             # Заменяем оригинальные issues на отфильтрованные
             validation_data["issues"] = filtered_issues
+            
+            # Кэшируем только успешно разобранные ответы
+            if cache is not None:
+                cache.put(original_text, translated_text, filtered_issues)
             return validation_data
         
         except json.JSONDecodeError as e:
             log_error(f"Ошибка парсинга JSON из ответа: {e}")
-            return {"issues": []}
+            return {"issues": [], "error": str(e)}
     
     except Exception as e:
         log_error(f"Ошибка при валидации перевода: {e}")
-        return {"issues": []}
+        return {"issues": [], "error": str(e)}
 
 def validate_file(original_file: str, translated_file: str, target_language: str,
-                 client: OpenAI, model_name: str, glossary: Dict[str, Dict[str, str]],
-                 config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+                 client: Optional["OpenAI"], model_name: str, glossary: Dict[str, Dict[str, str]],
+                 config: Dict[str, Any], cache: Optional[ValidationCache] = None,
+                 structural_checks: bool = True, structural_gate: bool = False,
+                 structural_only: bool = False) -> Optional[Dict[str, Any]]:
     """
     Валидирует перевод одного файла.
     
+    Перед запросом к API выполняются локальные структурные проверки. Если включен
+    structural_gate, файлы со структурными проблемами не отправляются на LLM-валидацию.
+    
     Args:
         original_file: Путь к оригинальному файлу
         translated_file: Путь к переведенному файлу
@@ -164,6 +221,10 @@ def validate_file(original_file: str, translated_file: str, target_language: str
         model_name: Название модели для валидации
         glossary: Словарь с терминами для глоссария
         config: Общая конфигурация
+        cache: Кэш результатов валидации (опционально)
+        structural_checks: Выполнять локальные структурные проверки
+        structural_gate: Не отправлять на LLM-валидацию файлы со структурными проблемами
+        structural_only: Выполнять только структурные проверки, без запросов к API
         
     Returns:
         Optional[Dict[str, Any]]: Результат валидации или None в случае ошибки
@@ -178,22 +239,37 @@ def validate_file(original_file: str, translated_file: str, target_language: str
             log_error(f"Переведенный файл не найден: {translated_file}")
             return None
         
+        # Получаем относительный путь для отчета
+        rel_path = os.path.relpath(translated_file)
+        
         # Читаем содержимое файлов
-        with open(original_file, 'r', encoding='utf-8') as f_orig:
-            original_text = f_orig.read()
+        with span("read", file=rel_path):
+            with open(original_file, 'r', encoding='utf-8') as f_orig:
+                original_text = f_orig.read()
+            
+            with open(translated_file, 'r', encoding='utf-8') as f_trans:
+                translated_text = f_trans.read()
         
-        with open(translated_file, 'r', encoding='utf-8') as f_trans:
-            translated_text = f_trans.read()
+        # Локальные структурные проверки (без затрат токенов)
+        structural_issues = []
+        if structural_checks or structural_only:
+            with span("structure_checks", file=rel_path):
+                structural_issues = check_structure(original_text, translated_text, rel_path)
+            if structural_issues:
+                log_warning(f"Найдено структурных проблем в {rel_path}: {len(structural_issues)}")
         
-        # Получаем относительный путь для отчета
-        rel_path = os.path.relpath(translated_file)
+        if structural_only or (structural_gate and structural_issues):
+            if not structural_only:
+                log_info(f"LLM-валидация пропущена для {rel_path} из-за структурных проблем")
+            return {"issues": structural_issues, "llm_skipped": True}
         
         # Валидируем перевод
         validation_result = validate_translation(
             original_text, translated_text, target_language, rel_path,
-            client, model_name, glossary, config
+            client, model_name, glossary, config, cache
         )
         
+        validation_result["issues"] = structural_issues + validation_result.get("issues", [])
         return validation_result
     
     except Exception as e:
@@ -221,6 +297,9 @@ def create_validation_report(validation_results: List[Dict[str, Any]], target_la
         report = {
             "language": target_language,
             "total_files": len(validation_results),
+            "cached_files": sum(1 for result in validation_results if result and result.get("cached")),
+            "llm_skipped_files": sum(1 for result in validation_results if result and result.get("llm_skipped")),
+            "structural_issues": sum(1 for issue in all_issues if issue.get("category") == "structure"),
             "total_issues": len(all_issues),
             "issues": all_issues
         }
@@ -248,7 +327,11 @@ def create_validation_report(validation_results: List[Dict[str, Any]], target_la
     except Exception as e:
         log_error(f"Ошибка при создании отчета о валидации: {e}")
 
-def validate_translations(input_dir: str, output_dir: str, target_language: str, report_file: Optional[str] = None) -> None:
+def validate_translations(input_dir: str, output_dir: str, target_language: str, report_file: Optional[str] = None,
+                          use_cache: bool = True, structural_gate: Optional[bool] = None,
+                          structural_only: bool = False, client: Optional["OpenAI"] = None,
+                          config: Optional[Dict[str, Any]] = None, backend: Optional[str] = None,
+                          cassette: Optional[str] = None, replay_latency: Optional[bool] = None) -> None:
     """
     Валидирует все переведенные файлы.
     
@@ -257,26 +340,52 @@ def validate_translations(input_dir: str, output_dir: str, target_language: str,
         output_dir: Директория с переведенными файлами
         target_language: Целевой язык перевода
         report_file: Имя файла для сохранения отчета (опционально)
+        use_cache: Использовать кэш результатов валидации
+        structural_gate: Пропускать LLM-валидацию для файлов со структурными проблемами
+                         (по умолчанию из config.yaml)
+        structural_only: Выполнять только структурные проверки, без запросов к API
+        client: Клиент OpenAI API (по умолчанию создается по config.yaml)
+        config: Общая конфигурация (по умолчанию загружается из config.yaml)
+        backend: Режим работы с API: live, record, replay (по умолчанию из config.yaml)
+        cassette: Файл кассеты для режимов record и replay (по умолчанию из config.yaml)
+        replay_latency: В режиме replay выдерживать записанное время ответов
     """
     global total_tokens_used
     # Сбрасываем счетчик токенов
     total_tokens_used = 0
     
     # Загрузка конфигурации
-    config = load_config()
+    if config is None:
+        config = load_config()
     
     # Загрузка глоссария
     glossary = load_glossary()
     
-    # Инициализация клиента OpenAI
-    client = OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        base_url=config.get("api", {}).get("base_url", os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"))
-    )
+    # Настройки структурных проверок
+    validation_config = config.get("validation", {})
+    structural_checks = validation_config.get("structural_checks", True)
+    if structural_gate is None:
+        structural_gate = validation_config.get("structural_gate", False)
+    
+    # Инициализация клиента OpenAI (не нужен, если выполняются только структурные проверки)
+    if structural_only:
+        client = None
+    elif client is None:
+        # Валидация последовательная: достаточно одного соединения
+        client = create_client(config, 1, backend, cassette, replay_latency)
     
     # Получение названия модели из конфигурации
     model_name = config.get("api", {}).get("model_name", os.getenv("MODEL_NAME", "gpt-4o-mini"))
     
+    # Кэш результатов валидации: повторно проверяем только изменившиеся пары файлов
+    cache = None
+    if use_cache and not structural_only and validation_config.get("cache", True):
+        cache = ValidationCache(
+            target_language, model_name,
+            build_validation_system_prompt(config, target_language, glossary),
+            validation_config.get("cache_dir")
+        )
+    
     # Полный путь к директории с переведенными файлами
     target_output_dir = os.path.join(output_dir, target_language)
     
@@ -312,7 +421,8 @@ def validate_translations(input_dir: str, output_dir: str, target_language: str,
                     # Валидируем перевод
                     result = validate_file(
                         original_file, translated_file, target_language,
-                        client, model_name, glossary, config
+                        client, model_name, glossary, config, cache,
+                        structural_checks, structural_gate, structural_only
                     )
                     
                     if result:
@@ -321,6 +431,12 @@ def validate_translations(input_dir: str, output_dir: str, target_language: str,
     # Создаем отчет о валидации
     create_validation_report(validation_results, target_language, report_file)
     
+    # Сохраняем кэш, удаляя записи для файлов, которых больше нет в выводе
+    if cache is not None:
+        with span("validation_cache_save"):
+            cache.save(prune=True)
+        log_info(f"Кэш валидации: попаданий {cache.hits}, промахов {cache.misses}")
+    
     # Логируем общую информацию о токенах
     log_info(f"Всего проверено файлов: {validated_files_count}")
     log_info(f"Всего использовано токенов: {total_tokens_used}")
@@ -345,6 +461,15 @@ def parse_arguments():
     parser.add_argument('--log_level', type=str, default='INFO', 
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Уровень логирования')
     parser.add_argument('--log_file', type=str, help='Файл для сохранения логов')
+    parser.add_argument('--log_format', type=str, default='text', choices=['text', 'json'],
+                        help='Формат логов: text или json (JSON Lines с полями file, lang, part)')
+    parser.add_argument('--no_cache', action='store_true', help='Не использовать кэш результатов валидации')
+    parser.add_argument('--structural_gate', action='store_true', default=None,
+                        help='Не отправлять на LLM-валидацию файлы со структурными проблемами')
+    parser.add_argument('--structural_only', action='store_true',
+                        help='Выполнить только локальные структурные проверки, без запросов к API')
+    add_profiling_arguments(parser)
+    add_backend_arguments(parser)
     return parser.parse_args()
 
 # Загрузка переменных окружения
@@ -356,15 +481,28 @@ def main():
     args = parse_arguments()
     
     # Настройка логирования
-    setup_logging(args.log_level, args.log_file)
+    setup_logging(args.log_level, args.log_file, args.log_format)
+    
+    # Метрики запросов к API
+    metrics = init_metrics("validate", load_config().get("metrics", {}))
+    profiler = init_profiling("validate", args.profile, args.profile_cprofile,
+                              args.profile_tracemalloc, args.profile_dir)
     
     # Запуск валидации
     validate_translations(
         args.input_dir, 
         args.output_dir, 
         args.language, 
-        args.report
+        args.report,
+        use_cache=not args.no_cache,
+        structural_gate=args.structural_gate,
+        structural_only=args.structural_only,
+        backend=args.backend,
+        cassette=args.cassette,
+        replay_latency=args.replay_latency
     )
+    metrics.finish()
+    profiler.finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file